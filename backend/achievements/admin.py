@@ -1,3 +1,23 @@
 from django.contrib import admin
+from zentry_backend.pagination import EstimatedCountPaginator
+from .models import Badge, UserBadge
 
-# Register your models here.
+
+@admin.register(Badge)
+class BadgeAdmin(admin.ModelAdmin):
+    list_display = ['name', 'emoji', 'badge_type', 'requirement_value', 'experience_reward']
+    list_filter = ['badge_type']
+    search_fields = ['name']
+
+
+@admin.register(UserBadge)
+class UserBadgeAdmin(admin.ModelAdmin):
+    list_display = ['user', 'badge', 'earned_at']
+    list_filter = ['badge']
+    list_select_related = ['user', 'badge']
+    search_fields = ['user__username', 'badge__name']
+    raw_id_fields = ['user', 'badge']
+    date_hierarchy = 'earned_at'
+    ordering = ['-earned_at']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
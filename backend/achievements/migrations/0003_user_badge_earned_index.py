@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 18:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('achievements', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='userbadge',
+            index=models.Index(fields=['earned_at'], name='user_badge_earned_idx'),
+        ),
+    ]
@@ -27,6 +27,9 @@ class UserBadge(models.Model):
 
     class Meta:
         unique_together = ('user', 'badge')
+        indexes = [
+            models.Index(fields=['earned_at'], name='user_badge_earned_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} earned {self.badge.name}"
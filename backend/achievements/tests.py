@@ -1,3 +1,26 @@
-from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework.test import APITestCase
 
-# Create your tests here.
+from .models import Badge, UserBadge
+
+User = get_user_model()
+
+
+class QueryCountTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='earner', password='pw')
+        self.client.force_authenticate(self.user)
+
+    def add_badges(self, count):
+        for _ in range(count):
+            badge = Badge.objects.create(name=f'Badge {Badge.objects.count()}', description='', requirement_value=1)
+            UserBadge.objects.create(user=self.user, badge=badge)
+
+    def test_user_badge_list(self):
+        for count in [1, 5]:
+            self.add_badges(count)
+            # count, page with badge and user joined
+            with self.assertNumQueries(2):
+                response = self.client.get(reverse('user-badges'))
+            self.assertEqual(response.status_code, 200)
@@ -16,7 +16,7 @@ class UserBadgeListView(generics.ListAPIView):
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        return UserBadge.objects.filter(user=self.request.user).order_by('-earned_at')
+        return UserBadge.objects.filter(user=self.request.user).select_related('badge', 'user').order_by('-earned_at')
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
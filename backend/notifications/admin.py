@@ -1,20 +1,42 @@
 from django.contrib import admin
+from zentry_backend.pagination import EstimatedCountPaginator
 from .models import WebhookIntegration, NotificationLog
 
 
+class EventTypeFilter(admin.SimpleListFilter):
+    """Event types from the known list, not a DISTINCT scan over every log"""
+    title = 'event type'
+    parameter_name = 'event_type'
+    
+    def lookups(self, request, model_admin):
+        return WebhookIntegration.EVENT_TYPES + [('test', 'Test')]
+    
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(event_type=self.value())
+        return queryset
+
+
 @admin.register(WebhookIntegration)
 class WebhookIntegrationAdmin(admin.ModelAdmin):
-    list_display = ['name', 'webhook_type', 'project', 'created_by', 'is_active', 'created_at']
-    list_filter = ['webhook_type', 'is_active', 'created_at']
+    list_display = ['name', 'webhook_type', 'project', 'created_by', 'is_active', 'delivery_mode', 'circuit_state', 'created_at']
+    list_filter = ['webhook_type', 'is_active', 'delivery_mode', 'circuit_state', 'created_at']
     search_fields = ['name', 'project__name', 'created_by__username']
-    readonly_fields = ['created_at', 'updated_at']
+    readonly_fields = ['circuit_state', 'consecutive_failures', 'circuit_opened_at', 'created_at', 'updated_at']
     
     fieldsets = (
         (None, {
             'fields': ('name', 'webhook_type', 'webhook_url', 'project', 'created_by')
         }),
         ('Configuration', {
-            'fields': ('event_types', 'is_active')
+            'fields': ('event_types', 'is_active', 'delivery_mode', 'batch_window_seconds', 'batch_max_events', 'rate_limit_per_second')
+        }),
+        ('Message Templates', {
+            'fields': ('message_templates',),
+            'classes': ('collapse',)
+        }),
+        ('Health', {
+            'fields': ('circuit_state', 'consecutive_failures', 'circuit_opened_at')
         }),
         ('Timestamps', {
             'fields': ('created_at', 'updated_at'),
@@ -25,17 +47,23 @@ class WebhookIntegrationAdmin(admin.ModelAdmin):
 
 @admin.register(NotificationLog)
 class NotificationLogAdmin(admin.ModelAdmin):
-    list_display = ['webhook_integration', 'event_type', 'status', 'response_status_code', 'retry_count', 'created_at']
-    list_filter = ['status', 'event_type', 'webhook_integration__webhook_type', 'created_at']
-    search_fields = ['webhook_integration__name', 'event_type', 'error_message']
-    readonly_fields = ['created_at', 'sent_at']
+    list_display = ['webhook_integration', 'event_type', 'status', 'priority', 'response_status_code', 'duration_ms', 'retry_count', 'created_at']
+    list_filter = ['status', 'priority', EventTypeFilter, 'webhook_integration__webhook_type', 'created_at']
+    list_select_related = ['webhook_integration']
+    search_fields = ['webhook_integration__name', 'event_type', 'idempotency_key', 'error_message']
+    readonly_fields = ['payload', 'response_body', 'created_at', 'sent_at']
+    date_hierarchy = 'created_at'
+    ordering = ['-created_at']
+    # Never COUNT(*) the whole log table: estimate the total, cap filtered counts
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     
     fieldsets = (
         (None, {
-            'fields': ('webhook_integration', 'event_type', 'status')
+            'fields': ('webhook_integration', 'event_type', 'idempotency_key', 'status', 'priority')
         }),
         ('Request/Response', {
-            'fields': ('payload', 'response_status_code', 'response_body', 'error_message', 'retry_count')
+            'fields': ('payload', 'response_status_code', 'response_body', 'error_message', 'retry_count', 'duration_ms', 'next_attempt_at')
         }),
         ('Timestamps', {
             'fields': ('created_at', 'sent_at'),
@@ -0,0 +1,81 @@
+import logging
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .blobs import load_payloads, store_payload
+from .models import NotificationLog, WebhookIntegration
+
+logger = logging.getLogger(__name__)
+
+QUEUE_DEPTH_KEY = 'webhook-queue:depth'
+
+# Rows the worker still has to send; digest holds are excluded since they are released in one message
+BACKLOG_STATUSES = ['pending', 'retry', 'processing']
+
+# Most recent waiting rows inspected for one to coalesce into
+COALESCE_SCAN_LIMIT = 50
+
+
+def event_priority(event_type: str) -> int:
+    """Delivery priority of an event type (NotificationLog.PRIORITY_*), normal when not configured"""
+    priorities = getattr(settings, 'WEBHOOK_EVENT_PRIORITIES', {})
+    return priorities.get(event_type, NotificationLog.PRIORITY_NORMAL)
+
+
+def queue_depth() -> int:
+    """
+    Number of deliveries waiting in the outbox
+
+    Cached for WEBHOOK_QUEUE_DEPTH_CACHE_SECONDS so raising events does not count the
+    outbox every time; the high-water mark is a soft limit and tolerates the lag.
+    """
+    depth = cache.get(QUEUE_DEPTH_KEY)
+    if depth is None:
+        depth = NotificationLog.objects.filter(status__in=BACKLOG_STATUSES).count()
+        cache.set(QUEUE_DEPTH_KEY, depth, timeout=getattr(settings, 'WEBHOOK_QUEUE_DEPTH_CACHE_SECONDS', 5))
+    return depth
+
+
+def should_shed(priority: int) -> bool:
+    """Whether an event of this priority is shed because the outbox is past its high-water mark"""
+    high_water = getattr(settings, 'WEBHOOK_QUEUE_HIGH_WATER_MARK', 5000)
+    if not high_water or priority > getattr(settings, 'WEBHOOK_SHED_MAX_PRIORITY', NotificationLog.PRIORITY_LOW):
+        return False
+    return queue_depth() >= high_water
+
+
+def coalesce(integration: WebhookIntegration, event_type: str, data: Dict[str, Any]) -> Optional[int]:
+    """
+    Fold an event into a delivery of the same kind that is still waiting in the outbox
+
+    The waiting row (same integration, event type and user) takes the newer payload, so a
+    backed-up queue sends one up-to-date message instead of one per event.
+
+    Returns:
+        ID of the row the event was folded into, or None when there is nothing to fold into
+    """
+    waiting = list(
+        NotificationLog.objects.filter(webhook_integration=integration, event_type=event_type, status='pending')
+        .order_by('-id').values_list('id', 'payload_blob_id')[:COALESCE_SCAN_LIMIT]
+    )
+    if data.get('user_id') is not None:
+        payloads = load_payloads(blob_id for _, blob_id in waiting)
+        waiting = [row for row in waiting if payloads.get(row[1], {}).get('user_id') == data['user_id']]
+    if not waiting:
+        return None
+    target = waiting[0][0]
+    # The status guard loses cleanly to a worker claiming the row in the meantime
+    if NotificationLog.objects.filter(id=target, status='pending').update(payload_blob_id=store_payload(data)):
+        return target
+    return None
+
+
+def shed(integration: WebhookIntegration, event_type: str, data: Dict[str, Any]) -> str:
+    """Coalesce or drop a low-priority event, returning the reason recorded on its log"""
+    target = coalesce(integration, event_type, data)
+    if target:
+        return f'Coalesced into notification #{target}: outbox above high-water mark'
+    logger.warning(f"Dropping {event_type} for {integration.name}: outbox above high-water mark")
+    return 'Dropped: outbox above high-water mark'
@@ -0,0 +1,126 @@
+import hashlib
+import json
+import threading
+import zlib
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Any, Dict, Iterable, Optional
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from .models import NotificationLog, PayloadBlob
+
+# Decoded blobs kept per process (least recently used dropped first); content never
+# changes for a hash, so entries never go stale
+CACHE_SIZE = 10000
+
+_texts: 'OrderedDict[str, str]' = OrderedDict()
+_texts_lock = threading.Lock()
+
+
+def canonical_json(data: Dict[str, Any]) -> str:
+    """Serialise a payload so equal payloads always produce the same blob"""
+    return json.dumps(data, sort_keys=True, separators=(',', ':'), cls=DjangoJSONEncoder)
+
+
+def encode(text: str) -> PayloadBlob:
+    """Unsaved blob for the text, zlib-compressed when that pays off"""
+    raw = text.encode('utf-8')
+    blob = PayloadBlob(hash=hashlib.sha256(raw).hexdigest(), encoding='raw', content=raw, size=len(raw))
+    threshold = getattr(settings, 'WEBHOOK_BLOB_COMPRESS_MIN_BYTES', 512)
+    if threshold and len(raw) >= threshold:
+        compressed = zlib.compress(raw)
+        if len(compressed) < len(raw):
+            blob.encoding, blob.content = 'zlib', compressed
+    return blob
+
+
+def decode(encoding: str, content) -> str:
+    content = bytes(content)
+    if encoding == 'zlib':
+        content = zlib.decompress(content)
+    return content.decode('utf-8')
+
+
+def _remember(blob_hash: str, text: str):
+    with _texts_lock:
+        _texts[blob_hash] = text
+        _texts.move_to_end(blob_hash)
+        while len(_texts) > CACHE_SIZE:
+            _texts.popitem(last=False)
+
+
+def _cached(hashes: Iterable[str]) -> Dict[str, str]:
+    with _texts_lock:
+        found = {}
+        for blob_hash in hashes:
+            text = _texts.get(blob_hash)
+            if text is not None:
+                _texts.move_to_end(blob_hash)
+                found[blob_hash] = text
+        return found
+
+
+def store_text(text: str) -> Optional[str]:
+    """
+    Store text once and return its hash (None for empty text)
+
+    Identical content shares a single row: on a conflicting hash the insert only
+    refreshes `last_used_at`, so a fan-out or a stream of identical webhook responses
+    keeps one row. The statement is never skipped: prune() may have removed the row in
+    the meantime, and the refreshed timestamp stops a running prune() from deleting a
+    reused blob before the log that points at it is written.
+    """
+    if not text:
+        return None
+    blob = encode(text)
+    PayloadBlob.objects.bulk_create(
+        [blob], update_conflicts=True, unique_fields=['hash'], update_fields=['last_used_at']
+    )
+    _remember(blob.hash, text)
+    return blob.hash
+
+
+def store_payload(data: Dict[str, Any]) -> str:
+    return store_text(canonical_json(data))
+
+
+def load_texts(hashes: Iterable[Optional[str]]) -> Dict[str, str]:
+    """Texts for the given hashes, reading only the ones not cached yet in one query"""
+    hashes = set(filter(None, hashes))
+    texts = _cached(hashes)
+    missing = [blob_hash for blob_hash in hashes if blob_hash not in texts]
+    if missing:
+        for blob_hash, encoding, content in PayloadBlob.objects.filter(hash__in=missing).values_list('hash', 'encoding', 'content'):
+            texts[blob_hash] = decode(encoding, content)
+            _remember(blob_hash, texts[blob_hash])
+    return texts
+
+
+def load_text(blob_hash: Optional[str]) -> str:
+    if not blob_hash:
+        return ''
+    return load_texts([blob_hash]).get(blob_hash, '')
+
+
+def load_payloads(hashes: Iterable[Optional[str]]) -> Dict[str, Dict[str, Any]]:
+    return {blob_hash: json.loads(text) for blob_hash, text in load_texts(hashes).items()}
+
+
+def preload(logs: Iterable[NotificationLog]):
+    """Read the payloads and responses of many logs with one query before they are accessed"""
+    load_texts(blob_hash for log in logs for blob_hash in (log.payload_blob_id, log.response_blob_id))
+
+
+def prune(grace_days: int = 1) -> int:
+    """Delete blobs no log references any more, leaving recently stored ones alone"""
+    unreferenced = PayloadBlob.objects.filter(last_used_at__lt=timezone.now() - timedelta(days=grace_days)).exclude(
+        Exists(NotificationLog.objects.filter(payload_blob=OuterRef('pk')))
+    ).exclude(
+        Exists(NotificationLog.objects.filter(response_blob=OuterRef('pk')))
+    )
+    deleted, _ = unreferenced.delete()
+    return deleted
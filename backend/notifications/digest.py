@@ -0,0 +1,197 @@
+import logging
+import time
+import uuid
+from collections import Counter, defaultdict
+from datetime import timedelta
+from typing import Any, Dict, Optional, Tuple
+
+import requests
+from django.conf import settings
+from django.db.models import Count, F, Max, Min
+from django.utils import timezone
+
+from .blobs import load_payloads
+from .formatters import format_digest
+from .metrics import recorder
+from .models import NotificationLog, WebhookIntegration
+from .retry import is_retryable_status, retry_after_delay, retry_delay, throttled_too_long
+from .services import store_response_body, truncate_error
+from .throttling import CircuitBreaker
+from .transport import get_session, get_timeout
+
+logger = logging.getLogger(__name__)
+
+# claimed_by prefix of rows being summarised, so a crashed sender's rows go back to 'digest'
+DIGEST_CLAIM_PREFIX = 'digest:'
+
+DIGEST_MAX_USERS = 10
+DIGEST_TOP_XP = 3
+
+
+def summarize(logs) -> Dict[int, Dict[str, Any]]:
+    """
+    Aggregate held events into one summary per integration with a single GROUP BY query
+
+    Rows are grouped by integration, event type and payload blob, so the individual
+    rows are never loaded; each distinct payload is then read once (one more query)
+    for its user, badge and points.
+    """
+    rows = list(
+        logs.order_by()
+        .values('webhook_integration', 'event_type', 'payload_blob')
+        .annotate(
+            events=Count('id'),
+            first_at=Min('created_at'),
+            last_at=Max('created_at'),
+            attempts=Max('retry_count'),
+        )
+    )
+    payloads = load_payloads(row['payload_blob'] for row in rows)
+
+    totals = defaultdict(lambda: {
+        'events': Counter(), 'completed': Counter(), 'xp': Counter(), 'badges': defaultdict(set),
+        'first_at': None, 'last_at': None, 'attempts': 0,
+    })
+    for row in rows:
+        digest = totals[row['webhook_integration']]
+        payload = payloads.get(row['payload_blob'], {})
+        user = payload.get('user_name') or 'Someone'
+        digest['events'][row['event_type']] += row['events']
+        if row['event_type'] == 'task_completed':
+            digest['completed'][user] += row['events']
+            digest['xp'][user] += _points(payload) * row['events']
+        elif row['event_type'] == 'badge_earned' and payload.get('badge_name'):
+            digest['badges'][user].add(payload['badge_name'])
+        digest['first_at'] = min(filter(None, [digest['first_at'], row['first_at']]))
+        digest['last_at'] = max(filter(None, [digest['last_at'], row['last_at']]))
+        digest['attempts'] = max(digest['attempts'], row['attempts'] or 0)
+
+    return {
+        integration_id: {
+            'total': sum(digest['events'].values()),
+            'events': dict(digest['events']),
+            'completed': digest['completed'].most_common(DIGEST_MAX_USERS),
+            'top_xp': [(user, xp) for user, xp in digest['xp'].most_common(DIGEST_TOP_XP) if xp],
+            'badges': sorted((user, sorted(badges)) for user, badges in digest['badges'].items())[:DIGEST_MAX_USERS],
+            'first_at': digest['first_at'],
+            'last_at': digest['last_at'],
+            'attempts': digest['attempts'],
+        }
+        for integration_id, digest in totals.items()
+    }
+
+
+def _points(payload: Dict[str, Any]) -> int:
+    try:
+        return int(payload.get('points') or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def send_due_digests(now=None, integration_id: Optional[int] = None, force: bool = False) -> Counter:
+    """
+    Send one summary message per integration for every digest period that has ended
+
+    Held rows are claimed with one conditional UPDATE, summarised with two queries and
+    settled with one UPDATE per integration. With force, events are sent without
+    waiting for their period to end.
+
+    Returns:
+        Counter of held events by outcome ('sent', 'failed', 'retry', 'deferred')
+    """
+    now = now or timezone.now()
+    held = NotificationLog.objects.filter(status='digest')
+    if not force:
+        held = held.filter(next_attempt_at__lte=now)
+    if integration_id:
+        held = held.filter(webhook_integration_id=integration_id)
+
+    token = f"{DIGEST_CLAIM_PREFIX}{uuid.uuid4().hex[:16]}"
+    if not held.update(status='processing', claimed_by=token, claimed_at=now):
+        return Counter()
+
+    claimed = NotificationLog.objects.filter(status='processing', claimed_by=token)
+    digests = summarize(claimed)
+    integrations = WebhookIntegration.objects.select_related('project').in_bulk(list(digests))
+
+    results = Counter()
+    for integration_id, digest in digests.items():
+        logs = claimed.filter(webhook_integration_id=integration_id)
+        outcome = send_digest(integrations[integration_id], digest, logs)
+        results[outcome] += digest['total']
+    return results
+
+
+def send_digest(integration: WebhookIntegration, digest: Dict[str, Any], logs) -> str:
+    """Post one summary and record the outcome on every event it covers"""
+    digest = {**digest, 'mode': integration.delivery_mode, 'project_name': integration.project.name}
+
+    allowed, retry_in = CircuitBreaker.allow_request(integration)
+    if not allowed:
+        _hold(logs, delay=retry_in.total_seconds())
+        recorder.record(integration, {'deferred': digest['total']})
+        return 'deferred'
+
+    outcome, duration_ms = _post(integration, digest, logs)
+    recorder.record(integration, {outcome: digest['total']}, duration_ms)
+    return outcome
+
+
+def _post(integration: WebhookIntegration, digest: Dict[str, Any], logs) -> Tuple[str, int]:
+    started = time.perf_counter()
+    try:
+        response = get_session(integration.webhook_url).post(
+            integration.webhook_url,
+            json=format_digest(integration.webhook_type, digest),
+            timeout=get_timeout()
+        )
+    except requests.exceptions.RequestException as e:
+        duration_ms = round((time.perf_counter() - started) * 1000)
+        logger.error(f"Webhook digest request failed: {integration.name} - {e}")
+        CircuitBreaker.record_failure(integration)
+        return _fail(logs, digest, truncate_error(str(e)), retryable=True, duration_ms=duration_ms), duration_ms
+
+    duration_ms = round((time.perf_counter() - started) * 1000)
+    settled = {
+        'response_status_code': response.status_code,
+        'response_blob_id': store_response_body(response),
+        'duration_ms': duration_ms,
+        'sent_at': timezone.now(),
+    }
+    if response.status_code in [200, 204]:
+        logger.info(f"Webhook digest sent: {integration.name} ({digest['total']} events)")
+        CircuitBreaker.record_success(integration)
+        logs.update(status='sent', error_message='', claimed_by='', claimed_at=None, **settled)
+        return 'sent', duration_ms
+
+    logger.error(f"Webhook digest failed: {integration.name} - {response.status_code}")
+    if response.status_code != 429:
+        CircuitBreaker.record_failure(integration)
+    retry_after = retry_after_delay(response) if response.status_code in [429, 503] else None
+    error = truncate_error(f"HTTP {response.status_code}: {response.text}")
+    if response.status_code == 429 and not throttled_too_long(digest['first_at']):
+        # Throttling does not use up the retry budget (see WebhookService._schedule_throttled)
+        _hold(logs, retry_delay(digest['attempts'] + 1, retry_after), error_message=error, **settled)
+        return 'retry', duration_ms
+    return _fail(logs, digest, error, is_retryable_status(response.status_code), retry_after, **settled), duration_ms
+
+
+def _fail(logs, digest: Dict[str, Any], error: str, retryable: bool, retry_after: Optional[float] = None,
+          **settled) -> str:
+    attempt = digest['attempts'] + 1
+    if retryable and attempt <= getattr(settings, 'WEBHOOK_MAX_RETRIES', 5):
+        _hold(logs, retry_delay(attempt, retry_after), error_message=error, retry_count=F('retry_count') + 1, **settled)
+        return 'retry'
+    logs.update(status='failed', error_message=error, claimed_by='', claimed_at=None, **settled)
+    return 'failed'
+
+
+def _hold(logs, delay: float, **fields):
+    """Put claimed events back on hold, to be summarised again after delay seconds"""
+    logs.update(
+        status='digest',
+        next_attempt_at=timezone.now() + timedelta(seconds=delay),
+        claimed_by='',
+        claimed_at=None,
+        **fields
+    )
@@ -0,0 +1,46 @@
+import logging
+from typing import Any, Callable, Dict, Optional
+
+from django.db import transaction
+
+from .routing import subscribed_integration_ids
+from .services import trigger_webhook_notifications
+
+logger = logging.getLogger(__name__)
+
+PayloadBuilder = Callable[[], Dict[str, Any]]
+
+
+def has_subscribers(event_type: str, project_id: Optional[int] = None) -> bool:
+    """Whether any active integration listens for event_type (served from the route cache)"""
+    return bool(subscribed_integration_ids(event_type, project_id))
+
+
+def emit(event_type: str, build_payload: PayloadBuilder, project_id: Optional[int] = None,
+         idempotency_key: Optional[str] = None, using: Optional[str] = None) -> bool:
+    """
+    Publish an event to webhook integrations once the current transaction commits
+
+    Nothing is done when no integration is subscribed, so build_payload (and any
+    related-object queries it makes) only runs for events somebody will receive.
+    Events raised inside a transaction that rolls back are never dispatched.
+    idempotency_key identifies the logical event (object and transition) so repeated
+    emissions of it are delivered only once.
+
+    Returns:
+        True if the event was scheduled for dispatch
+    """
+    if not has_subscribers(event_type, project_id):
+        return False
+
+    transaction.on_commit(lambda: _dispatch(event_type, build_payload, project_id, idempotency_key), using=using)
+    return True
+
+
+def _dispatch(event_type: str, build_payload: PayloadBuilder, project_id: Optional[int],
+              idempotency_key: Optional[str]):
+    try:
+        trigger_webhook_notifications(event_type, build_payload(), project_id, idempotency_key)
+    except Exception as e:
+        # The triggering write has already committed; never let a webhook problem surface to the caller
+        logger.error(f"Failed to dispatch {event_type} event: {e}")
@@ -0,0 +1,423 @@
+import json
+import logging
+import re
+from datetime import datetime
+from functools import lru_cache
+from string import Formatter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.utils import timezone
+
+from .models import WebhookIntegration
+
+logger = logging.getLogger(__name__)
+
+# Templates use str.format syntax with an optional inline default: "{user_name|Someone}".
+# Each template is parsed once into (literal, name, default, conversion, spec) parts, so
+# rendering is a run of data.get() lookups and format() calls. Placeholders are plain
+# names and specs stay within the standard mini-language with bounded width/precision,
+# so a user template can neither reach into objects nor produce unbounded output.
+
+EVENT_TITLES = {
+    'task_completed': 'Task Completed',
+    'badge_earned': 'Badge Earned',
+    'project_created': 'Project Created',
+    'milestone_reached': 'Milestone Reached',
+    'daily_streak': 'Daily Streak',
+}
+
+DISCORD_COLORS = {
+    'task_completed': 0x00ff00,  # Green
+    'badge_earned': 0xffd700,    # Gold
+    'project_created': 0x0099ff, # Blue
+    'milestone_reached': 0xff6600, # Orange
+    'daily_streak': 0x9966ff,    # Purple
+}
+
+DISCORD_DEFAULT_COLOR = 0x808080  # Gray
+
+DISCORD_FOOTER = {
+    "text": "Zentry Project Management",
+    "icon_url": "https://via.placeholder.com/32x32.png?text=Z"
+}
+
+DISCORD_TEMPLATES = {
+    'task_completed': {
+        'description': "🎉 **{user_name|Someone}** completed the task **{task_title|Unknown Task}**!",
+        'fields': [
+            {"name": "Project", "value": "{project_name|Unknown}", "inline": True},
+            {"name": "Points Earned", "value": "{points|0}", "inline": True},
+        ],
+    },
+    'badge_earned': {
+        'description': "🏆 **{user_name|Someone}** earned a new badge: **{badge_name|Unknown Badge}**!",
+        'fields': [
+            {"name": "Badge Description", "value": "{badge_description|No description}", "inline": False},
+        ],
+    },
+    'project_created': {
+        'description': "🚀 New project **{project_name|Unknown Project}** has been created!",
+        'fields': [
+            {"name": "Created by", "value": "{user_name|Unknown}", "inline": True},
+            {"name": "Description", "value": "{project_description|No description:.100}", "inline": False},
+        ],
+    },
+    'milestone_reached': {
+        'description': "🎯 Milestone reached: **{milestone_name|Unknown Milestone}**!",
+        'fields': [
+            {"name": "Project", "value": "{project_name|Unknown}", "inline": True},
+            {"name": "Progress", "value": "{progress|0}%", "inline": True},
+        ],
+    },
+    'daily_streak': {
+        'description': "🔥 **{user_name|Someone}** is on a {streak_days|0} day streak!",
+        'fields': [
+            {"name": "Streak Type", "value": "{streak_type|Daily tasks}", "inline": True},
+        ],
+    },
+}
+
+TEAMS_TEMPLATES = {
+    'task_completed': (
+        "🎉 **Task Completed!**\n\n"
+        "**User:** {user_name|Someone}\n"
+        "**Task:** {task_title|Unknown Task}\n"
+        "**Project:** {project_name|Unknown}\n"
+        "**Points Earned:** {points|0} XP\n\n"
+        "Great job! 🚀"
+    ),
+    'badge_earned': (
+        "🏆 **New Badge Earned!**\n\n"
+        "**User:** {user_name|Someone}\n"
+        "**Badge:** {badge_name|Unknown Badge}\n"
+        "**Description:** {badge_description|No description}\n\n"
+        "Congratulations! 🎉"
+    ),
+    'project_created': (
+        "🚀 **New Project Created!**\n\n"
+        "**Project:** {project_name|Unknown Project}\n"
+        "**Created by:** {user_name|Someone}\n"
+        "**Description:** {project_description|No description}\n\n"
+        "Let's build something amazing! 💪"
+    ),
+    'milestone_reached': (
+        "🎯 **Milestone Reached!**\n\n"
+        "**Project:** {project_name|Unknown Project}\n"
+        "**Milestone:** {milestone_name|Unknown Milestone}\n"
+        "**Progress:** {progress|0}%\n\n"
+        "Keep up the great work! 📈"
+    ),
+    'daily_streak': (
+        "🔥 **Daily Streak!**\n\n"
+        "**User:** {user_name|Someone}\n"
+        "**Streak:** {streak_days|0} days\n"
+        "**Total Points:** {total_points|0} XP\n\n"
+        "You're on fire! Keep it up! 🎯"
+    ),
+}
+
+TEAMS_FALLBACK_TEMPLATE = (
+    "📢 **Zentry Notification**\n\n"
+    "**Event:** {event_name}\n"
+    "**Time:** {time}\n\n"
+    "Something awesome happened in your project! 🎉"
+)
+
+
+class TemplateError(ValueError):
+    """Raised when a message template cannot be compiled"""
+
+
+CONVERSIONS = {'s': str, 'r': repr, 'a': ascii}
+
+# The standard format spec mini-language: [[fill]align][sign][z][#][0][width][grouping][.precision][type]
+FORMAT_SPEC = re.compile(
+    r'(?:.?[<>=^])?[-+ ]?z?#?0?(?P<width>\d+)?[,_]?(?:\.(?P<precision>\d+))?[bcdeEfFgGnosxX%]?',
+    re.DOTALL
+)
+
+# Longest padding or precision a template may ask for; Discord caps an embed at 6000 characters
+MAX_FORMAT_WIDTH = 1024
+
+
+def check_format_spec(field: str, spec: str):
+    """Reject format specs outside the standard mini-language or with oversized width/precision"""
+    if not spec:
+        return
+    match = FORMAT_SPEC.fullmatch(spec)
+    if match is None:
+        raise TemplateError(f"Invalid format spec in {{{field}:{spec}}}")
+    for size in match.group('width', 'precision'):
+        if size and int(size) > MAX_FORMAT_WIDTH:
+            raise TemplateError(f"Width and precision are limited to {MAX_FORMAT_WIDTH} in {{{field}:{spec}}}")
+
+
+class CompiledTemplate:
+    """A str.format template parsed once into literal and placeholder parts"""
+
+    __slots__ = ('source', 'names', 'parts')
+
+    def __init__(self, source: str):
+        if not isinstance(source, str):
+            raise TemplateError("Templates must be strings.")
+        self.source = source
+        self.names = set()
+        try:
+            parsed = list(Formatter().parse(source))
+        except ValueError as e:
+            raise TemplateError(f"Invalid template {source!r}: {e}")
+
+        self.parts = []
+        for literal, field, spec, conversion in parsed:
+            if field is None:
+                self.parts.append((literal, None, None, None, None))
+                continue
+            name, _, default = field.partition('|')
+            # Plain names only: no attribute or index access into the event data
+            if not name.isidentifier():
+                raise TemplateError(f"Invalid placeholder {{{field}}}: use {{name}} or {{name|default}}.")
+            if conversion and conversion not in 'sra':
+                raise TemplateError(f"Invalid conversion !{conversion} in {{{field}}}")
+            check_format_spec(field, spec)
+            self.names.add(name)
+            self.parts.append((literal, name, default, CONVERSIONS.get(conversion), spec))
+
+    def render_data(self, data: Dict[str, Any]) -> str:
+        out = []
+        for literal, name, default, convert, spec in self.parts:
+            if literal:
+                out.append(literal)
+            if name is not None:
+                value = data.get(name, default)
+                if convert:
+                    value = convert(value)
+                out.append(format(value, spec))
+        return ''.join(out)
+
+    def render(self, data: Dict[str, Any], extra: Optional[Dict[str, Any]] = None) -> str:
+        if extra:
+            data = {**data, **extra}
+        return self.render_data(data)
+
+
+class DiscordFormatter:
+    """Builds one Discord embed for an event type from compiled templates"""
+
+    def __init__(self, event_type: str, title: Optional[str] = None, description: Optional[str] = None,
+                 color: Optional[int] = None, fields: Optional[List[Dict[str, Any]]] = None):
+        self.title = CompiledTemplate(title or EVENT_TITLES.get(event_type, 'Zentry Notification'))
+        self.description = CompiledTemplate(description) if description else None
+        self.color = color if color is not None else DISCORD_COLORS.get(event_type, DISCORD_DEFAULT_COLOR)
+        if not isinstance(self.color, int):
+            raise TemplateError("Discord color must be an integer.")
+        self.fields = []
+        for field in fields or []:
+            if not isinstance(field, dict) or 'name' not in field or 'value' not in field:
+                raise TemplateError("Discord fields need a name and a value.")
+            self.fields.append((CompiledTemplate(field['name']), CompiledTemplate(field['value']), bool(field.get('inline', False))))
+
+    def render(self, data: Dict[str, Any], timestamp: str) -> Dict[str, Any]:
+        embed = {
+            "title": self.title.render_data(data),
+            "color": self.color,
+            "timestamp": timestamp,
+            "footer": dict(DISCORD_FOOTER),
+        }
+        if self.description:
+            embed["description"] = self.description.render_data(data)
+        if self.fields:
+            embed["fields"] = [
+                {"name": name.render_data(data), "value": value.render_data(data), "inline": inline}
+                for name, value, inline in self.fields
+            ]
+        return embed
+
+
+class TeamsFormatter:
+    """Builds the text of a Teams message for an event type from a compiled template"""
+
+    def __init__(self, event_type: str, text: Optional[str] = None):
+        self.event_name = event_type.replace('_', ' ').title()
+        self.text = CompiledTemplate(text or TEAMS_TEMPLATES.get(event_type, TEAMS_FALLBACK_TEMPLATE))
+        self.needs_event_name = 'event_name' in self.text.names
+        self.needs_time = 'time' in self.text.names
+
+    def render(self, data: Dict[str, Any]) -> str:
+        if not (self.needs_event_name or self.needs_time):
+            # Nothing to add to the event data
+            return self.text.render_data(data)
+        extra = {'event_name': self.event_name}
+        if self.needs_time:
+            extra['time'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        return self.text.render(data, extra)
+
+
+def build_registry() -> Dict[Tuple[str, str], Any]:
+    """Compile the built-in formatter for every (webhook_type, event_type)"""
+    registry = {}
+    for event_type, _ in WebhookIntegration.EVENT_TYPES:
+        registry[('discord', event_type)] = DiscordFormatter(event_type, **DISCORD_TEMPLATES.get(event_type, {}))
+        registry[('teams', event_type)] = TeamsFormatter(event_type)
+    return registry
+
+
+# Built once when the app loads; formatters for ad-hoc event types (e.g. 'test') are added on first use
+REGISTRY = build_registry()
+
+
+def compile_override(webhook_type: str, event_type: str, template: Any):
+    """
+    Compile a user template for one event type
+
+    Discord templates are a dict with any of title, description, color and fields
+    (a plain string is shorthand for the description); Teams templates are the
+    message text. Raises TemplateError when the template is malformed.
+    """
+    if webhook_type == 'discord':
+        if isinstance(template, str):
+            template = {'description': template}
+        if not isinstance(template, dict):
+            raise TemplateError("Discord templates must be a string or an object.")
+        unknown = set(template) - {'title', 'description', 'color', 'fields'}
+        if unknown:
+            raise TemplateError(f"Unknown Discord template keys: {', '.join(sorted(unknown))}.")
+        return DiscordFormatter(event_type, **template)
+    if webhook_type == 'teams':
+        if not isinstance(template, str):
+            raise TemplateError("Teams templates must be a string.")
+        return TeamsFormatter(event_type, template)
+    raise TemplateError(f"Unsupported webhook type: {webhook_type}")
+
+
+@lru_cache(maxsize=512)
+def _cached_override(webhook_type: str, event_type: str, template_json: str):
+    # Keyed by template content, so edited templates compile fresh and stale ones age out
+    return compile_override(webhook_type, event_type, json.loads(template_json))
+
+
+def get_formatter(webhook_type: str, event_type: str, templates: Optional[Dict[str, Any]] = None):
+    """The integration's override for event_type if it has one, otherwise the built-in formatter"""
+    template = (templates or {}).get(event_type)
+    if template:
+        try:
+            return _cached_override(webhook_type, event_type, json.dumps(template, sort_keys=True))
+        except TemplateError as e:
+            logger.warning(f"Ignoring invalid {webhook_type} template for {event_type}: {e}")
+    formatter = REGISTRY.get((webhook_type, event_type))
+    if formatter is None:
+        if webhook_type == 'discord':
+            formatter = DiscordFormatter(event_type)
+        elif webhook_type == 'teams':
+            formatter = TeamsFormatter(event_type)
+        else:
+            raise ValueError(f"Unsupported webhook type: {webhook_type}")
+        REGISTRY[(webhook_type, event_type)] = formatter
+    return formatter
+
+
+def format_batch(webhook_type: str, events: Iterable[Tuple[str, Dict[str, Any]]],
+                 templates: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Request body for one or more (event_type, data) events going to the same integration
+
+    Formatters are resolved once per event type and Discord embeds share one timestamp,
+    so the per-event cost is just the compiled templates.
+    """
+    if webhook_type == 'discord':
+        args = (timezone.now().isoformat(),)
+    elif webhook_type == 'teams':
+        args = ()
+    else:
+        raise ValueError(f"Unsupported webhook type: {webhook_type}")
+
+    formatters = {}
+    rendered = []
+    for event_type, data in events:
+        formatter = formatters.get(event_type)
+        if formatter is None:
+            formatter = formatters[event_type] = get_formatter(webhook_type, event_type, templates)
+        try:
+            rendered.append(formatter.render(data, *args))
+        except (ValueError, TypeError) as e:
+            rendered.append(_render_default(formatter, webhook_type, event_type, data, args, e))
+
+    if webhook_type == 'discord':
+        return {"embeds": rendered}
+    return {"text": "\n\n---\n\n".join(rendered)}
+
+
+def format_embed(event_type: str, data: Dict[str, Any], templates: Optional[Dict[str, Any]] = None,
+                 timestamp: Optional[str] = None) -> Dict[str, Any]:
+    """Discord embed for one event"""
+    args = (timestamp or timezone.now().isoformat(),)
+    formatter = get_formatter('discord', event_type, templates)
+    try:
+        return formatter.render(data, *args)
+    except (ValueError, TypeError) as e:
+        return _render_default(formatter, 'discord', event_type, data, args, e)
+
+
+def format_text(event_type: str, data: Dict[str, Any], templates: Optional[Dict[str, Any]] = None) -> str:
+    """Teams message text for one event"""
+    formatter = get_formatter('teams', event_type, templates)
+    try:
+        return formatter.render(data)
+    except (ValueError, TypeError) as e:
+        return _render_default(formatter, 'teams', event_type, data, (), e)
+
+
+def _render_default(formatter, webhook_type: str, event_type: str, data: Dict[str, Any], args, error: Exception):
+    # A user template can still fail on unexpected data (e.g. {points:d} given a string)
+    default = get_formatter(webhook_type, event_type)
+    if formatter is default:
+        raise error
+    logger.warning(f"{webhook_type} template for {event_type} failed to render, using the default: {error}")
+    return default.render(data, *args)
+
+
+DIGEST_TITLES = {
+    'hourly': 'Hourly Digest',
+    'daily': 'Daily Digest',
+}
+
+
+def format_digest(webhook_type: str, digest: Dict[str, Any]) -> Dict[str, Any]:
+    """Request body for one digest summary (see notifications.digest.summarize)"""
+    title = f"{DIGEST_TITLES.get(digest['mode'], 'Digest')}: {digest['project_name']}"
+    period = f"{timezone.localtime(digest['first_at']):%Y-%m-%d %H:%M} – {timezone.localtime(digest['last_at']):%H:%M}"
+    counts = ', '.join(
+        f"{count} {EVENT_TITLES.get(event_type, event_type.replace('_', ' ').title()).lower()}"
+        for event_type, count in sorted(digest['events'].items(), key=lambda item: -item[1])
+    )
+    sections = []
+    if digest['completed']:
+        sections.append(('Tasks Completed', '\n'.join(
+            f"**{user}**: {count}" for user, count in digest['completed']
+        )))
+    if digest['top_xp']:
+        sections.append(('Top XP', '\n'.join(
+            f"{medal} **{user}**: {xp} XP" for medal, (user, xp) in zip(['🥇', '🥈', '🥉', '4.', '5.'], digest['top_xp'])
+        )))
+    if digest['badges']:
+        sections.append(('Badges Earned', '\n'.join(
+            f"🏆 **{user}**: {', '.join(badges)}" for user, badges in digest['badges']
+        )))
+
+    if webhook_type == 'discord':
+        embed = {
+            "title": f"📊 {title}",
+            "description": f"{digest['total']} events ({counts})\n{period}",
+            "color": DISCORD_COLORS['task_completed'],
+            "timestamp": timezone.now().isoformat(),
+            "footer": dict(DISCORD_FOOTER),
+            # Discord caps field values at 1024 characters
+            "fields": [{"name": name, "value": value[:1024], "inline": False} for name, value in sections],
+        }
+        return {"embeds": [embed]}
+    elif webhook_type == 'teams':
+        text = f"📊 **{title}**\n\n**{digest['total']} events** ({counts})\n\n{period}"
+        for name, value in sections:
+            text += f"\n\n**{name}**\n\n" + value.replace('\n', '\n\n')
+        return {"text": text}
+    else:
+        raise ValueError(f"Unsupported webhook type: {webhook_type}")
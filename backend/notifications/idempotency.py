@@ -0,0 +1,53 @@
+import hashlib
+import json
+from datetime import timedelta
+from typing import Any, Dict, Iterable, Set
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from .models import NotificationLog
+
+MAX_KEY_LENGTH = 128
+
+
+def default_event_key(event_type: str, data: Dict[str, Any]) -> str:
+    """Stable key for events raised without one: the event type plus a hash of its payload"""
+    digest = hashlib.sha256(json.dumps(data, sort_keys=True, cls=DjangoJSONEncoder).encode('utf-8')).hexdigest()
+    return f"{event_type}:{digest[:32]}"
+
+
+def delivery_key(integration_id: int, event_key: str) -> str:
+    """Idempotency key of one event's delivery to one integration"""
+    key = f"{integration_id}:{event_key}"
+    if len(key) > MAX_KEY_LENGTH:
+        key = f"{integration_id}:sha256:{hashlib.sha256(event_key.encode('utf-8')).hexdigest()}"
+    return key
+
+
+def dedup_cutoff():
+    return timezone.now() - timedelta(seconds=getattr(settings, 'WEBHOOK_DEDUP_WINDOW_SECONDS', 3600))
+
+
+def recently_queued(keys: Iterable[str]) -> Set[str]:
+    """Keys that already have a log inside the dedup window, whatever its status"""
+    keys = [key for key in keys if key]
+    if not keys or not getattr(settings, 'WEBHOOK_DEDUP_WINDOW_SECONDS', 3600):
+        return set()
+    return set(
+        NotificationLog.objects.filter(idempotency_key__in=keys, created_at__gte=dedup_cutoff())
+        .values_list('idempotency_key', flat=True)
+    )
+
+
+def recently_sent(keys: Iterable[str], exclude_ids: Iterable[int] = ()) -> Set[str]:
+    """Keys already delivered successfully inside the dedup window by some other log"""
+    keys = [key for key in keys if key]
+    if not keys or not getattr(settings, 'WEBHOOK_DEDUP_WINDOW_SECONDS', 3600):
+        return set()
+    return set(
+        NotificationLog.objects.filter(idempotency_key__in=keys, status='sent', created_at__gte=dedup_cutoff())
+        .exclude(id__in=list(exclude_ids))
+        .values_list('idempotency_key', flat=True)
+    )
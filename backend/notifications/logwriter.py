@@ -0,0 +1,64 @@
+import logging
+import threading
+import time
+from typing import Iterable, List
+
+from django.conf import settings
+
+from .models import NotificationLog
+
+logger = logging.getLogger(__name__)
+
+# Columns a delivery attempt can change
+DELIVERY_FIELDS = [
+    'status', 'response_status_code', 'response_blob', 'error_message',
+    'retry_count', 'duration_ms', 'next_attempt_at', 'sent_at',
+]
+
+
+class LogWriter:
+    """
+    Buffers delivery results and persists them with bulk_update
+
+    Delivery threads add finished logs; the buffer is written in one statement once
+    it holds `flush_size` rows or `flush_interval` seconds have passed, instead of
+    one UPDATE per message competing with the API for the database write lock.
+    """
+
+    def __init__(self, flush_size: int = None, flush_interval: float = None):
+        self.flush_size = flush_size or getattr(settings, 'WEBHOOK_LOG_FLUSH_SIZE', 100)
+        if flush_interval is None:
+            flush_interval = getattr(settings, 'WEBHOOK_LOG_FLUSH_INTERVAL', 2.0)
+        self.flush_interval = flush_interval
+        self._buffer: List[NotificationLog] = []
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    def add(self, logs: Iterable[NotificationLog]):
+        with self._lock:
+            self._buffer.extend(logs)
+            full = len(self._buffer) >= self.flush_size
+        if full:
+            self.flush()
+
+    def flush_if_due(self):
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self) -> int:
+        with self._lock:
+            pending, self._buffer = self._buffer, []
+            self._last_flush = time.monotonic()
+        if not pending:
+            return 0
+
+        try:
+            NotificationLog.objects.bulk_update(pending, DELIVERY_FIELDS, batch_size=self.flush_size)
+        except Exception as e:
+            logger.error(f"Failed to write {len(pending)} notification logs: {e}")
+            # Rows stay 'processing' and are re-delivered after WEBHOOK_CLAIM_TIMEOUT
+            return 0
+        return len(pending)
+
+    def __len__(self):
+        return len(self._buffer)
@@ -0,0 +1,108 @@
+import gzip
+import json
+import os
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from notifications.blobs import load_texts, prune
+from notifications.models import NotificationLog
+
+# Every column, so the archive never silently drops one added to the model later
+ARCHIVE_FIELDS = [field.attname for field in NotificationLog._meta.concrete_fields]
+
+
+class Command(BaseCommand):
+    help = 'Move notification logs older than the retention window into gzip NDJSON archives (one file per month)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=getattr(settings, 'NOTIFICATION_LOG_RETENTION_DAYS', 30),
+            help='Keep logs newer than this many days in the database (defaults to NOTIFICATION_LOG_RETENTION_DAYS)'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Rows read, archived and deleted per transaction-sized chunk'
+        )
+        parser.add_argument(
+            '--archive-dir',
+            type=str,
+            default=str(getattr(settings, 'NOTIFICATION_LOG_ARCHIVE_DIR', 'archive/notification_logs')),
+            help='Directory for the monthly archive files'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report how many rows would be archived without touching anything'
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        chunk_size = options['chunk_size']
+        archive_dir = Path(options['archive_dir'])
+
+        # Only finished deliveries are archived; anything the worker may still touch stays put
+        expired = NotificationLog.objects.filter(
+            created_at__lt=cutoff,
+            status__in=NotificationLog.TERMINAL_STATUSES
+        )
+
+        if options['dry_run']:
+            self.stdout.write(f'{expired.count()} notification logs older than {cutoff:%Y-%m-%d} would be archived')
+            return
+
+        archive_dir.mkdir(parents=True, exist_ok=True)
+        total = 0
+        last_id = 0
+        while True:
+            rows = list(
+                expired.filter(id__gt=last_id)
+                .order_by('id')
+                .values(*ARCHIVE_FIELDS)[:chunk_size]
+            )
+            if not rows:
+                break
+
+            self._append(archive_dir, rows)
+            # Delete only after the chunk is safely on disk; a crash in between re-archives the
+            # chunk on the next run rather than losing it
+            NotificationLog.objects.filter(id__in=[row['id'] for row in rows]).delete()
+
+            total += len(rows)
+            last_id = rows[-1]['id']
+            self.stdout.write(f'Archived {total} logs...')
+
+        # Payloads and responses only the archived logs used are no longer needed
+        pruned = prune()
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Archived {total} notification logs older than {cutoff:%Y-%m-%d} to {archive_dir} '
+            f'({pruned} unused payload blobs removed)'
+        ))
+
+    def _append(self, archive_dir: Path, rows):
+        # Archives keep the inline payload and response body, whatever the database layout
+        texts = load_texts(row[field] for row in rows for field in ['payload_blob_id', 'response_blob_id'])
+        for row in rows:
+            row['payload'] = json.loads(texts.get(row.pop('payload_blob_id'), '{}'))
+            row['response_body'] = texts.get(row.pop('response_blob_id'), '')
+
+        by_month = {}
+        for row in rows:
+            by_month.setdefault(row['created_at'].strftime('%Y-%m'), []).append(row)
+
+        for month, month_rows in by_month.items():
+            path = archive_dir / f'notification-logs-{month}.ndjson.gz'
+            # Appending writes a new gzip member; concatenated members read back as one stream
+            with open(path, 'ab') as raw:
+                with gzip.GzipFile(fileobj=raw, mode='ab') as archive:
+                    for row in month_rows:
+                        archive.write(json.dumps(row, cls=DjangoJSONEncoder).encode('utf-8') + b'\n')
+                raw.flush()
+                os.fsync(raw.fileno())
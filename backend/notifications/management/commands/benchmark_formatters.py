@@ -0,0 +1,77 @@
+import timeit
+from django.core.management.base import BaseCommand
+from notifications.formatters import compile_override, format_batch, format_embed, format_text
+from notifications.models import WebhookIntegration
+
+SAMPLE_PAYLOADS = {
+    'task_completed': {
+        'task_id': 1, 'task_title': 'Ship the release', 'user_name': 'alice',
+        'project_name': 'Zentry', 'project_id': 1, 'points': 25,
+    },
+    'badge_earned': {
+        'badge_id': 1, 'badge_name': 'Early Bird', 'badge_description': 'Completed a task before 8am',
+        'user_name': 'alice', 'user_id': 1,
+    },
+    'project_created': {
+        'project_id': 1, 'project_name': 'Zentry', 'project_description': 'Gamified project management',
+        'user_name': 'alice', 'user_id': 1,
+    },
+    'milestone_reached': {
+        'milestone_name': 'Beta', 'project_name': 'Zentry', 'project_id': 1, 'progress': 50,
+    },
+    'daily_streak': {
+        'user_name': 'alice', 'user_id': 1, 'streak_days': 7, 'streak_type': 'Daily task completion',
+    },
+}
+
+SAMPLE_OVERRIDES = {
+    'discord': {
+        'title': '✅ {task_title}',
+        'description': '{user_name|Someone} closed **{task_title}** in {project_name} (+{points|0} XP)',
+        'fields': [{'name': 'Task', 'value': '#{task_id}', 'inline': True}],
+    },
+    'teams': '✅ {user_name|Someone} closed {task_title} in {project_name} (+{points|0} XP)',
+}
+
+
+class Command(BaseCommand):
+    help = 'Measure the cost of formatting one event into a Discord embed or Teams message'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20000, help='Renders timed per formatter')
+        parser.add_argument('--batch', type=int, default=10, help='Events per message when timing batched formatting')
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        batch = options['batch']
+
+        def per_event(func, events=1):
+            return timeit.timeit(func, number=iterations) / (iterations * events) * 1_000_000
+
+        def row(label, discord, teams):
+            self.stdout.write(f'{label:<24}{discord:>10.2f}µs{teams:>10.2f}µs')
+
+        self.stdout.write(f'Formatting cost per event ({iterations} iterations each)')
+        self.stdout.write(f'{"":<24}{"discord":>12}{"teams":>12}')
+        for event_type, _ in WebhookIntegration.EVENT_TYPES:
+            data = SAMPLE_PAYLOADS.get(event_type, {})
+            row(event_type, per_event(lambda: format_embed(event_type, data)), per_event(lambda: format_text(event_type, data)))
+
+        events = [('task_completed', SAMPLE_PAYLOADS['task_completed'])] * batch
+        row(
+            f'batch of {batch}',
+            per_event(lambda: format_batch('discord', events), batch),
+            per_event(lambda: format_batch('teams', events), batch),
+        )
+
+        templates = {webhook_type: {'task_completed': template} for webhook_type, template in SAMPLE_OVERRIDES.items()}
+        row(
+            f'override, batch of {batch}',
+            per_event(lambda: format_batch('discord', events, templates['discord']), batch),
+            per_event(lambda: format_batch('teams', events, templates['teams']), batch),
+        )
+        row(
+            'override compile',
+            per_event(lambda: compile_override('discord', 'task_completed', SAMPLE_OVERRIDES['discord'])),
+            per_event(lambda: compile_override('teams', 'task_completed', SAMPLE_OVERRIDES['teams'])),
+        )
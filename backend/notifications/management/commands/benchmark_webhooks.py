@@ -0,0 +1,178 @@
+import math
+import time
+import uuid
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from tasks.models import Project
+from notifications.models import WebhookIntegration, NotificationLog
+from notifications.services import trigger_webhook_notifications
+from notifications.sink import WebhookSinkServer
+from notifications.worker import OutboxWorker
+from notifications.transport import close_sessions
+from notifications.metrics import recorder
+
+User = get_user_model()
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not values:
+        return None
+    rank = max(math.ceil(pct / 100 * len(values)) - 1, 0)
+    return values[rank]
+
+
+class Command(BaseCommand):
+    help = (
+        'Drive synthetic events through the notification pipeline against a local webhook sink '
+        'and report throughput, delivery latency and log write rate. Run against a development database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--events', type=int, default=500, help='Number of events to trigger')
+        parser.add_argument('--discord', type=int, default=1, help='Discord-style integrations subscribed to the events')
+        parser.add_argument('--teams', type=int, default=1, help='Teams-style integrations subscribed to the events')
+        parser.add_argument(
+            '--sink-url',
+            type=str,
+            help='Base URL of a running webhook_sink; by default a sink is started inside this command'
+        )
+        parser.add_argument('--latency-ms', type=float, default=50.0, help='Latency of the built-in sink')
+        parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of 5xx answers from the built-in sink')
+        parser.add_argument('--sink-rate-limit', type=float, default=0.0, help='Per-webhook 429 threshold of the built-in sink')
+        parser.add_argument(
+            '--integration-rate',
+            type=float,
+            default=1000.0,
+            help='rate_limit_per_second of the benchmark integrations (high by default so the sink is the bottleneck)'
+        )
+        parser.add_argument('--batch-window', type=int, default=0, help='batch_window_seconds of the benchmark integrations')
+        parser.add_argument('--threads', type=int, help='Worker threads (defaults to WEBHOOK_WORKER_THREADS)')
+        parser.add_argument('--batch-size', type=int, help='Rows claimed per batch (defaults to WEBHOOK_WORKER_BATCH_SIZE)')
+        parser.add_argument('--timeout', type=float, default=120.0, help='Stop draining after this many seconds')
+        parser.add_argument('--keep', action='store_true', help='Keep the benchmark project, integrations and logs')
+
+    def handle(self, *args, **options):
+        if options['events'] < 1 or options['discord'] + options['teams'] < 1:
+            raise CommandError('Need at least one event and one integration')
+
+        sink = None
+        base_url = options.get('sink_url')
+        if not base_url:
+            sink = WebhookSinkServer(
+                ('127.0.0.1', 0),
+                latency_ms=options['latency_ms'],
+                error_rate=options['error_rate'],
+                rate_limit=options['sink_rate_limit'],
+            )
+            sink.start_in_background()
+            base_url = sink.url
+        base_url = base_url.rstrip('/')
+
+        run_id = uuid.uuid4().hex[:8]
+        user, project, integrations = self._create_fixtures(run_id, base_url, options)
+        integration_ids = [integration.id for integration in integrations]
+        logs = NotificationLog.objects.filter(webhook_integration_id__in=integration_ids)
+
+        try:
+            self.stdout.write(self.style.SUCCESS(
+                f'Benchmark {run_id}: {options["events"]} events x {len(integrations)} integrations -> {base_url}'
+            ))
+
+            # Phase 1: trigger events (outbox inserts, or inline sends when async delivery is off)
+            started = time.perf_counter()
+            for i in range(options['events']):
+                trigger_webhook_notifications('task_completed', {
+                    'task_id': i,
+                    'task_title': f'Benchmark task {i}',
+                    'user_name': user.username,
+                    'project_name': project.name,
+                    'project_id': project.id,
+                    'points': 10,
+                    'completed_at': timezone.now().isoformat(),
+                }, project.id, idempotency_key=f'benchmark:{run_id}:{i}')
+            trigger_seconds = time.perf_counter() - started
+            queued = logs.count()
+
+            # Phase 2: drain the outbox, including retries that come due while we wait
+            drain_seconds = self._drain(logs, options)
+
+            self._report(logs, queued, trigger_seconds, drain_seconds, options)
+            if sink:
+                summary = ', '.join(f'{key}: {count}' for key, count in sorted(sink.stats.items(), key=lambda item: str(item[0])))
+                self.stdout.write(f'  Sink responses:      {summary}')
+        finally:
+            if sink:
+                sink.shutdown()
+                sink.server_close()
+            if not options['keep']:
+                # Cascades to the integrations, their subscriptions and logs
+                project.delete()
+                user.delete()
+
+    def _create_fixtures(self, run_id, base_url, options):
+        user = User.objects.create_user(username=f'webhook-benchmark-{run_id}', password=uuid.uuid4().hex)
+        project = Project.objects.create(name=f'Webhook benchmark {run_id}', created_by=user)
+        integrations = []
+        for webhook_type in ['discord', 'teams']:
+            for i in range(options[webhook_type]):
+                integrations.append(WebhookIntegration.objects.create(
+                    name=f'Benchmark {webhook_type} {i}',
+                    webhook_type=webhook_type,
+                    webhook_url=f'{base_url}/{webhook_type}/{run_id}-{i}',
+                    project=project,
+                    created_by=user,
+                    event_types=['task_completed'],
+                    batch_window_seconds=options['batch_window'],
+                    rate_limit_per_second=options['integration_rate'],
+                ))
+        return user, project, integrations
+
+    def _drain(self, logs, options):
+        worker = OutboxWorker(threads=options.get('threads'), batch_size=options.get('batch_size'))
+        started = time.perf_counter()
+        try:
+            while time.perf_counter() - started < options['timeout']:
+                if worker.process_batch():
+                    continue
+                worker.writer.flush()
+                if not logs.exclude(status__in=NotificationLog.TERMINAL_STATUSES).exists():
+                    break
+                time.sleep(0.1)
+        finally:
+            worker.executor.shutdown(wait=True)
+            worker.writer.flush()
+            recorder.flush()
+            close_sessions()
+        return time.perf_counter() - started
+
+    def _report(self, logs, queued, trigger_seconds, drain_seconds, options):
+        rows = list(logs.values('status', 'retry_count', 'created_at', 'sent_at'))
+        statuses = {}
+        for row in rows:
+            statuses[row['status']] = statuses.get(row['status'], 0) + 1
+        sent = statuses.get('sent', 0)
+        latencies = sorted(
+            (row['sent_at'] - row['created_at']).total_seconds() * 1000
+            for row in rows if row['status'] == 'sent' and row['sent_at']
+        )
+        finished = sum(statuses.get(status, 0) for status in NotificationLog.TERMINAL_STATUSES)
+        retries = sum(row['retry_count'] for row in rows)
+
+        def rate(count, seconds):
+            return count / seconds if seconds > 0 else 0.0
+
+        def ms(value):
+            return f'{value:.1f} ms' if value is not None else 'n/a'
+
+        self.stdout.write(f'  Trigger:             {options["events"]} events in {trigger_seconds:.2f}s '
+                          f'({rate(options["events"], trigger_seconds):.1f} events/s)')
+        self.stdout.write(f'  Log inserts:         {queued} rows ({rate(queued, trigger_seconds):.1f} rows/s)')
+        self.stdout.write(f'  Drain:               {finished} rows finished in {drain_seconds:.2f}s '
+                          f'({rate(finished, drain_seconds):.1f} log updates/s)')
+        self.stdout.write(f'  Delivery throughput: {rate(sent, trigger_seconds + drain_seconds):.1f} sent/s end to end')
+        self.stdout.write(f'  Delivery latency:    p50 {ms(percentile(latencies, 50))}, '
+                          f'p99 {ms(percentile(latencies, 99))}, max {ms(latencies[-1] if latencies else None)}')
+        self.stdout.write(f'  Retries:             {retries}')
+        self.stdout.write(f'  Final status:        ' + ', '.join(f'{status}: {count}' for status, count in sorted(statuses.items())))
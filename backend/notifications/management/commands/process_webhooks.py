@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+from notifications.worker import OutboxWorker
+
+
+class Command(BaseCommand):
+    help = 'Run the webhook delivery worker that sends queued notifications from the outbox'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads',
+            type=int,
+            help='Number of delivery threads (defaults to WEBHOOK_WORKER_THREADS)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            help='Number of pending notifications claimed per batch (defaults to WEBHOOK_WORKER_BATCH_SIZE)'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            help='Seconds to sleep when the outbox is empty (defaults to WEBHOOK_WORKER_POLL_INTERVAL)'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Drain the outbox and exit instead of polling forever'
+        )
+
+    def handle(self, *args, **options):
+        worker = OutboxWorker(
+            threads=options.get('threads'),
+            batch_size=options.get('batch_size'),
+        )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Starting webhook worker {worker.worker_id} '
+            f'({worker.threads} threads, batch size {worker.batch_size})'
+        ))
+
+        try:
+            worker.run(poll_interval=options.get('poll_interval'), once=options['once'])
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING('Webhook worker stopped'))
+            return
+
+        self.stdout.write(self.style.SUCCESS('✓ Outbox drained'))
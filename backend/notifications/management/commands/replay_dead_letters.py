@@ -0,0 +1,85 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime, parse_date
+from django.utils import timezone
+from datetime import datetime, time
+from notifications.replay import dead_letters, replay_dead_letters, requeue_dead_letters
+
+
+def parse_when(value):
+    """Accept an ISO datetime or a plain date (midnight, current timezone)"""
+    if not value:
+        return None
+    when = parse_datetime(value)
+    if when is None:
+        day = parse_date(value)
+        if day is None:
+            raise CommandError(f"Invalid date/time: {value}")
+        when = datetime.combine(day, time.min)
+    if timezone.is_naive(when):
+        when = timezone.make_aware(when)
+    return when
+
+
+class Command(BaseCommand):
+    help = 'Re-send permanently failed webhook notifications (dead letters) at a controlled rate'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--integration', type=int, help='Only replay logs for this webhook integration ID')
+        parser.add_argument('--event-type', type=str, help='Only replay logs for this event type')
+        parser.add_argument('--since', type=str, help='Only replay logs created at or after this date/time')
+        parser.add_argument('--until', type=str, help='Only replay logs created before this date/time')
+        parser.add_argument(
+            '--rate',
+            type=float,
+            help='Maximum sends started per second (defaults to WEBHOOK_REPLAY_RATE)'
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            help='Maximum sends in flight (defaults to WEBHOOK_WORKER_THREADS)'
+        )
+        parser.add_argument(
+            '--requeue',
+            action='store_true',
+            help='Hand the logs back to the process_webhooks worker instead of sending from this command'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report how many dead letters match'
+        )
+
+    def handle(self, *args, **options):
+        if options.get('rate') is not None and not options['rate'] > 0:
+            raise CommandError("--rate must be greater than zero")
+        queryset = dead_letters(
+            integration_id=options.get('integration'),
+            event_type=options.get('event_type'),
+            since=parse_when(options.get('since')),
+            until=parse_when(options.get('until')),
+        )
+
+        if options['dry_run']:
+            self.stdout.write(f'{queryset.count()} dead letters match')
+            return
+
+        if options['requeue']:
+            requeued = requeue_dead_letters(queryset, rate=options.get('rate'))
+            self.stdout.write(self.style.SUCCESS(f'✓ Requeued {requeued} dead letters for the worker'))
+            return
+
+        def progress(results):
+            summary = ', '.join(f'{status}: {count}' for status, count in sorted(results.items()))
+            self.stdout.write(f'Replayed {sum(results.values())} ({summary})')
+
+        results = replay_dead_letters(
+            queryset,
+            rate=options.get('rate'),
+            concurrency=options.get('concurrency'),
+            progress=progress,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ Replay finished: {results.get('sent', 0)} sent, "
+            f"{results.get('failed', 0)} failed again, "
+            f"{sum(results.values()) - results.get('sent', 0) - results.get('failed', 0)} deferred to the worker"
+        ))
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Min
+from django.utils import timezone
+from notifications.digest import send_due_digests
+from notifications.models import NotificationLog
+
+
+class Command(BaseCommand):
+    help = 'Send digest summaries for integrations in hourly or daily delivery mode'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--integration', type=int, help='Only send the digest of this webhook integration ID')
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Send everything on hold now instead of waiting for the digest period to end'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only show how many events each integration has on hold'
+        )
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            held = NotificationLog.objects.filter(status='digest')
+            if options.get('integration'):
+                held = held.filter(webhook_integration_id=options['integration'])
+            rows = (
+                held.values('webhook_integration', 'webhook_integration__name')
+                .annotate(events=Count('id'), due_at=Min('next_attempt_at'))
+                .order_by('due_at')
+            )
+            for row in rows:
+                self.stdout.write(
+                    f"{row['webhook_integration__name']} (#{row['webhook_integration']}): "
+                    f"{row['events']} events, due {timezone.localtime(row['due_at']):%Y-%m-%d %H:%M}"
+                )
+            if not rows:
+                self.stdout.write('No events on hold')
+            return
+
+        results = send_due_digests(integration_id=options.get('integration'), force=options['force'])
+        if not results:
+            self.stdout.write('No digests due')
+            return
+        summary = ', '.join(f'{outcome}: {count}' for outcome, count in sorted(results.items()))
+        self.stdout.write(self.style.SUCCESS(f'✓ Digests processed ({summary} events)'))
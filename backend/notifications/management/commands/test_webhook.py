@@ -98,12 +98,14 @@ class Command(BaseCommand):
             self.stdout.write(f'Triggering {event_type} webhook notification...')
             
             # Trigger the webhook notifications
-            trigger_webhook_notifications(event_type, data, project.id)
+            logs = trigger_webhook_notifications(event_type, data, project.id)
             
             self.stdout.write(self.style.SUCCESS(f'✓ Webhook notification triggered successfully!'))
+            self.stdout.write(f'Queued: {len(logs)} notification(s)')
             self.stdout.write(f'Event: {event_type}')
             self.stdout.write(f'Project: {project.name}')
-            self.stdout.write('\nCheck the notification logs in the admin or via API to see the results.')
+            self.stdout.write('\nRun `python manage.py process_webhooks --once` to deliver queued notifications,')
+            self.stdout.write('then check the notification logs in the admin or via API to see the results.')
             
         except Project.DoesNotExist:
             self.stdout.write(self.style.ERROR(f'Project with ID {project_id} not found'))
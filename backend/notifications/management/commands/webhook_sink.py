@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+from notifications.sink import WebhookSinkServer
+
+
+class Command(BaseCommand):
+    help = 'Run a local HTTP receiver that mimics Discord and Teams webhooks for load testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', type=str, default='127.0.0.1', help='Address to bind')
+        parser.add_argument('--port', type=int, default=8787, help='Port to listen on')
+        parser.add_argument('--latency-ms', type=float, default=50.0, help='Response latency in milliseconds')
+        parser.add_argument('--jitter-ms', type=float, default=0.0, help='Random +/- latency in milliseconds')
+        parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests answered with a random 5xx')
+        parser.add_argument(
+            '--rate-limit',
+            type=float,
+            default=0.0,
+            help='Requests per second allowed per webhook path before answering 429 (0 disables)'
+        )
+        parser.add_argument('--retry-after', type=float, default=1.0, help='Retry-After seconds sent with 429 responses')
+
+    def handle(self, *args, **options):
+        server = WebhookSinkServer(
+            (options['host'], options['port']),
+            latency_ms=options['latency_ms'],
+            jitter_ms=options['jitter_ms'],
+            error_rate=options['error_rate'],
+            rate_limit=options['rate_limit'],
+            retry_after=options['retry_after'],
+        )
+
+        self.stdout.write(self.style.SUCCESS(f'Webhook sink listening on {server.url}'))
+        self.stdout.write(f'  Discord-style URL: {server.url}/discord/<name>  (204, empty body)')
+        self.stdout.write(f'  Teams-style URL:   {server.url}/teams/<name>    (200, body "1")')
+
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+
+        self.stdout.write('\n' + self.style.WARNING('Webhook sink stopped'))
+        for key, count in sorted(server.stats.items(), key=lambda item: str(item[0])):
+            self.stdout.write(f'  {key}: {count}')
@@ -0,0 +1,356 @@
+import atexit
+import bisect
+import logging
+import threading
+import time
+from collections import defaultdict
+from datetime import timedelta
+from typing import Any, Dict, List, Optional, Union
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import Count, F, Min
+from django.utils import timezone
+
+from .models import DeliveryStats, DeliveryTotal, NotificationLog, WebhookIntegration
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the request latency histogram; slower requests land in a final overflow bucket
+LATENCY_BUCKETS_MS = [50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+# Delivery outcome -> DeliveryStats column
+OUTCOME_FIELDS = {
+    'sent': 'sent',
+    'failed': 'failed',
+    'retry': 'retried',
+    'skipped': 'skipped',
+    'deferred': 'deferred',
+}
+
+COUNTER_FIELDS = list(OUTCOME_FIELDS.values()) + ['requests', 'duration_sum_ms']
+
+# DeliveryTotal counter names of the latency buckets, in LATENCY_BUCKETS_MS order plus overflow
+BUCKET_COUNTERS = [f'le_{bound}' for bound in LATENCY_BUCKETS_MS] + ['le_inf']
+
+# Outbox statuses reported as queue depth
+QUEUED_STATUSES = ['pending', 'retry', 'processing', 'digest']
+
+
+def _empty_counters() -> Dict[str, Any]:
+    counters = dict.fromkeys(COUNTER_FIELDS, 0)
+    counters['duration_buckets'] = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+    return counters
+
+
+class MetricsRecorder:
+    """
+    Thread-safe in-memory delivery counters, flushed to DeliveryStats minute buckets
+
+    Recording is a dictionary update under a lock and never touches the database, so it
+    adds nothing to a delivery's latency. Counters live per process, which is why they
+    are persisted: the API process reads what the worker processes recorded. A background
+    thread started by the first record() flushes every interval, and whatever is left is
+    flushed at exit.
+    """
+
+    def __init__(self, flush_interval: float = None):
+        if flush_interval is None:
+            flush_interval = getattr(settings, 'WEBHOOK_METRICS_FLUSH_INTERVAL', 10.0)
+        self.flush_interval = flush_interval
+        self._counters = defaultdict(_empty_counters)
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._flusher = None
+
+    def record(self, integration: WebhookIntegration, outcomes: Dict[str, int], duration_ms: Optional[int] = None):
+        """Count delivery outcomes (by log) and, when a request was made, its duration"""
+        minute = timezone.now().replace(second=0, microsecond=0)
+        with self._lock:
+            counters = self._counters[(minute, integration.id, integration.webhook_type)]
+            for outcome, count in outcomes.items():
+                field = OUTCOME_FIELDS.get(outcome)
+                if field:
+                    counters[field] += count
+            if duration_ms is not None:
+                counters['requests'] += 1
+                counters['duration_sum_ms'] += duration_ms
+                counters['duration_buckets'][bisect.bisect_left(LATENCY_BUCKETS_MS, duration_ms)] += 1
+        self.start_background_flush()
+
+    def start_background_flush(self):
+        """Start the flushing thread unless this process already runs one (threads do not survive a fork)"""
+        if self._flusher is not None and self._flusher.is_alive():
+            return
+        with self._lock:
+            if self._flusher is None or not self._flusher.is_alive():
+                self._flusher = threading.Thread(target=self._flush_periodically, name='webhook-metrics', daemon=True)
+                self._flusher.start()
+
+    def _flush_periodically(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush_if_due()
+            finally:
+                close_old_connections()
+
+    def flush_if_due(self):
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self) -> int:
+        with self._lock:
+            pending, self._counters = self._counters, defaultdict(_empty_counters)
+            self._last_flush = time.monotonic()
+        if not pending:
+            return 0
+
+        try:
+            with transaction.atomic():
+                DeliveryStats.objects.bulk_create([
+                    DeliveryStats(minute=minute, webhook_integration_id=integration_id, webhook_type=webhook_type, **counters)
+                    for (minute, integration_id, webhook_type), counters in pending.items()
+                ])
+                totals = defaultdict(_empty_counters)
+                for (minute, integration_id, webhook_type), counters in pending.items():
+                    _add(totals[integration_id], counters)
+                for integration_id, counters in totals.items():
+                    increments = zip(COUNTER_FIELDS + BUCKET_COUNTERS,
+                                     [counters[field] for field in COUNTER_FIELDS] + counters['duration_buckets'])
+                    for counter, delta in increments:
+                        _increment_total(integration_id, counter, delta)
+            retention = getattr(settings, 'WEBHOOK_METRICS_RETENTION_MINUTES', 1440)
+            DeliveryStats.objects.filter(minute__lt=timezone.now() - timedelta(minutes=retention)).delete()
+        except Exception as e:
+            # Metrics are best effort; never let them interfere with delivery
+            logger.error(f"Failed to write delivery metrics: {e}")
+            return 0
+        return len(pending)
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """Counters not flushed yet, in the same shape as DeliveryStats rows"""
+        with self._lock:
+            return [
+                {'minute': minute, 'webhook_integration_id': integration_id, 'webhook_type': webhook_type,
+                 **counters, 'duration_buckets': list(counters['duration_buckets'])}
+                for (minute, integration_id, webhook_type), counters in self._counters.items()
+            ]
+
+
+def _increment_total(integration_id: int, counter: str, delta: int):
+    """Add delta to one DeliveryTotal row with an F() update, creating the row on first use"""
+    if not delta:
+        return
+    key = {'webhook_integration_id': integration_id, 'counter': counter}
+    if DeliveryTotal.objects.filter(**key).update(value=F('value') + delta):
+        return
+    try:
+        with transaction.atomic():
+            DeliveryTotal.objects.create(value=delta, **key)
+    except IntegrityError:
+        # Another process created the row first
+        DeliveryTotal.objects.filter(**key).update(value=F('value') + delta)
+
+
+recorder = MetricsRecorder()
+# Counters recorded since the last flush would otherwise be lost when the process ends
+atexit.register(recorder.flush)
+
+
+def _percentile(buckets: List[int], pct: float) -> Union[int, str, None]:
+    """
+    Estimate a latency percentile from histogram counts (upper bound of the bucket it falls in)
+
+    A percentile in the overflow bucket has no upper bound, so it is reported as the last
+    bound with a '>' marker, e.g. '>10000'; None means no requests were recorded.
+    """
+    total = sum(buckets)
+    if not total:
+        return None
+    rank = total * pct / 100
+    seen = 0
+    for bound, count in zip(LATENCY_BUCKETS_MS, buckets):
+        seen += count
+        if seen >= rank:
+            return bound
+    return f'>{LATENCY_BUCKETS_MS[-1]}'
+
+
+def _summarize(counters: Dict[str, Any]) -> Dict[str, Any]:
+    attempted = counters['sent'] + counters['failed'] + counters['retried']
+    buckets = counters['duration_buckets']
+    return {
+        'sent': counters['sent'],
+        'failed': counters['failed'],
+        'retried': counters['retried'],
+        'skipped': counters['skipped'],
+        'deferred': counters['deferred'],
+        'success_ratio': round(counters['sent'] / attempted, 4) if attempted else None,
+        'latency_ms': {
+            'requests': counters['requests'],
+            'avg': round(counters['duration_sum_ms'] / counters['requests'], 1) if counters['requests'] else None,
+            'p50': _percentile(buckets, 50),
+            'p95': _percentile(buckets, 95),
+            'p99': _percentile(buckets, 99),
+            'buckets': {
+                **{str(bound): count for bound, count in zip(LATENCY_BUCKETS_MS, buckets)},
+                '+Inf': buckets[-1],
+            },
+            'sum': counters['duration_sum_ms'],
+        },
+    }
+
+
+def _add(total: Dict[str, Any], row: Dict[str, Any]):
+    for field in COUNTER_FIELDS:
+        total[field] += row[field]
+    for i, count in enumerate(row['duration_buckets'][:len(total['duration_buckets'])]):
+        total['duration_buckets'][i] += count
+
+
+def queue_stats() -> Dict[str, Any]:
+    """Depth and age of outbox rows that are not finished, per status"""
+    now = timezone.now()
+    rows = (
+        NotificationLog.objects.filter(status__in=QUEUED_STATUSES)
+        .values('webhook_integration', 'status')
+        .annotate(depth=Count('id'), oldest=Min('created_at'))
+        .order_by()
+    )
+    by_status = {status: {'depth': 0, 'oldest_age_seconds': None} for status in QUEUED_STATUSES}
+    by_integration = defaultdict(lambda: {'depth': 0, 'oldest_age_seconds': None})
+    for row in rows:
+        age = round((now - row['oldest']).total_seconds(), 1)
+        for entry in [by_status[row['status']], by_integration[row['webhook_integration']]]:
+            entry['depth'] += row['depth']
+            if entry['oldest_age_seconds'] is None or age > entry['oldest_age_seconds']:
+                entry['oldest_age_seconds'] = age
+    return {
+        'depth': sum(entry['depth'] for entry in by_status.values()),
+        'by_status': by_status,
+        'by_integration': dict(by_integration),
+    }
+
+
+def collect(minutes: int = 60) -> Dict[str, Any]:
+    """
+    Delivery metrics for the last `minutes`, per integration and per webhook type
+
+    Reads the DeliveryStats minute buckets plus this process's unflushed counters,
+    never the notification log itself; only queue depth is counted live.
+    """
+    since = timezone.now().replace(second=0, microsecond=0) - timedelta(minutes=max(minutes - 1, 0))
+    rows = list(DeliveryStats.objects.filter(minute__gte=since).values(
+        'webhook_integration_id', 'webhook_type', 'duration_buckets', *COUNTER_FIELDS
+    ))
+    rows += [row for row in recorder.snapshot() if row['minute'] >= since]
+
+    per_integration = defaultdict(_empty_counters)
+    per_type = defaultdict(_empty_counters)
+    for row in rows:
+        _add(per_integration[row['webhook_integration_id']], row)
+        _add(per_type[row['webhook_type']], row)
+
+    queue = queue_stats()
+    integration_ids = sorted(set(per_integration) | set(queue['by_integration']))
+    details = {
+        integration_id: (name, webhook_type)
+        for integration_id, name, webhook_type in
+        WebhookIntegration.objects.filter(id__in=integration_ids).values_list('id', 'name', 'webhook_type')
+    }
+
+    integrations = []
+    for integration_id in integration_ids:
+        if integration_id not in details:
+            continue  # deleted since its counters were recorded
+        name, webhook_type = details[integration_id]
+        integrations.append({
+            'id': integration_id,
+            'name': name,
+            'webhook_type': webhook_type,
+            **_summarize(per_integration.get(integration_id) or _empty_counters()),
+            'queue': queue['by_integration'].get(integration_id, {'depth': 0, 'oldest_age_seconds': None}),
+        })
+
+    return {
+        'window_minutes': minutes,
+        'generated_at': timezone.now().isoformat(),
+        'integrations': integrations,
+        'webhook_types': {webhook_type: _summarize(counters) for webhook_type, counters in sorted(per_type.items())},
+        'queue': {'depth': queue['depth'], 'by_status': queue['by_status']},
+    }
+
+
+def _labels(**labels) -> str:
+    escaped = (
+        f'{name}="' + str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+        for name, value in labels.items()
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+def cumulative_totals() -> List[Dict[str, Any]]:
+    """Flushed DeliveryTotal counters per integration, with latency buckets as a list"""
+    per_integration = {}
+    rows = DeliveryTotal.objects.values_list(
+        'webhook_integration_id', 'webhook_integration__name', 'webhook_integration__webhook_type', 'counter', 'value'
+    ).order_by('webhook_integration_id')
+    for integration_id, name, webhook_type, counter, value in rows:
+        totals = per_integration.get(integration_id)
+        if totals is None:
+            totals = per_integration[integration_id] = {
+                'id': integration_id, 'name': name, 'webhook_type': webhook_type, **_empty_counters()
+            }
+        if counter in BUCKET_COUNTERS:
+            totals['duration_buckets'][BUCKET_COUNTERS.index(counter)] = value
+        elif counter in COUNTER_FIELDS:
+            totals[counter] = value
+    return list(per_integration.values())
+
+
+def render_prometheus(totals: List[Dict[str, Any]], queue: Dict[str, Any]) -> str:
+    """
+    Prometheus text exposition (format 0.0.4) of cumulative_totals() and queue_stats()
+
+    Delivery counts and the latency histogram are cumulative since each integration was
+    created, so Prometheus can take rate() and increase() over any range. They include
+    what every process has flushed, which lags by at most WEBHOOK_METRICS_FLUSH_INTERVAL.
+    """
+    lines = [
+        '# HELP zentry_webhook_deliveries_total Webhook deliveries by outcome',
+        '# TYPE zentry_webhook_deliveries_total counter',
+    ]
+    for integration in totals:
+        labels = {'integration_id': integration['id'], 'integration': integration['name'], 'webhook_type': integration['webhook_type']}
+        for outcome in ['sent', 'failed', 'retried', 'skipped', 'deferred']:
+            lines.append(f"zentry_webhook_deliveries_total{_labels(**labels, outcome=outcome)} {integration[outcome]}")
+
+    lines += [
+        '# HELP zentry_webhook_request_duration_seconds Webhook HTTP request duration',
+        '# TYPE zentry_webhook_request_duration_seconds histogram',
+    ]
+    for integration in totals:
+        labels = {'integration_id': integration['id'], 'integration': integration['name'], 'webhook_type': integration['webhook_type']}
+        buckets = integration['duration_buckets']
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS_MS, buckets):
+            cumulative += count
+            lines.append(f"zentry_webhook_request_duration_seconds_bucket{_labels(**labels, le=f'{bound / 1000:g}')} {cumulative}")
+        lines.append(f"zentry_webhook_request_duration_seconds_bucket{_labels(**labels, le='+Inf')} {sum(buckets)}")
+        lines.append(f"zentry_webhook_request_duration_seconds_sum{_labels(**labels)} {integration['duration_sum_ms'] / 1000:g}")
+        lines.append(f"zentry_webhook_request_duration_seconds_count{_labels(**labels)} {sum(buckets)}")
+
+    lines += [
+        '# HELP zentry_webhook_queue_depth Notification logs waiting in the outbox',
+        '# TYPE zentry_webhook_queue_depth gauge',
+    ]
+    for status, entry in queue['by_status'].items():
+        lines.append(f"zentry_webhook_queue_depth{_labels(status=status)} {entry['depth']}")
+    lines += [
+        '# HELP zentry_webhook_queue_oldest_age_seconds Age of the oldest notification log waiting in the outbox',
+        '# TYPE zentry_webhook_queue_oldest_age_seconds gauge',
+    ]
+    for status, entry in queue['by_status'].items():
+        lines.append(f"zentry_webhook_queue_oldest_age_seconds{_labels(status=status)} {entry['oldest_age_seconds'] or 0:g}")
+    return '\n'.join(lines) + '\n'
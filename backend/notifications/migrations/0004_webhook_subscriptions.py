@@ -0,0 +1,45 @@
+# Generated by Django 4.2.7 on 2026-10-18 18:07
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def build_subscriptions(apps, schema_editor):
+    WebhookIntegration = apps.get_model('notifications', 'WebhookIntegration')
+    WebhookSubscription = apps.get_model('notifications', 'WebhookSubscription')
+    subscriptions = []
+    for integration in WebhookIntegration.objects.filter(is_active=True):
+        for event_type in set(integration.event_types or []):
+            subscriptions.append(WebhookSubscription(
+                integration_id=integration.id,
+                project_id=integration.project_id,
+                event_type=event_type,
+            ))
+    WebhookSubscription.objects.bulk_create(subscriptions)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0002_initial'),
+        ('notifications', '0003_notification_outbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WebhookSubscription',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_type', models.CharField(max_length=50)),
+                ('integration', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='subscriptions', to='notifications.webhookintegration')),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='tasks.project')),
+            ],
+            options={
+                'verbose_name': 'Webhook Subscription',
+                'verbose_name_plural': 'Webhook Subscriptions',
+                'indexes': [models.Index(fields=['event_type', 'project'], name='webhook_sub_route_idx')],
+                'unique_together': {('integration', 'event_type')},
+            },
+        ),
+        migrations.RunPython(build_subscriptions, migrations.RunPython.noop),
+    ]
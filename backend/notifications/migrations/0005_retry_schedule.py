@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-18 18:09
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0004_webhook_subscriptions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notificationlog',
+            name='next_attempt_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, help_text='When the worker may next attempt a pending or retry delivery'),
+        ),
+        migrations.AddIndex(
+            model_name='notificationlog',
+            index=models.Index(fields=['status', 'next_attempt_at'], name='notif_log_status_due_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-18 18:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0005_retry_schedule'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='webhookintegration',
+            name='circuit_opened_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='webhookintegration',
+            name='circuit_state',
+            field=models.CharField(choices=[('closed', 'Closed'), ('open', 'Open'), ('half_open', 'Half Open')], default='closed', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='webhookintegration',
+            name='consecutive_failures',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='webhookintegration',
+            name='rate_limit_per_second',
+            field=models.FloatField(blank=True, help_text='Maximum sends per second (defaults to WEBHOOK_RATE_LIMIT_PER_SECOND)', null=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-18 18:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0006_integration_circuit_breaker'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='webhookintegration',
+            name='batch_max_events',
+            field=models.PositiveIntegerField(default=10, help_text='Send a batch early once it holds this many events (Discord allows at most 10 embeds)'),
+        ),
+        migrations.AddField(
+            model_name='webhookintegration',
+            name='batch_window_seconds',
+            field=models.PositiveIntegerField(default=0, help_text='Merge events arriving within this many seconds into one message (0 disables batching)'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-18 18:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0008_notification_log_retention_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notificationlog',
+            name='idempotency_key',
+            field=models.CharField(blank=True, db_index=True, help_text="Identifies one event's delivery to one integration; duplicates are dropped", max_length=128),
+        ),
+        migrations.AlterField(
+            model_name='notificationlog',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('sent', 'Sent'), ('failed', 'Failed'), ('retry', 'Retry'), ('skipped', 'Skipped')], default='pending', max_length=20),
+        ),
+    ]
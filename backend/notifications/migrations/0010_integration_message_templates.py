@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 18:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0009_notification_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='webhookintegration',
+            name='message_templates',
+            field=models.JSONField(blank=True, default=dict, help_text='Per-event message template overrides, keyed by event type'),
+        ),
+    ]
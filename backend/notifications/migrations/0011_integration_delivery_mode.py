@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-18 18:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0010_integration_message_templates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='webhookintegration',
+            name='delivery_mode',
+            field=models.CharField(choices=[('immediate', 'Immediate'), ('hourly', 'Hourly digest'), ('daily', 'Daily digest')], default='immediate', help_text='Send every event as it happens, or one summary per hour or day', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='notificationlog',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('sent', 'Sent'), ('failed', 'Failed'), ('retry', 'Retry'), ('skipped', 'Skipped'), ('digest', 'Held for digest')], default='pending', max_length=20),
+        ),
+    ]
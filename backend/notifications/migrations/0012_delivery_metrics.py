@@ -0,0 +1,54 @@
+# Generated by Django 4.2.7 on 2026-10-18 18:28
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0011_integration_delivery_mode'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notificationlog',
+            name='duration_ms',
+            field=models.PositiveIntegerField(blank=True, help_text='Duration of the last HTTP request, in milliseconds', null=True),
+        ),
+        migrations.CreateModel(
+            name='DeliveryStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('minute', models.DateTimeField()),
+                ('webhook_type', models.CharField(max_length=20)),
+                ('sent', models.PositiveIntegerField(default=0)),
+                ('failed', models.PositiveIntegerField(default=0)),
+                ('retried', models.PositiveIntegerField(default=0)),
+                ('skipped', models.PositiveIntegerField(default=0)),
+                ('deferred', models.PositiveIntegerField(default=0)),
+                ('requests', models.PositiveIntegerField(default=0)),
+                ('duration_sum_ms', models.BigIntegerField(default=0)),
+                ('duration_buckets', models.JSONField(default=list, help_text='Request counts per latency bucket')),
+                ('webhook_integration', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='delivery_stats', to='notifications.webhookintegration')),
+            ],
+            options={
+                'verbose_name': 'Delivery Stats',
+                'verbose_name_plural': 'Delivery Stats',
+                'indexes': [models.Index(fields=['minute'], name='delivery_stats_minute_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DeliveryTotal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('counter', models.CharField(max_length=30)),
+                ('value', models.BigIntegerField(default=0)),
+                ('webhook_integration', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='delivery_totals', to='notifications.webhookintegration')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='deliverytotal',
+            constraint=models.UniqueConstraint(fields=('webhook_integration', 'counter'), name='delivery_total_unique'),
+        ),
+    ]
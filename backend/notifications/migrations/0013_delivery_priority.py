@@ -0,0 +1,22 @@
+# Generated by Django 4.2.7 on 2026-10-18 18:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0012_delivery_metrics'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notificationlog',
+            name='priority',
+            field=models.PositiveSmallIntegerField(choices=[(0, 'Low'), (1, 'Normal'), (2, 'High')], default=1, help_text='Higher priorities are claimed first; low priorities are shed when the outbox backs up'),
+        ),
+        migrations.AddIndex(
+            model_name='notificationlog',
+            index=models.Index(fields=['status', '-priority', 'next_attempt_at'], name='notif_log_claim_idx'),
+        ),
+    ]
@@ -0,0 +1,85 @@
+# Generated by Django 4.2.7 on 2026-10-18 19:02
+
+import hashlib
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def move_to_blobs(apps, schema_editor):
+    NotificationLog = apps.get_model('notifications', 'NotificationLog')
+    PayloadBlob = apps.get_model('notifications', 'PayloadBlob')
+
+    def blob_hash(text, blobs):
+        if not text:
+            return None
+        raw = text.encode('utf-8')
+        digest = hashlib.sha256(raw).hexdigest()
+        blobs.setdefault(digest, PayloadBlob(hash=digest, encoding='raw', content=raw, size=len(raw)))
+        return digest
+
+    last_id = 0
+    while True:
+        logs = list(NotificationLog.objects.filter(id__gt=last_id).order_by('id')[:1000])
+        if not logs:
+            break
+        blobs = {}
+        for log in logs:
+            payload = json.dumps(log.payload or {}, sort_keys=True, separators=(',', ':'), cls=DjangoJSONEncoder)
+            log.payload_blob_id = blob_hash(payload, blobs)
+            log.response_blob_id = blob_hash(log.response_body, blobs)
+        PayloadBlob.objects.bulk_create(blobs.values(), ignore_conflicts=True)
+        NotificationLog.objects.bulk_update(logs, ['payload_blob', 'response_blob'])
+        last_id = logs[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0013_delivery_priority'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PayloadBlob',
+            fields=[
+                ('hash', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('encoding', models.CharField(choices=[('raw', 'Raw'), ('zlib', 'zlib')], default='raw', max_length=10)),
+                ('content', models.BinaryField()),
+                ('size', models.PositiveIntegerField(help_text='Size of the text in bytes before compression')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_used_at', models.DateTimeField(default=django.utils.timezone.now, help_text='Last time a writer stored this content; prune() keeps recently used blobs')),
+            ],
+            options={
+                'verbose_name': 'Payload Blob',
+                'verbose_name_plural': 'Payload Blobs',
+            },
+        ),
+        migrations.AddField(
+            model_name='notificationlog',
+            name='payload_blob',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='notifications.payloadblob'),
+        ),
+        migrations.AddField(
+            model_name='notificationlog',
+            name='response_blob',
+            field=models.ForeignKey(blank=True, help_text='Response body of the last attempt; empty when null', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='notifications.payloadblob'),
+        ),
+        migrations.RunPython(move_to_blobs, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='notificationlog',
+            name='payload',
+        ),
+        migrations.RemoveField(
+            model_name='notificationlog',
+            name='response_body',
+        ),
+        migrations.AlterField(
+            model_name='notificationlog',
+            name='payload_blob',
+            field=models.ForeignKey(help_text='Event data, shared with every log of the same payload', on_delete=django.db.models.deletion.PROTECT, related_name='+', to='notifications.payloadblob'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-18 18:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0014_payload_blobs'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='notificationlog',
+            name='notif_log_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='notificationlog',
+            name='notif_log_integ_created_idx',
+        ),
+        migrations.AddIndex(
+            model_name='notificationlog',
+            index=models.Index(fields=['created_at', 'id'], name='notif_log_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notificationlog',
+            index=models.Index(fields=['webhook_integration', 'created_at', 'id'], name='notif_log_integ_created_id_idx'),
+        ),
+    ]
@@ -1,4 +1,6 @@
+from datetime import datetime, time, timedelta
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth import get_user_model
 from tasks.models import Project
 
@@ -19,6 +21,20 @@ class WebhookIntegration(models.Model):
         ('daily_streak', 'Daily Streak'),
     ]
     
+    DISCORD_MAX_EMBEDS = 10
+    
+    DELIVERY_MODES = [
+        ('immediate', 'Immediate'),
+        ('hourly', 'Hourly digest'),
+        ('daily', 'Daily digest'),
+    ]
+    
+    CIRCUIT_STATES = [
+        ('closed', 'Closed'),
+        ('open', 'Open'),
+        ('half_open', 'Half Open'),
+    ]
+    
     name = models.CharField(max_length=100)
     webhook_type = models.CharField(max_length=20, choices=WEBHOOK_TYPES)
     webhook_url = models.URLField(max_length=500)
@@ -26,6 +42,14 @@ class WebhookIntegration(models.Model):
     created_by = models.ForeignKey(User, on_delete=models.CASCADE)
     event_types = models.JSONField(default=list, help_text="List of event types to trigger this webhook")
     is_active = models.BooleanField(default=True)
+    delivery_mode = models.CharField(max_length=20, choices=DELIVERY_MODES, default='immediate', help_text="Send every event as it happens, or one summary per hour or day")
+    batch_window_seconds = models.PositiveIntegerField(default=0, help_text="Merge events arriving within this many seconds into one message (0 disables batching)")
+    batch_max_events = models.PositiveIntegerField(default=10, help_text="Send a batch early once it holds this many events (Discord allows at most 10 embeds)")
+    message_templates = models.JSONField(default=dict, blank=True, help_text="Per-event message template overrides, keyed by event type")
+    rate_limit_per_second = models.FloatField(null=True, blank=True, help_text="Maximum sends per second (defaults to WEBHOOK_RATE_LIMIT_PER_SECOND)")
+    circuit_state = models.CharField(max_length=20, choices=CIRCUIT_STATES, default='closed')
+    consecutive_failures = models.IntegerField(default=0)
+    circuit_opened_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -35,24 +59,117 @@ class WebhookIntegration(models.Model):
         
     def __str__(self):
         return f"{self.name} ({self.webhook_type})"
+    
+    def batch_size_limit(self):
+        """Largest number of events merged into one message for this integration"""
+        limit = max(self.batch_max_events, 1)
+        if self.webhook_type == 'discord':
+            limit = min(limit, self.DISCORD_MAX_EMBEDS)
+        return limit
+    
+    def digest_due_at(self, when=None):
+        """End of the digest period containing `when` (local time), or None for immediate delivery"""
+        if self.delivery_mode == 'immediate':
+            return None
+        local = timezone.localtime(when or timezone.now())
+        if self.delivery_mode == 'hourly':
+            return local.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+        return timezone.make_aware(datetime.combine(local.date() + timedelta(days=1), time.min))
+    
+    def sync_subscriptions(self):
+        """Rebuild the routing rows for this integration from event_types"""
+        self.subscriptions.all().delete()
+        if self.is_active:
+            WebhookSubscription.objects.bulk_create([
+                WebhookSubscription(integration=self, project_id=self.project_id, event_type=event_type)
+                for event_type in set(self.event_types or [])
+            ])
+
+
+class WebhookSubscription(models.Model):
+    """Routing index of active integrations keyed by (project, event_type), derived from event_types"""
+    
+    integration = models.ForeignKey(WebhookIntegration, on_delete=models.CASCADE, related_name='subscriptions')
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='+')
+    event_type = models.CharField(max_length=50)
+    
+    class Meta:
+        verbose_name = "Webhook Subscription"
+        verbose_name_plural = "Webhook Subscriptions"
+        unique_together = ('integration', 'event_type')
+        indexes = [
+            models.Index(fields=['event_type', 'project'], name='webhook_sub_route_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.integration.name} <- {self.event_type}"
+
+
+class PayloadBlob(models.Model):
+    """
+    Event payload or response body stored once, keyed by the SHA-256 of its text
+
+    Logs reference blobs instead of carrying their own copy; identical content (a
+    fan-out's payload, Teams' "1" response) is a single row. Large blobs are zlib-compressed.
+    """
+    
+    ENCODINGS = [
+        ('raw', 'Raw'),
+        ('zlib', 'zlib'),
+    ]
+    
+    hash = models.CharField(max_length=64, primary_key=True)
+    encoding = models.CharField(max_length=10, choices=ENCODINGS, default='raw')
+    content = models.BinaryField()
+    size = models.PositiveIntegerField(help_text="Size of the text in bytes before compression")
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(default=timezone.now, help_text="Last time a writer stored this content; prune() keeps recently used blobs")
+    
+    class Meta:
+        verbose_name = "Payload Blob"
+        verbose_name_plural = "Payload Blobs"
+    
+    def __str__(self):
+        return f"{self.hash[:12]} ({self.size} bytes, {self.encoding})"
 
 
 class NotificationLog(models.Model):
     STATUS_CHOICES = [
         ('pending', 'Pending'),
+        ('processing', 'Processing'),
         ('sent', 'Sent'),
         ('failed', 'Failed'),
         ('retry', 'Retry'),
+        ('skipped', 'Skipped'),
+        ('digest', 'Held for digest'),
+    ]
+    
+    # Statuses the worker will never touch again; only these are archived
+    TERMINAL_STATUSES = ['sent', 'failed', 'skipped']
+    
+    PRIORITY_LOW = 0
+    PRIORITY_NORMAL = 1
+    PRIORITY_HIGH = 2
+    PRIORITY_CHOICES = [
+        (PRIORITY_LOW, 'Low'),
+        (PRIORITY_NORMAL, 'Normal'),
+        (PRIORITY_HIGH, 'High'),
     ]
     
     webhook_integration = models.ForeignKey(WebhookIntegration, on_delete=models.CASCADE, related_name='logs')
     event_type = models.CharField(max_length=50)
-    payload = models.JSONField()
+    idempotency_key = models.CharField(max_length=128, blank=True, db_index=True, help_text="Identifies one event's delivery to one integration; duplicates are dropped")
+    payload_blob = models.ForeignKey(PayloadBlob, on_delete=models.PROTECT, related_name='+', help_text="Event data, shared with every log of the same payload")
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    priority = models.PositiveSmallIntegerField(choices=PRIORITY_CHOICES, default=PRIORITY_NORMAL, help_text="Higher priorities are claimed first; low priorities are shed when the outbox backs up")
     response_status_code = models.IntegerField(null=True, blank=True)
-    response_body = models.TextField(blank=True)
+    response_blob = models.ForeignKey(PayloadBlob, on_delete=models.PROTECT, null=True, blank=True, related_name='+', help_text="Response body of the last attempt; empty when null")
     error_message = models.TextField(blank=True)
     retry_count = models.IntegerField(default=0)
+    duration_ms = models.PositiveIntegerField(null=True, blank=True, help_text="Duration of the last HTTP request, in milliseconds")
+    next_attempt_at = models.DateTimeField(default=timezone.now, help_text="When the worker may next attempt a pending or retry delivery")
+    claimed_by = models.CharField(max_length=64, blank=True, help_text="Worker that claimed this delivery from the outbox")
+    claimed_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     sent_at = models.DateTimeField(null=True, blank=True)
     
@@ -60,6 +177,76 @@ class NotificationLog(models.Model):
         verbose_name = "Notification Log"
         verbose_name_plural = "Notification Logs"
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='notif_log_status_created_idx'),
+            models.Index(fields=['status', 'next_attempt_at'], name='notif_log_status_due_idx'),
+            models.Index(fields=['status', '-priority', 'next_attempt_at'], name='notif_log_claim_idx'),
+            models.Index(fields=['created_at', 'id'], name='notif_log_created_id_idx'),
+            models.Index(fields=['webhook_integration', 'created_at', 'id'], name='notif_log_integ_created_id_idx'),
+        ]
         
     def __str__(self):
         return f"{self.webhook_integration.name} - {self.event_type} ({self.status})"
+    
+    @property
+    def payload(self):
+        from .blobs import load_payloads
+        return load_payloads([self.payload_blob_id]).get(self.payload_blob_id, {})
+    
+    @property
+    def response_body(self):
+        from .blobs import load_text
+        return load_text(self.response_blob_id)
+
+
+class DeliveryStats(models.Model):
+    """
+    Per-minute delivery counters for one integration, written by the in-memory metrics recorder
+
+    Each process flushes its own counters, so a minute can have several rows per integration;
+    readers sum them. Latency is a histogram over metrics.LATENCY_BUCKETS_MS plus an overflow bucket.
+    """
+    
+    minute = models.DateTimeField()
+    webhook_integration = models.ForeignKey(WebhookIntegration, on_delete=models.CASCADE, related_name='delivery_stats')
+    webhook_type = models.CharField(max_length=20)
+    sent = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    retried = models.PositiveIntegerField(default=0)
+    skipped = models.PositiveIntegerField(default=0)
+    deferred = models.PositiveIntegerField(default=0)
+    requests = models.PositiveIntegerField(default=0)
+    duration_sum_ms = models.BigIntegerField(default=0)
+    duration_buckets = models.JSONField(default=list, help_text="Request counts per latency bucket")
+    
+    class Meta:
+        verbose_name = "Delivery Stats"
+        verbose_name_plural = "Delivery Stats"
+        indexes = [
+            models.Index(fields=['minute'], name='delivery_stats_minute_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.webhook_integration_id} @ {self.minute:%Y-%m-%d %H:%M}"
+
+
+class DeliveryTotal(models.Model):
+    """
+    Cumulative delivery counter for one integration, exported to Prometheus
+
+    One row per (integration, counter), incremented with F() on every metrics flush so
+    processes never overwrite each other. Values only grow, unlike the DeliveryStats
+    minute rows, which age out.
+    """
+    
+    webhook_integration = models.ForeignKey(WebhookIntegration, on_delete=models.CASCADE, related_name='delivery_totals')
+    counter = models.CharField(max_length=30)
+    value = models.BigIntegerField(default=0)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['webhook_integration', 'counter'], name='delivery_total_unique'),
+        ]
+    
+    def __str__(self):
+        return f"{self.webhook_integration_id}/{self.counter}: {self.value}"
@@ -0,0 +1,126 @@
+import logging
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from .blobs import preload
+from .logwriter import LogWriter
+from .models import NotificationLog
+from .services import WebhookService
+from .throttling import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+
+def dead_letters(integration_id: Optional[int] = None, event_type: Optional[str] = None,
+                 since: Optional[datetime] = None, until: Optional[datetime] = None) -> QuerySet:
+    """Permanently failed deliveries (retries exhausted or rejected outright), optionally filtered"""
+    queryset = NotificationLog.objects.filter(status='failed')
+    if integration_id:
+        queryset = queryset.filter(webhook_integration_id=integration_id)
+    if event_type:
+        queryset = queryset.filter(event_type=event_type)
+    if since:
+        queryset = queryset.filter(created_at__gte=since)
+    if until:
+        queryset = queryset.filter(created_at__lt=until)
+    return queryset
+
+
+def _iter_id_chunks(queryset: QuerySet, chunk_size: int):
+    last_id = 0
+    while True:
+        ids = list(queryset.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:chunk_size])
+        if not ids:
+            return
+        yield ids
+        last_id = ids[-1]
+
+
+def requeue_dead_letters(queryset: QuerySet, rate: Optional[float] = None) -> int:
+    """
+    Put dead letters back in the outbox, spread out at `rate` deliveries per second
+
+    Each second's worth of rows gets the same next_attempt_at, so the worker
+    re-sends them gradually instead of all at once. Retry counts are reset so the
+    normal backoff policy applies again.
+    """
+    rate = rate or getattr(settings, 'WEBHOOK_REPLAY_RATE', 10.0)
+    per_second = max(int(rate), 1)
+    start = timezone.now()
+    total = 0
+    for second, ids in enumerate(_iter_id_chunks(queryset, per_second)):
+        total += NotificationLog.objects.filter(id__in=ids, status='failed').update(
+            status='pending',
+            retry_count=0,
+            next_attempt_at=start + timedelta(seconds=second * per_second / rate)
+        )
+    return total
+
+
+def replay_dead_letters(queryset: QuerySet, rate: Optional[float] = None, concurrency: Optional[int] = None,
+                        chunk_size: int = 500, progress: Optional[Callable[[Counter], None]] = None) -> Counter:
+    """
+    Re-send dead letters directly, streaming through them in id order
+
+    At most `rate` sends start per second and at most `concurrency` are in flight.
+    Per-integration circuit breakers and rate limits still apply; deliveries they
+    defer go back to the outbox for the worker.
+
+    Returns:
+        Counter of resulting log statuses
+    """
+    rate = rate or getattr(settings, 'WEBHOOK_REPLAY_RATE', 10.0)
+    concurrency = concurrency or getattr(settings, 'WEBHOOK_WORKER_THREADS', 4)
+    replay_id = f"replay:{uuid.uuid4().hex[:8]}"
+    bucket = TokenBucket(rate, max(rate, 1))
+    writer = LogWriter(flush_size=chunk_size)
+    results = Counter()
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='webhook-replay') as executor:
+        for ids in _iter_id_chunks(queryset, chunk_size):
+            NotificationLog.objects.filter(id__in=ids, status='failed').update(
+                status='processing',
+                claimed_by=replay_id,
+                claimed_at=timezone.now(),
+                retry_count=0
+            )
+            logs = list(NotificationLog.objects.filter(
+                id__in=ids, status='processing', claimed_by=replay_id
+            ).select_related('webhook_integration'))
+            preload(logs)
+
+            futures = []
+            for log in logs:
+                delay = bucket.try_acquire()
+                while delay > 0:
+                    time.sleep(delay)
+                    delay = bucket.try_acquire()
+                futures.append(executor.submit(_send, log, writer))
+
+            for future in wait(futures).done:
+                results[future.result().status] += 1
+            writer.flush()
+            if progress:
+                progress(results)
+
+    return results
+
+
+def _send(log: NotificationLog, writer: LogWriter) -> NotificationLog:
+    close_old_connections()
+    try:
+        return WebhookService.deliver_batch([log], writer=writer)[0]
+    except Exception as e:
+        logger.error(f"Webhook replay crashed: {log.id} - {e}")
+        return log
+    finally:
+        close_old_connections()
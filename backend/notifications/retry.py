@@ -0,0 +1,73 @@
+import random
+from datetime import datetime, timedelta
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+import requests
+from django.conf import settings
+from django.utils import timezone
+
+# Status codes worth another attempt; anything else in 4xx is a permanent failure
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+
+def is_retryable_status(status_code: int) -> bool:
+    return status_code in RETRYABLE_STATUS_CODES or status_code >= 500
+
+
+def backoff_delay(attempt: int) -> float:
+    """
+    Seconds to wait before retry number `attempt` (1-based)
+
+    Exponential backoff with equal jitter: half of the capped delay is fixed and
+    the other half random, so failures that happened together do not all come
+    back at the same instant.
+    """
+    base = getattr(settings, 'WEBHOOK_RETRY_BASE_DELAY', 10)
+    cap = getattr(settings, 'WEBHOOK_RETRY_MAX_DELAY', 3600)
+    delay = min(cap, base * (2 ** max(attempt - 1, 0)))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def retry_delay(attempt: int, retry_after: Optional[float] = None) -> float:
+    """Seconds until retry number `attempt`: the provider's Retry-After if it sent one, else backoff"""
+    if retry_after is not None:
+        # Spread slightly so a recovering endpoint is not stampeded
+        return retry_after * random.uniform(1.0, 1.1)
+    return backoff_delay(attempt)
+
+
+def throttled_too_long(created_at: Optional[datetime]) -> bool:
+    """Whether an event has been rate limited past WEBHOOK_THROTTLED_RETRY_MAX_AGE and should fail"""
+    max_age = timedelta(seconds=getattr(settings, 'WEBHOOK_THROTTLED_RETRY_MAX_AGE', 86400))
+    return created_at is not None and timezone.now() - created_at > max_age
+
+
+def retry_after_delay(response: requests.Response) -> Optional[float]:
+    """
+    Seconds the provider asked us to wait, from a 429/503 response
+
+    Reads the standard Retry-After header (seconds or HTTP date) and falls back
+    to the `retry_after` field Discord puts in its JSON body.
+    """
+    header = response.headers.get('Retry-After')
+    if header:
+        try:
+            return max(float(header), 0.0)
+        except ValueError:
+            try:
+                retry_at = parsedate_to_datetime(header)
+                return max((retry_at - timezone.now()).total_seconds(), 0.0)
+            except (TypeError, ValueError):
+                pass
+
+    try:
+        body = response.json()
+    except ValueError:
+        return None
+    if isinstance(body, dict) and body.get('retry_after') is not None:
+        try:
+            return max(float(body['retry_after']), 0.0)
+        except (TypeError, ValueError):
+            return None
+    return None
@@ -0,0 +1,59 @@
+from typing import List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import WebhookIntegration
+
+ROUTES_VERSION_KEY = 'webhook-routes:version'
+
+
+def _routes_version() -> int:
+    version = cache.get(ROUTES_VERSION_KEY)
+    if version is None:
+        cache.add(ROUTES_VERSION_KEY, 1, timeout=None)
+        version = cache.get(ROUTES_VERSION_KEY, 1)
+    return version
+
+
+def subscribed_integration_ids(event_type: str, project_id: Optional[int] = None) -> List[int]:
+    """
+    IDs of the integrations subscribed to event_type for a project
+
+    Routes are read from the WebhookSubscription index and cached per
+    (project_id, event_type). A project_id of None matches every project.
+    """
+    key = f"webhook-routes:{_routes_version()}:{project_id or 'all'}:{event_type}"
+    ids = cache.get(key)
+    if ids is None:
+        # Both conditions go in one filter() so they apply to the same subscription row;
+        # chained filters would join subscriptions twice and repeat multi-event integrations
+        lookups = {'subscriptions__event_type': event_type}
+        if project_id:
+            lookups['subscriptions__project_id'] = project_id
+        queryset = WebhookIntegration.objects.filter(is_active=True, **lookups)
+        ids = list(queryset.order_by('id').values_list('id', flat=True))
+        cache.set(key, ids, timeout=getattr(settings, 'WEBHOOK_ROUTE_CACHE_TIMEOUT', 60))
+    return ids
+
+
+def get_subscribed_integrations(event_type: str, project_id: Optional[int] = None) -> List[WebhookIntegration]:
+    """
+    Return the active integrations subscribed to event_type for a project
+
+    Only the IDs are cached. The rows are read by primary key on every call, so an
+    integration disabled or tripped in another process, whose cache this process
+    cannot invalidate, is never sent to from a stale copy.
+    """
+    ids = subscribed_integration_ids(event_type, project_id)
+    if not ids:
+        return []
+    return list(WebhookIntegration.objects.filter(pk__in=ids, is_active=True).order_by('id'))
+
+
+def invalidate_routes():
+    """Drop every cached route; called whenever an integration is saved or deleted"""
+    try:
+        cache.incr(ROUTES_VERSION_KEY)
+    except ValueError:
+        cache.add(ROUTES_VERSION_KEY, 1, timeout=None)
@@ -1,4 +1,9 @@
+import math
+
+from django.db import models
 from rest_framework import serializers
+from .blobs import preload
+from .formatters import TemplateError, compile_override
 from .models import WebhookIntegration, NotificationLog
 
 
@@ -10,10 +15,14 @@ class WebhookIntegrationSerializer(serializers.ModelSerializer):
         model = WebhookIntegration
         fields = [
             'id', 'name', 'webhook_type', 'webhook_url', 'project', 'project_name',
-            'created_by', 'created_by_username', 'event_types', 'is_active',
+            'created_by', 'created_by_username', 'event_types', 'is_active', 'delivery_mode', 'message_templates',
+            'batch_window_seconds', 'batch_max_events', 'rate_limit_per_second', 'circuit_state', 'consecutive_failures', 'circuit_opened_at',
+            'created_at', 'updated_at'
+        ]
+        read_only_fields = [
+            'created_by', 'circuit_state', 'consecutive_failures', 'circuit_opened_at',
             'created_at', 'updated_at'
         ]
-        read_only_fields = ['created_by', 'created_at', 'updated_at']
         
     def validate_event_types(self, value):
         """Validate that event_types contains valid choices"""
@@ -22,23 +31,82 @@ class WebhookIntegrationSerializer(serializers.ModelSerializer):
             if event not in valid_events:
                 raise serializers.ValidationError(f"'{event}' is not a valid event type.")
         return value
+    
+    def validate(self, attrs):
+        webhook_type = attrs.get('webhook_type', getattr(self.instance, 'webhook_type', None))
+        batch_max_events = attrs.get('batch_max_events')
+        if (webhook_type == 'discord' and batch_max_events is not None
+                and batch_max_events > WebhookIntegration.DISCORD_MAX_EMBEDS):
+            raise serializers.ValidationError({
+                'batch_max_events': f"Discord accepts at most {WebhookIntegration.DISCORD_MAX_EMBEDS} embeds per message."
+            })
+        
+        # Compile overrides now so a broken template is rejected instead of failing at delivery time
+        templates = attrs.get('message_templates')
+        if templates:
+            if not isinstance(templates, dict):
+                raise serializers.ValidationError({'message_templates': "Expected an object keyed by event type."})
+            for event_type, template in templates.items():
+                try:
+                    compile_override(webhook_type, event_type, template)
+                except TemplateError as e:
+                    raise serializers.ValidationError({'message_templates': f"{event_type}: {e}"})
+        return attrs
+    
+    def validate_rate_limit_per_second(self, value):
+        if value is not None and value <= 0:
+            raise serializers.ValidationError("Rate limit must be greater than zero.")
+        return value
+
+
+class NotificationLogListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        logs = list(data.all() if isinstance(data, models.Manager) else data)
+        # One query for every payload and response body on the page
+        preload(logs)
+        return super().to_representation(logs)
 
 
 class NotificationLogSerializer(serializers.ModelSerializer):
     webhook_integration_name = serializers.CharField(source='webhook_integration.name', read_only=True)
     webhook_type = serializers.CharField(source='webhook_integration.webhook_type', read_only=True)
+    payload = serializers.JSONField(read_only=True)
+    response_body = serializers.CharField(read_only=True)
     
     class Meta:
         model = NotificationLog
+        list_serializer_class = NotificationLogListSerializer
         fields = [
             'id', 'webhook_integration', 'webhook_integration_name', 'webhook_type',
-            'event_type', 'payload', 'status', 'response_status_code',
-            'response_body', 'error_message', 'retry_count',
+            'event_type', 'idempotency_key', 'payload', 'status', 'priority', 'response_status_code',
+            'response_body', 'error_message', 'retry_count', 'duration_ms', 'next_attempt_at',
             'created_at', 'sent_at'
         ]
-        read_only_fields = ['created_at', 'sent_at']
+        read_only_fields = ['idempotency_key', 'priority', 'duration_ms', 'created_at', 'sent_at', 'next_attempt_at']
 
 
 class WebhookTestSerializer(serializers.Serializer):
     """Serializer for testing webhook endpoints"""
     test_message = serializers.CharField(max_length=500, default="Test message from Zentry!", required=False)
+
+
+class DeadLetterFilterSerializer(serializers.Serializer):
+    """Filters for listing and replaying dead letters"""
+    integration = serializers.IntegerField(min_value=1, required=False)
+    event_type = serializers.CharField(max_length=50, required=False)
+    since = serializers.DateTimeField(required=False)
+    until = serializers.DateTimeField(required=False)
+
+    def validate(self, attrs):
+        if attrs.get('since') and attrs.get('until') and attrs['since'] >= attrs['until']:
+            raise serializers.ValidationError({'until': "Must be later than since."})
+        return attrs
+
+
+class DeadLetterReplaySerializer(DeadLetterFilterSerializer):
+    rate = serializers.FloatField(required=False, allow_null=True)
+
+    def validate_rate(self, value):
+        if value is not None and (not math.isfinite(value) or value <= 0):
+            raise serializers.ValidationError("Rate must be greater than zero.")
+        return value
@@ -1,195 +1,378 @@
 import requests
 import json
 import logging
-from datetime import datetime
-from typing import Dict, Any, Optional
+import time
+from collections import Counter
+from concurrent.futures import Executor, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from functools import partial
+from typing import Dict, Any, List, Optional
 from django.conf import settings
+from django.db import close_old_connections, connections, transaction
 from django.utils import timezone
+from .backpressure import event_priority, shed, should_shed
+from .blobs import load_payloads, store_payload, store_text
+from .formatters import format_batch
+from .idempotency import default_event_key, delivery_key, recently_queued, recently_sent
+from .logwriter import DELIVERY_FIELDS, LogWriter
+from .metrics import recorder
 from .models import WebhookIntegration, NotificationLog
+from .retry import is_retryable_status, retry_after_delay, retry_delay, throttled_too_long
+from .routing import get_subscribed_integrations
+from .throttling import CircuitBreaker, get_bucket
+from .transport import get_session, get_timeout
 
 logger = logging.getLogger(__name__)
 
 
+def truncate_error(message: str) -> str:
+    """Bound stored error text; a failing endpoint can return an arbitrarily large body"""
+    limit = getattr(settings, 'NOTIFICATION_LOG_ERROR_MAX_LENGTH', 2000)
+    return message if len(message) <= limit else message[:limit] + '…'
+
+
+def store_response_body(response: requests.Response) -> Optional[str]:
+    """
+    Blob of the (size-limited) response body, or None if it cannot be stored
+
+    The request has already been made by then: losing the body must not turn a
+    delivered webhook into a failure, or a failed one into a different error.
+    """
+    try:
+        with transaction.atomic():
+            return store_text(response.text[:1000])
+    except Exception as e:
+        logger.error(f"Failed to store webhook response body: {e}")
+        return None
+
+
 class WebhookService:
     """Service for sending webhook notifications to Discord and Microsoft Teams"""
     
     @staticmethod
-    def send_notification(integration: WebhookIntegration, event_type: str, data: Dict[str, Any]) -> NotificationLog:
-        """Send a webhook notification and log the result"""
-        
-        # Create notification log entry
-        log = NotificationLog.objects.create(
+    def enqueue_notification(integration: WebhookIntegration, event_type: str, data: Dict[str, Any],
+                             next_attempt_at: Optional[datetime] = None) -> NotificationLog:
+        """Write a notification to the outbox for the delivery worker to send"""
+        return NotificationLog.objects.create(
             webhook_integration=integration,
             event_type=event_type,
-            payload=data,
-            status='pending'
+            payload_blob_id=store_payload(data),
+            status='pending',
+            next_attempt_at=next_attempt_at or timezone.now()
         )
+    
+    @staticmethod
+    def batch_window_close(integration: WebhookIntegration) -> datetime:
+        """
+        When a new event for a batching integration should be sent
         
+        Events join the integration's open window so they all become due together and
+        the worker merges them into one message. A window that has reached
+        batch_max_events is released immediately.
+        """
+        now = timezone.now()
+        window = NotificationLog.objects.filter(
+            webhook_integration=integration,
+            status='pending',
+            next_attempt_at__gt=now
+        )
+        close_at = window.order_by('next_attempt_at').values_list('next_attempt_at', flat=True).first()
+        if close_at is None:
+            return now + timedelta(seconds=integration.batch_window_seconds)
+        
+        open_window = window.filter(next_attempt_at=close_at)
+        if open_window.count() + 1 >= integration.batch_size_limit():
+            open_window.update(next_attempt_at=now)
+            return now
+        return close_at
+    
+    @staticmethod
+    def send_notification(integration: WebhookIntegration, event_type: str, data: Dict[str, Any]) -> NotificationLog:
+        """Send a webhook notification immediately and log the result"""
+        log = WebhookService.enqueue_notification(integration, event_type, data)
+        return WebhookService.deliver(log)
+    
+    @staticmethod
+    def deliver(log: NotificationLog, enforce_limits: bool = True) -> NotificationLog:
+        """
+        Send an outbox entry to its webhook and record the result on the log
+        
+        With enforce_limits the integration's circuit breaker and rate limiter are
+        consulted first; a blocked send is put back in the outbox for later instead
+        of being attempted.
+        """
+        return WebhookService.deliver_batch([log], enforce_limits)[0]
+    
+    @staticmethod
+    def deliver_batch(logs: List[NotificationLog], enforce_limits: bool = True,
+                      writer: Optional[LogWriter] = None) -> List[NotificationLog]:
+        """
+        Send several outbox entries for one integration as a single webhook message
+        
+        Discord receives one embed per event (at most 10 per message) and Teams one
+        combined text card. Every log in the batch records the shared response.
+        Results are handed to `writer` for a bulk write when given, otherwise saved directly.
+        """
+        integration = logs[0].webhook_integration
+        event_type = logs[0].event_type if len(logs) == 1 else 'batch'
+        
+        if enforce_limits and WebhookService._defer_if_limited(logs):
+            WebhookService._record(logs, writer)
+            recorder.record(integration, {'deferred': len(logs)})
+            return logs
+        
+        duration_ms = None
         try:
             # Format payload based on webhook type
-            if integration.webhook_type == 'discord':
-                payload = WebhookService._format_discord_payload(event_type, data)
-            elif integration.webhook_type == 'teams':
-                payload = WebhookService._format_teams_payload(event_type, data)
-            else:
-                raise ValueError(f"Unsupported webhook type: {integration.webhook_type}")
+            payload = WebhookService._format_batch_payload(integration, logs)
             
             # Send the webhook
-            response = requests.post(
-                integration.webhook_url,
-                json=payload,
-                headers={'Content-Type': 'application/json'},
-                timeout=30
-            )
+            started = time.perf_counter()
+            try:
+                response = get_session(integration.webhook_url).post(
+                    integration.webhook_url,
+                    json=payload,
+                    timeout=get_timeout()
+                )
+            finally:
+                duration_ms = round((time.perf_counter() - started) * 1000)
             
-            # Update log with response
-            log.response_status_code = response.status_code
-            log.response_body = response.text[:1000]  # Limit response body size
-            log.sent_at = timezone.now()
+            sent_at = timezone.now()
+            retryable = is_retryable_status(response.status_code)
+            retry_after = retry_after_delay(response) if response.status_code in [429, 503] else None
             
             if response.status_code in [200, 204]:
-                log.status = 'sent'
-                logger.info(f"Webhook sent successfully: {integration.name} - {event_type}")
+                logger.info(f"Webhook sent successfully: {integration.name} - {event_type} ({len(logs)} event(s))")
+                CircuitBreaker.record_success(integration)
             else:
-                log.status = 'failed'
-                log.error_message = f"HTTP {response.status_code}: {response.text}"
                 logger.error(f"Webhook failed: {integration.name} - {event_type} - {response.status_code}")
+                if response.status_code != 429:
+                    # Being rate limited says nothing about the endpoint's health
+                    CircuitBreaker.record_failure(integration)
+            
+            # Update logs with response; identical bodies (Discord's empty 204, Teams' "1") share one blob
+            response_blob_id = store_response_body(response)
+            for log in logs:
+                log.duration_ms = duration_ms
+                log.response_status_code = response.status_code
+                log.response_blob_id = response_blob_id
+                log.sent_at = sent_at
+                if response.status_code in [200, 204]:
+                    log.status = 'sent'
+                    log.error_message = ''
+                else:
+                    log.status = 'failed'
+                    log.error_message = truncate_error(f"HTTP {response.status_code}: {response.text}")
+                    if response.status_code == 429:
+                        WebhookService._schedule_throttled(log, retry_after)
+                    elif retryable:
+                        WebhookService._schedule_retry(log, retry_after)
                 
         except requests.exceptions.RequestException as e:
-            log.status = 'failed'
-            log.error_message = str(e)
             logger.error(f"Webhook request failed: {integration.name} - {event_type} - {e}")
+            CircuitBreaker.record_failure(integration)
+            for log in logs:
+                log.duration_ms = duration_ms
+                log.status = 'failed'
+                log.error_message = truncate_error(str(e))
+                WebhookService._schedule_retry(log)
             
         except Exception as e:
-            log.status = 'failed'
-            log.error_message = str(e)
             logger.error(f"Webhook processing failed: {integration.name} - {event_type} - {e}")
-            
-        log.save()
+            for log in logs:
+                log.status = 'failed'
+                log.error_message = truncate_error(str(e))
+        
+        WebhookService._record(logs, writer)
+        recorder.record(integration, Counter(log.status for log in logs), duration_ms)
+        return logs
+    
+    @staticmethod
+    def _record(logs: List[NotificationLog], writer: Optional[LogWriter]):
+        if writer is not None:
+            writer.add(logs)
+        else:
+            for log in logs:
+                log.save(update_fields=DELIVERY_FIELDS)
+    
+    @staticmethod
+    def _format_batch_payload(integration: WebhookIntegration, logs: List[NotificationLog]) -> Dict[str, Any]:
+        """Build the request body for one or more events going to the same integration"""
+        payloads = load_payloads(log.payload_blob_id for log in logs)
+        return format_batch(
+            integration.webhook_type,
+            [(log.event_type, payloads.get(log.payload_blob_id, {})) for log in logs],
+            integration.message_templates
+        )
+    
+    @staticmethod
+    def _defer_if_limited(logs: List[NotificationLog]) -> bool:
+        """Put the logs back in the outbox if their circuit is open or the rate limit is exhausted"""
+        integration = logs[0].webhook_integration
+        
+        allowed, retry_in = CircuitBreaker.allow_request(integration)
+        if not allowed:
+            for log in logs:
+                WebhookService._defer(log, retry_in.total_seconds())
+                log.error_message = f"Circuit open for {integration.name}; delivery deferred"
+            logger.warning(f"Webhook short-circuited: {integration.name} - {len(logs)} event(s)")
+            return True
+        
+        # Wait briefly for a token in the worker thread; longer waits go back to the outbox
+        max_wait = getattr(settings, 'WEBHOOK_RATE_LIMIT_MAX_WAIT', 1.0)
+        bucket = get_bucket(integration)
+        waited = 0.0
+        wait = bucket.try_acquire()
+        while wait > 0:
+            if waited + wait > max_wait:
+                for log in logs:
+                    WebhookService._defer(log, wait)
+                return True
+            time.sleep(wait)
+            waited += wait
+            wait = bucket.try_acquire()
+        return False
+    
+    @staticmethod
+    def _defer(log: NotificationLog, delay: float):
+        """Return a claimed log to the outbox without counting an attempt"""
+        log.status = 'retry' if log.retry_count else 'pending'
+        log.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+    
+    @staticmethod
+    def _schedule_retry(log: NotificationLog, retry_after: Optional[float] = None):
+        """Move a transiently failed log to 'retry' with its next attempt time, or leave it failed"""
+        max_retries = getattr(settings, 'WEBHOOK_MAX_RETRIES', 5)
+        if log.retry_count >= max_retries:
+            return
+        
+        log.retry_count += 1
+        log.status = 'retry'
+        log.next_attempt_at = timezone.now() + timedelta(seconds=retry_delay(log.retry_count, retry_after))
+    
+    @staticmethod
+    def _schedule_throttled(log: NotificationLog, retry_after: Optional[float] = None):
+        """
+        Move a rate-limited (429) log to 'retry' without using up its retry budget
+        
+        Being throttled says nothing about whether the delivery can succeed, so it does not
+        count towards WEBHOOK_MAX_RETRIES; throttled logs are retried until they are
+        WEBHOOK_THROTTLED_RETRY_MAX_AGE seconds old instead.
+        """
+        if throttled_too_long(log.created_at):
+            return
+        log.status = 'retry'
+        log.next_attempt_at = timezone.now() + timedelta(seconds=retry_delay(log.retry_count + 1, retry_after))
+    
+    @staticmethod
+    def requeue(log: NotificationLog) -> NotificationLog:
+        """Schedule a failed log for an immediate new attempt by the worker"""
+        log.status = 'retry'
+        log.next_attempt_at = timezone.now()
+        log.save(update_fields=['status', 'next_attempt_at'])
+        if not getattr(settings, 'WEBHOOK_ASYNC_DELIVERY', True):
+            return WebhookService.deliver(log)
         return log
     
     @staticmethod
-    def _format_discord_payload(event_type: str, data: Dict[str, Any]) -> Dict[str, Any]:
-        """Format payload for Discord webhooks"""
+    def deliver_many(logs: List[NotificationLog], executor: Optional[Executor] = None,
+                     writer: Optional[LogWriter] = None) -> List[NotificationLog]:
+        """
+        Deliver several outbox entries concurrently
         
-        # Color mapping for different event types
-        colors = {
-            'task_completed': 0x00ff00,  # Green
-            'badge_earned': 0xffd700,    # Gold
-            'project_created': 0x0099ff, # Blue
-            'milestone_reached': 0xff6600, # Orange
-            'daily_streak': 0x9966ff,    # Purple
-        }
+        With no executor a short-lived pool of at most WEBHOOK_MAX_IN_FLIGHT threads is
+        used, so fanning one event out to N integrations costs roughly one round-trip.
+        Each log records its own result; one failing endpoint does not affect the others.
+        Logs for integrations with a batching window are merged into batched messages.
         
-        color = colors.get(event_type, 0x808080)  # Default gray
-        
-        # Base embed structure
-        embed = {
-            "title": WebhookService._get_event_title(event_type),
-            "color": color,
-            "timestamp": timezone.now().isoformat(),
-            "footer": {
-                "text": "Zentry Project Management",
-                "icon_url": "https://via.placeholder.com/32x32.png?text=Z"
-            }
-        }
+        Results go to `writer` (the worker's long-lived buffer) when given; otherwise
+        they are collected and written with a single bulk update at the end.
+        """
+        if not logs:
+            return []
+        owns_writer = writer is None
+        if owns_writer:
+            writer = LogWriter(flush_size=len(logs))
         
-        # Customize embed based on event type
-        if event_type == 'task_completed':
-            embed["description"] = f"🎉 **{data.get('user_name', 'Someone')}** completed the task **{data.get('task_title', 'Unknown Task')}**!"
-            embed["fields"] = [
-                {"name": "Project", "value": data.get('project_name', 'Unknown'), "inline": True},
-                {"name": "Points Earned", "value": str(data.get('points', 0)), "inline": True}
-            ]
-            
-        elif event_type == 'badge_earned':
-            embed["description"] = f"🏆 **{data.get('user_name', 'Someone')}** earned a new badge: **{data.get('badge_name', 'Unknown Badge')}**!"
-            embed["fields"] = [
-                {"name": "Badge Description", "value": data.get('badge_description', 'No description'), "inline": False}
-            ]
-            
-        elif event_type == 'project_created':
-            embed["description"] = f"🚀 New project **{data.get('project_name', 'Unknown Project')}** has been created!"
-            embed["fields"] = [
-                {"name": "Created by", "value": data.get('user_name', 'Unknown'), "inline": True},
-                {"name": "Description", "value": data.get('project_description', 'No description')[:100], "inline": False}
-            ]
-            
-        elif event_type == 'milestone_reached':
-            embed["description"] = f"🎯 Milestone reached: **{data.get('milestone_name', 'Unknown Milestone')}**!"
-            embed["fields"] = [
-                {"name": "Project", "value": data.get('project_name', 'Unknown'), "inline": True},
-                {"name": "Progress", "value": f"{data.get('progress', 0)}%", "inline": True}
-            ]
-            
-        elif event_type == 'daily_streak':
-            embed["description"] = f"🔥 **{data.get('user_name', 'Someone')}** is on a {data.get('streak_days', 0)} day streak!"
-            embed["fields"] = [
-                {"name": "Streak Type", "value": data.get('streak_type', 'Daily tasks'), "inline": True}
-            ]
-        
-        return {"embeds": [embed]}
-    
-    @staticmethod
-    def _format_teams_payload(event_type: str, data: Dict[str, Any]) -> Dict[str, Any]:
-        """Format payload for Microsoft Teams webhooks using simple text format"""
-        
-        # Create simple text message based on event type
-        if event_type == 'task_completed':
-            text = f"🎉 **Task Completed!**\n\n" \
-                   f"**User:** {data.get('user_name', 'Someone')}\n" \
-                   f"**Task:** {data.get('task_title', 'Unknown Task')}\n" \
-                   f"**Project:** {data.get('project_name', 'Unknown')}\n" \
-                   f"**Points Earned:** {data.get('points', 0)} XP\n\n" \
-                   f"Great job! 🚀"
-                   
-        elif event_type == 'badge_earned':
-            text = f"🏆 **New Badge Earned!**\n\n" \
-                   f"**User:** {data.get('user_name', 'Someone')}\n" \
-                   f"**Badge:** {data.get('badge_name', 'Unknown Badge')}\n" \
-                   f"**Description:** {data.get('badge_description', 'No description')}\n\n" \
-                   f"Congratulations! 🎉"
-                   
-        elif event_type == 'project_created':
-            text = f"🚀 **New Project Created!**\n\n" \
-                   f"**Project:** {data.get('project_name', 'Unknown Project')}\n" \
-                   f"**Created by:** {data.get('user_name', 'Someone')}\n" \
-                   f"**Description:** {data.get('project_description', 'No description')}\n\n" \
-                   f"Let's build something amazing! 💪"
-                   
-        elif event_type == 'milestone_reached':
-            text = f"🎯 **Milestone Reached!**\n\n" \
-                   f"**Project:** {data.get('project_name', 'Unknown Project')}\n" \
-                   f"**Milestone:** {data.get('milestone_name', 'Unknown Milestone')}\n" \
-                   f"**Progress:** {data.get('progress', 0)}%\n\n" \
-                   f"Keep up the great work! 📈"
-                   
-        elif event_type == 'daily_streak':
-            text = f"🔥 **Daily Streak!**\n\n" \
-                   f"**User:** {data.get('user_name', 'Someone')}\n" \
-                   f"**Streak:** {data.get('streak_count', 0)} days\n" \
-                   f"**Total Points:** {data.get('total_points', 0)} XP\n\n" \
-                   f"You're on fire! Keep it up! 🎯"
-                   
+        skipped = WebhookService._skip_duplicates(logs)
+        if skipped:
+            writer.add(skipped)
+            for log in skipped:
+                recorder.record(log.webhook_integration, {'skipped': 1})
+            logs = [log for log in logs if log.status != 'skipped']
+        
+        batches = WebhookService._group_batches(logs) if logs else []
+        if executor is not None:
+            results = list(executor.map(partial(WebhookService._deliver_pooled, writer=writer), batches))
+        elif len(batches) == 1:
+            results = [WebhookService._deliver_safely(batches[0], writer)]
         else:
-            text = f"📢 **Zentry Notification**\n\n" \
-                   f"**Event:** {event_type.replace('_', ' ').title()}\n" \
-                   f"**Time:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n" \
-                   f"Something awesome happened in your project! 🎉"
-        
-        return {"text": text}
-    
-    @staticmethod
-    def _get_event_title(event_type: str) -> str:
-        """Get a human-readable title for the event type"""
-        titles = {
-            'task_completed': 'Task Completed',
-            'badge_earned': 'Badge Earned',
-            'project_created': 'Project Created', 
-            'milestone_reached': 'Milestone Reached',
-            'daily_streak': 'Daily Streak'
-        }
-        return titles.get(event_type, 'Zentry Notification')
+            max_in_flight = min(getattr(settings, 'WEBHOOK_MAX_IN_FLIGHT', 8), len(batches))
+            with ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix='webhook-fanout') as pool:
+                results = list(pool.map(partial(WebhookService._deliver_ephemeral, writer=writer), batches))
+        
+        if owns_writer:
+            writer.flush()
+        return skipped + [log for batch in results for log in batch]
+    
+    @staticmethod
+    def _skip_duplicates(logs: List[NotificationLog]) -> List[NotificationLog]:
+        """Mark logs whose idempotency key was already delivered (or repeats within this set) as skipped"""
+        delivered = recently_sent([log.idempotency_key for log in logs], exclude_ids=[log.id for log in logs])
+        skipped = []
+        seen = set()
+        for log in logs:
+            key = log.idempotency_key
+            if key and (key in delivered or key in seen):
+                log.status = 'skipped'
+                log.error_message = 'Duplicate delivery dropped by idempotency key'
+                skipped.append(log)
+            elif key:
+                seen.add(key)
+        return skipped
+    
+    @staticmethod
+    def _group_batches(logs: List[NotificationLog]) -> List[List[NotificationLog]]:
+        """Split logs into send units: one per log, or chunks per integration when batching is enabled"""
+        batches = []
+        batched_by_integration: Dict[int, List[NotificationLog]] = {}
+        for log in logs:
+            integration = log.webhook_integration
+            if integration.batch_window_seconds > 0:
+                batched_by_integration.setdefault(integration.id, []).append(log)
+            else:
+                batches.append([log])
+        
+        for integration_logs in batched_by_integration.values():
+            size = integration_logs[0].webhook_integration.batch_size_limit()
+            for i in range(0, len(integration_logs), size):
+                batches.append(integration_logs[i:i + size])
+        return batches
+    
+    @staticmethod
+    def _deliver_pooled(logs: List[NotificationLog], writer: LogWriter) -> List[NotificationLog]:
+        # Long-lived worker threads keep their connection while CONN_MAX_AGE allows
+        close_old_connections()
+        try:
+            return WebhookService._deliver_safely(logs, writer)
+        finally:
+            close_old_connections()
+    
+    @staticmethod
+    def _deliver_ephemeral(logs: List[NotificationLog], writer: LogWriter) -> List[NotificationLog]:
+        # Fan-out threads exit with the pool, so release their connections explicitly
+        try:
+            return WebhookService._deliver_safely(logs, writer)
+        finally:
+            connections.close_all()
+    
+    @staticmethod
+    def _deliver_safely(logs: List[NotificationLog], writer: LogWriter) -> List[NotificationLog]:
+        try:
+            return WebhookService.deliver_batch(logs, writer=writer)
+        except Exception as e:
+            logger.error(f"Webhook delivery crashed: {[log.id for log in logs]} - {e}")
+            return logs
     
     @staticmethod
     def send_test_notification(integration: WebhookIntegration, message: str = "Test message from Zentry!") -> NotificationLog:
@@ -200,10 +383,13 @@ class WebhookService:
             'test': True
         }
         
-        return WebhookService.send_notification(integration, 'test', test_data)
+        # Tests bypass the breaker and rate limiter so operators can check a tripped endpoint
+        log = WebhookService.enqueue_notification(integration, 'test', test_data)
+        return WebhookService.deliver(log, enforce_limits=False)
 
 
-def trigger_webhook_notifications(event_type: str, data: Dict[str, Any], project_id: Optional[int] = None):
+def trigger_webhook_notifications(event_type: str, data: Dict[str, Any], project_id: Optional[int] = None,
+                                  idempotency_key: Optional[str] = None) -> List[NotificationLog]:
     """
     Trigger webhook notifications for a specific event
     
@@ -211,23 +397,76 @@ def trigger_webhook_notifications(event_type: str, data: Dict[str, Any], project
         event_type: The type of event (task_completed, badge_earned, etc.)
         data: Event data to include in the notification
         project_id: Optional project ID to filter integrations
+        idempotency_key: Stable identity of the logical event (e.g. "task:12:todo->completed:<time>");
+            defaults to a hash of event_type and data
+    
+    Returns:
+        The NotificationLog entries created for the matching integrations
     """
     
-    # Get active webhook integrations for this event type
-    integrations = WebhookIntegration.objects.filter(is_active=True)
+    # O(1) lookup in the (project, event_type) routing index instead of scanning
+    # every integration and decoding event_types
+    integrations = get_subscribed_integrations(event_type, project_id)
+    if not integrations:
+        return []
     
-    if project_id:
-        integrations = integrations.filter(project_id=project_id)
+    # Drop deliveries of an event that was already queued inside the dedup window
+    event_key = idempotency_key or default_event_key(event_type, data)
+    keys = {integration.id: delivery_key(integration.id, event_key) for integration in integrations}
+    duplicates = recently_queued(keys.values())
+    if duplicates:
+        logger.info(f"Skipping {len(duplicates)} duplicate {event_type} deliveries for {event_key}")
+        integrations = [integration for integration in integrations if keys[integration.id] not in duplicates]
     
-    # Filter by event type (since JSONField contains lookup doesn't work in SQLite)
-    filtered_integrations = []
+    # Write to the outbox; the process_webhooks worker does the HTTP calls so the
+    # request that raised the event never waits on Discord/Teams.
+    async_delivery = getattr(settings, 'WEBHOOK_ASYNC_DELIVERY', True)
+    priority = event_priority(event_type)
+    # Past the high-water mark low-priority events are coalesced or dropped, so a slow
+    # provider cannot grow the outbox without bound
+    shedding = async_delivery and should_shed(priority)
+    # Every integration's log references the same stored payload
+    payload_blob_id = store_payload(data)
+    now = timezone.now()
+    logs = []
+    shed_count = Counter()
     for integration in integrations:
-        if event_type in integration.event_types:
-            filtered_integrations.append(integration)
-    
-    # Send notifications
-    for integration in filtered_integrations:
         try:
-            WebhookService.send_notification(integration, event_type, data)
+            status = 'pending'
+            next_attempt_at = now
+            error_message = ''
+            digest_due_at = integration.digest_due_at(now)
+            if digest_due_at:
+                # Held until the period ends, then summarised into one message by send_due_digests
+                status = 'digest'
+                next_attempt_at = digest_due_at
+            elif shedding:
+                status = 'skipped'
+                error_message = shed(integration, event_type, data)
+                shed_count[integration] += 1
+            elif async_delivery and integration.batch_window_seconds > 0:
+                next_attempt_at = WebhookService.batch_window_close(integration)
+            logs.append(NotificationLog(
+                webhook_integration=integration,
+                event_type=event_type,
+                idempotency_key=keys[integration.id],
+                payload_blob_id=payload_blob_id,
+                status=status,
+                priority=priority,
+                error_message=error_message,
+                next_attempt_at=next_attempt_at
+            ))
         except Exception as e:
-            logger.error(f"Failed to send webhook notification: {integration.name} - {e}")
+            logger.error(f"Failed to queue webhook notification: {integration.name} - {e}")
+    
+    # One INSERT for the whole fan-out rather than one per integration
+    logs = NotificationLog.objects.bulk_create(logs)
+    for integration, count in shed_count.items():
+        recorder.record(integration, {'skipped': count})
+    
+    if not async_delivery:
+        # Inline mode: fan out to every integration in parallel rather than one after another
+        held = [log for log in logs if log.status == 'digest']
+        logs = WebhookService.deliver_many([log for log in logs if log.status != 'digest']) + held
+    
+    return logs
@@ -2,7 +2,9 @@ from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from tasks.models import Task, Project
 from achievements.models import UserBadge
-from .services import trigger_webhook_notifications
+from .models import WebhookIntegration
+from .routing import invalidate_routes
+from .events import emit
 import logging
 
 logger = logging.getLogger(__name__)
@@ -11,60 +13,87 @@ logger = logging.getLogger(__name__)
 @receiver(post_save, sender=Task)
 def task_status_changed(sender, instance, created, **kwargs):
     """Trigger webhook when task status changes"""
-    if not created and instance.status == 'completed':
+    # Only a real transition to completed counts; re-saving a completed task is not a new event
+    changed_fields = getattr(instance, 'changed_fields', {})
+    if not created and 'status' in changed_fields and instance.status == 'completed':
         # Task was completed
-        data = {
-            'task_id': instance.id,
-            'task_title': instance.title,
-            'task_description': instance.description,
-            'user_name': instance.assigned_to.username if instance.assigned_to else 'Unknown',
-            'user_id': instance.assigned_to.id if instance.assigned_to else None,
-            'project_name': instance.project.name,
-            'project_id': instance.project.id,
-            'points': getattr(instance, 'points', 10),  # Default points if not set
-            'completed_at': instance.updated_at.isoformat() if instance.updated_at else None
-        }
-        
-        trigger_webhook_notifications('task_completed', data, instance.project.id)
-        logger.info(f"Task completed webhook triggered: {instance.title}")
+        # Tasks completed without a completed_at still get a key unique to this transition
+        completed_at = (instance.completed_at or instance.updated_at).isoformat()
+        key = f"task:{instance.pk}:{changed_fields['status']}->completed:{completed_at}"
+        if emit('task_completed', lambda: task_completed_payload(instance), instance.project_id, key):
+            logger.info(f"Task completed webhook triggered: {instance.title}")
 
 
 @receiver(post_save, sender=Project)
 def project_created(sender, instance, created, **kwargs):
     """Trigger webhook when new project is created"""
     if created:
-        data = {
-            'project_id': instance.id,
-            'project_name': instance.name,
-            'project_description': instance.description,
-            'user_name': instance.created_by.username if instance.created_by else 'Unknown',
-            'user_id': instance.created_by.id if instance.created_by else None,
-            'created_at': instance.created_at.isoformat() if instance.created_at else None
-        }
-        
-        trigger_webhook_notifications('project_created', data, instance.id)
-        logger.info(f"Project created webhook triggered: {instance.name}")
+        if emit('project_created', lambda: project_created_payload(instance), instance.id, f"project:{instance.pk}:created"):
+            logger.info(f"Project created webhook triggered: {instance.name}")
 
 
 @receiver(post_save, sender=UserBadge)
 def badge_earned(sender, instance, created, **kwargs):
     """Trigger webhook when user earns a new badge"""
     if created:
-        data = {
-            'badge_id': instance.badge.id,
-            'badge_name': instance.badge.name,
-            'badge_description': instance.badge.description,
-            'user_name': instance.user.username,
-            'user_id': instance.user.id,
-            'earned_at': instance.earned_at.isoformat() if instance.earned_at else None
-        }
-        
         # Try to get project context if available
         # This might need to be adjusted based on your badge logic
         project_id = None
         
-        trigger_webhook_notifications('badge_earned', data, project_id)
-        logger.info(f"Badge earned webhook triggered: {instance.user.username} - {instance.badge.name}")
+        if emit('badge_earned', lambda: badge_earned_payload(instance), project_id, f"user_badge:{instance.pk}:earned"):
+            logger.info(f"Badge earned webhook triggered: user {instance.user_id} - badge {instance.badge_id}")
+
+
+# Payload builders run only after commit and only when an integration is subscribed,
+# so the related-object lookups below cost nothing for unsubscribed events.
+
+def task_completed_payload(instance):
+    return {
+        'task_id': instance.id,
+        'task_title': instance.title,
+        'task_description': instance.description,
+        'user_name': instance.assigned_to.username if instance.assigned_to else 'Unknown',
+        'user_id': instance.assigned_to_id,
+        'project_name': instance.project.name,
+        'project_id': instance.project_id,
+        'points': getattr(instance, 'points', 10),  # Default points if not set
+        'completed_at': instance.updated_at.isoformat() if instance.updated_at else None
+    }
+
+
+def project_created_payload(instance):
+    return {
+        'project_id': instance.id,
+        'project_name': instance.name,
+        'project_description': instance.description,
+        'user_name': instance.created_by.username if instance.created_by else 'Unknown',
+        'user_id': instance.created_by_id,
+        'created_at': instance.created_at.isoformat() if instance.created_at else None
+    }
+
+
+def badge_earned_payload(instance):
+    return {
+        'badge_id': instance.badge_id,
+        'badge_name': instance.badge.name,
+        'badge_description': instance.badge.description,
+        'user_name': instance.user.username,
+        'user_id': instance.user_id,
+        'earned_at': instance.earned_at.isoformat() if instance.earned_at else None
+    }
+
+
+@receiver(post_save, sender=WebhookIntegration)
+def webhook_integration_saved(sender, instance, **kwargs):
+    """Keep the routing index in sync with the integration's event types"""
+    instance.sync_subscriptions()
+    invalidate_routes()
+
+
+@receiver(post_delete, sender=WebhookIntegration)
+def webhook_integration_deleted(sender, instance, **kwargs):
+    """Subscriptions cascade with the integration; only the cached routes need dropping"""
+    invalidate_routes()
 
 
 # You can add more signal handlers for other events:
@@ -0,0 +1,99 @@
+import json
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class WebhookSinkServer(ThreadingHTTPServer):
+    """
+    Local stand-in for Discord and Teams incoming webhooks, for load tests
+
+    Paths starting with /teams answer like Teams (200 with body "1"); anything else
+    answers like Discord (204, empty). Latency, random 5xx errors and per-path rate
+    limiting with 429 + Retry-After can be configured.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, latency_ms=50.0, jitter_ms=0.0, error_rate=0.0,
+                 rate_limit=0.0, retry_after=1.0):
+        super().__init__(address, WebhookSinkHandler)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        self.stats = Counter()
+        self._windows = defaultdict(list)
+        self._lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start_in_background(self) -> threading.Thread:
+        thread = threading.Thread(target=self.serve_forever, name='webhook-sink', daemon=True)
+        thread.start()
+        return thread
+
+    def is_rate_limited(self, path: str) -> bool:
+        """Sliding one-second window per webhook path, like Discord's per-webhook buckets"""
+        if not self.rate_limit:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            window = [t for t in self._windows[path] if now - t < 1.0]
+            limited = len(window) >= self.rate_limit
+            if not limited:
+                window.append(now)
+            self._windows[path] = window
+        return limited
+
+    def record(self, status_code: int):
+        with self._lock:
+            self.stats['requests'] += 1
+            self.stats[status_code] += 1
+
+
+class WebhookSinkHandler(BaseHTTPRequestHandler):
+    server: WebhookSinkServer
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        self.rfile.read(length)
+
+        server = self.server
+        delay = max(server.latency_ms + random.uniform(-server.jitter_ms, server.jitter_ms), 0)
+        time.sleep(delay / 1000)
+
+        is_teams = self.path.startswith('/teams')
+        if server.is_rate_limited(self.path):
+            body = json.dumps({
+                'message': 'You are being rate limited.',
+                'retry_after': server.retry_after,
+                'global': False,
+            }).encode('utf-8')
+            self._respond(429, body, {'Retry-After': f"{server.retry_after:g}", 'Content-Type': 'application/json'})
+        elif random.random() < server.error_rate:
+            self._respond(random.choice([500, 502, 503]), b'upstream error', {'Content-Type': 'text/plain'})
+        elif is_teams:
+            self._respond(200, b'1', {'Content-Type': 'text/plain'})
+        else:
+            self._respond(204, b'', {})
+
+    def _respond(self, status_code, body, headers):
+        self.server.record(status_code)
+        self.send_response(status_code)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Per-request logging would dominate a load test
+        pass
@@ -0,0 +1,1131 @@
+import gzip
+import json
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+import requests
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.db.models import QuerySet
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework.test import APITestCase
+
+from tasks.models import Project, Task
+from zentry_backend.pagination import EstimatedCountPaginator
+
+from . import backpressure, blobs, events, metrics, throttling
+from .digest import send_due_digests
+from .formatters import CompiledTemplate, TemplateError, format_batch
+from .logwriter import LogWriter
+from .models import DeliveryStats, DeliveryTotal, NotificationLog, PayloadBlob, WebhookIntegration
+from .retry import retry_after_delay
+from .routing import get_subscribed_integrations
+from .services import WebhookService, trigger_webhook_notifications
+from .sink import WebhookSinkServer
+from .throttling import CircuitBreaker, TokenBucket
+from .worker import OutboxWorker
+
+User = get_user_model()
+
+
+def http_response(status_code, text='', headers=None):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = text.encode('utf-8')
+    response.headers.update(headers or {})
+    return response
+
+
+class FakeSession:
+    """Stands in for the pooled requests session, answering posts with the given responses in turn"""
+
+    def __init__(self, *responses):
+        self.responses = list(responses) or [http_response(204)]
+        self.posts = []
+
+    def post(self, url, json=None, timeout=None):
+        self.posts.append(json)
+        response = self.responses.pop(0) if len(self.responses) > 1 else self.responses[0]
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+class InlineExecutor:
+    """Runs the worker's deliveries in the test thread, inside the test transaction"""
+
+    def map(self, fn, *iterables):
+        return map(fn, *iterables)
+
+    def shutdown(self, wait=True):
+        pass
+
+
+class WebhookTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        throttling._buckets.clear()
+        # Metrics are flushed explicitly; a flushing thread would write outside the test transaction
+        patcher = mock.patch.object(metrics.recorder, 'start_background_flush')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # flush() swaps the counters dict, so look it up when clearing
+        self.addCleanup(lambda: metrics.recorder._counters.clear())
+        metrics.recorder._counters.clear()
+        self.user = User.objects.create_user(username='hooks', password='pw')
+        self.project = Project.objects.create(name='Hooked', created_by=self.user)
+
+    def add_integration(self, **fields):
+        return WebhookIntegration.objects.create(**{
+            'name': 'Team chat', 'webhook_type': 'discord', 'webhook_url': 'https://example.com/hook',
+            'project': self.project, 'created_by': self.user, 'event_types': ['task_completed'],
+            **fields,
+        })
+
+    def answer(self, *responses):
+        """Send webhooks to a FakeSession answering with `responses` for the rest of the test"""
+        session = FakeSession(*responses)
+        for target in ['notifications.services.get_session', 'notifications.digest.get_session']:
+            patcher = mock.patch(target, return_value=session)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        return session
+
+    def worker(self):
+        worker = OutboxWorker(threads=1)
+        worker.executor.shutdown()
+        worker.executor = InlineExecutor()
+        # Pooled delivery recycles connections between batches, which would end the test transaction
+        patcher = mock.patch('notifications.services.close_old_connections')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return worker
+
+    def trigger(self, event_type='task_completed', data=None, **kwargs):
+        return trigger_webhook_notifications(event_type, data or {'task_title': 'Ship it', 'user_id': 1}, self.project.id, **kwargs)
+
+
+class RoutingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='hooks', password='pw')
+        self.project = Project.objects.create(name='Routed', created_by=self.user)
+
+    def test_integration_with_several_subscriptions_is_returned_once(self):
+        integration = WebhookIntegration.objects.create(
+            name='Team chat', webhook_type='discord', webhook_url='https://example.com/hook',
+            project=self.project, created_by=self.user,
+            event_types=['task_completed', 'badge_earned'],
+        )
+        self.assertEqual(integration.subscriptions.count(), 2)
+
+        self.assertEqual(get_subscribed_integrations('task_completed', self.project.id), [integration])
+        self.assertEqual(get_subscribed_integrations('badge_earned'), [integration])
+        self.assertEqual(get_subscribed_integrations('daily_streak', self.project.id), [])
+
+    def test_cached_routes_return_current_rows(self):
+        integration = WebhookIntegration.objects.create(
+            name='Team chat', webhook_type='discord', webhook_url='https://example.com/hook',
+            project=self.project, created_by=self.user, event_types=['task_completed'],
+        )
+        self.assertEqual(get_subscribed_integrations('task_completed', self.project.id), [integration])
+
+        # Another process trips the circuit, then disables the integration; this process's cache is not invalidated
+        WebhookIntegration.objects.filter(pk=integration.pk).update(circuit_state='open')
+        [current] = get_subscribed_integrations('task_completed', self.project.id)
+        self.assertEqual(current.circuit_state, 'open')
+        WebhookIntegration.objects.filter(pk=integration.pk).update(is_active=False)
+        self.assertEqual(get_subscribed_integrations('task_completed', self.project.id), [])
+
+
+class BlobTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(username='blobs', password='pw')
+        project = Project.objects.create(name='Blobs', created_by=user)
+        self.integration = WebhookIntegration.objects.create(
+            name='Blobs', webhook_type='teams', webhook_url='https://example.com/hook',
+            project=project, created_by=user, event_types=[],
+        )
+
+    def age(self, blob_hash, days=2):
+        then = timezone.now() - timedelta(days=days)
+        PayloadBlob.objects.filter(hash=blob_hash).update(created_at=then, last_used_at=then)
+
+    def test_identical_text_is_stored_once(self):
+        first = blobs.store_payload({'b': 1, 'a': 2})
+        second = blobs.store_payload({'a': 2, 'b': 1})
+        self.assertEqual(first, second)
+        self.assertEqual(PayloadBlob.objects.count(), 1)
+        self.assertIsNone(blobs.store_text(''))
+
+    def test_large_text_is_compressed_and_loads_back(self):
+        text = 'x' * 5000
+        blob_hash = blobs.store_text(text)
+        self.assertEqual(PayloadBlob.objects.get(hash=blob_hash).encoding, 'zlib')
+        blobs._texts.clear()
+        with self.assertNumQueries(1):
+            self.assertEqual(blobs.load_texts([blob_hash, None]), {blob_hash: text})
+        with self.assertNumQueries(0):
+            self.assertEqual(blobs.load_text(blob_hash), text)
+
+    def test_cache_is_bounded(self):
+        with mock.patch.object(blobs, 'CACHE_SIZE', 3):
+            hashes = [blobs.store_text(f'text {i}') for i in range(5)]
+            self.assertEqual(len(blobs._texts), 3)
+            # Evicted entries are read back from the table
+            self.assertEqual(blobs.load_text(hashes[0]), 'text 0')
+
+    def test_prune_keeps_referenced_and_recent_blobs(self):
+        referenced = blobs.store_payload({'kept': True})
+        NotificationLog.objects.create(webhook_integration=self.integration, event_type='test', payload_blob_id=referenced)
+        unreferenced = blobs.store_text('orphan')
+        recent = blobs.store_text('fresh orphan')
+        self.age(referenced)
+        self.age(unreferenced)
+
+        self.assertEqual(blobs.prune(), 1)
+        self.assertEqual(set(PayloadBlob.objects.values_list('hash', flat=True)), {referenced, recent})
+
+    def test_store_after_prune_inserts_again(self):
+        blob_hash = blobs.store_payload({'event': 1})
+        self.age(blob_hash)
+        blobs.prune()
+        self.assertFalse(PayloadBlob.objects.filter(hash=blob_hash).exists())
+
+        # Storing the same payload again must recreate the row the new log points at
+        self.assertEqual(blobs.store_payload({'event': 1}), blob_hash)
+        log = NotificationLog.objects.create(webhook_integration=self.integration, event_type='test', payload_blob_id=blob_hash)
+        self.assertEqual(log.payload, {'event': 1})
+
+    def test_reused_blob_survives_a_prune(self):
+        blob_hash = blobs.store_payload({'event': 1})
+        self.age(blob_hash)
+        # A new event with the same payload picks the old, unreferenced blob up again...
+        self.assertEqual(blobs.store_payload({'event': 1}), blob_hash)
+        # ...so a prune running before its log is written must leave it alone
+        self.assertEqual(blobs.prune(), 0)
+        log = NotificationLog.objects.create(webhook_integration=self.integration, event_type='test', payload_blob_id=blob_hash)
+        self.assertEqual(log.payload, {'event': 1})
+
+
+class ResponseBlobTests(WebhookTestCase):
+    def test_delivery_stays_sent_when_its_response_cannot_be_stored(self):
+        self.add_integration()
+        self.answer(http_response(200, 'ok'))
+        [log] = self.trigger()
+
+        with mock.patch('notifications.services.store_text', side_effect=RuntimeError('disk full')), \
+                self.assertLogs('notifications.services', 'ERROR') as logs:
+            WebhookService.deliver_batch([log])
+
+        log.refresh_from_db()
+        self.assertEqual((log.status, log.response_status_code, log.response_blob_id, log.error_message), ('sent', 200, None, ''))
+        self.assertIn('Failed to store webhook response body: disk full', logs.output[0])
+
+
+class OutboxTests(WebhookTestCase):
+    def test_events_are_queued_and_delivered_by_the_worker(self):
+        self.add_integration()
+        session = self.answer(http_response(204))
+
+        [log] = self.trigger()
+        self.assertEqual(log.status, 'pending')
+        self.assertEqual(session.posts, [])
+
+        worker = self.worker()
+        self.assertEqual(worker.process_batch(), 1)
+        worker.writer.flush()
+
+        log.refresh_from_db()
+        self.assertEqual(log.status, 'sent')
+        self.assertEqual(log.response_status_code, 204)
+        self.assertEqual(len(session.posts), 1)
+
+    def test_claimed_rows_are_not_claimed_again(self):
+        self.add_integration()
+        self.trigger(data={'n': 1})
+        self.trigger(data={'n': 2})
+
+        first, second = self.worker(), self.worker()
+        self.assertEqual(len(first.claim_batch()), 2)
+        self.assertEqual(second.claim_batch(), [])
+        self.assertEqual(set(NotificationLog.objects.values_list('claimed_by', flat=True)), {first.worker_id})
+
+    def test_claim_loses_cleanly_to_a_concurrent_worker(self):
+        self.add_integration()
+        self.trigger()
+        update = QuerySet.update
+
+        def other_worker_claims_first(queryset, **kwargs):
+            # Between reading the due IDs and claiming them, another worker takes the rows
+            update(NotificationLog.objects.filter(status='pending'), status='processing', claimed_by='other', claimed_at=timezone.now())
+            return update(queryset, **kwargs)
+
+        worker = self.worker()
+        with mock.patch.object(QuerySet, 'update', autospec=True, side_effect=other_worker_claims_first):
+            self.assertEqual(worker.claim_batch(), [])
+        self.assertEqual(NotificationLog.objects.get().claimed_by, 'other')
+
+    def test_rows_not_due_yet_are_left_alone(self):
+        self.add_integration()
+        [log] = self.trigger()
+        NotificationLog.objects.filter(pk=log.pk).update(next_attempt_at=timezone.now() + timedelta(minutes=5))
+        self.assertEqual(self.worker().claim_batch(), [])
+
+    def test_stale_claims_are_released(self):
+        self.add_integration()
+        [log] = self.trigger()
+        NotificationLog.objects.filter(pk=log.pk).update(
+            status='processing', claimed_by='crashed', claimed_at=timezone.now() - timedelta(hours=1)
+        )
+        worker = self.worker()
+        with self.assertLogs('notifications.worker', 'WARNING'):
+            self.assertEqual(worker.release_stale_claims(), 1)
+        self.assertEqual([claimed.pk for claimed in worker.claim_batch()], [log.pk])
+
+
+@override_settings(WEBHOOK_RETRY_BASE_DELAY=10, WEBHOOK_MAX_RETRIES=3)
+class RetryTests(WebhookTestCase):
+    def setUp(self):
+        super().setUp()
+        self.integration = self.add_integration()
+
+    def deliver(self, *responses, **fields):
+        self.answer(*responses)
+        log = WebhookService.enqueue_notification(self.integration, 'task_completed', {'task_title': 'Retry me'})
+        if fields:
+            NotificationLog.objects.filter(pk=log.pk).update(**fields)
+            log.refresh_from_db()
+        started = timezone.now()
+        WebhookService.deliver(log)
+        log.refresh_from_db()
+        return log, (log.next_attempt_at - started).total_seconds()
+
+    def test_server_errors_back_off_exponentially(self):
+        log, delay = self.deliver(http_response(502))
+        self.assertEqual((log.status, log.retry_count), ('retry', 1))
+        self.assertTrue(5 <= delay <= 10.5, delay)
+
+        log, delay = self.deliver(http_response(503), retry_count=2)
+        self.assertEqual((log.status, log.retry_count), ('retry', 3))
+        self.assertTrue(20 <= delay <= 40.5, delay)
+
+    def test_connection_errors_are_retried(self):
+        log, _ = self.deliver(requests.exceptions.ConnectionError('refused'))
+        self.assertEqual((log.status, log.retry_count), ('retry', 1))
+
+    def test_exhausted_retries_and_client_errors_fail(self):
+        log, _ = self.deliver(http_response(500), retry_count=3)
+        self.assertEqual((log.status, log.retry_count), ('failed', 3))
+        log, _ = self.deliver(http_response(404))
+        self.assertEqual((log.status, log.retry_count), ('failed', 0))
+
+    def test_retry_after_is_honoured(self):
+        log, delay = self.deliver(http_response(503, headers={'Retry-After': '30'}))
+        self.assertEqual(log.status, 'retry')
+        self.assertTrue(30 <= delay <= 33.5, delay)
+
+    def test_throttling_does_not_use_up_the_retry_budget(self):
+        log, delay = self.deliver(http_response(429, headers={'Retry-After': '2'}), retry_count=3)
+        self.assertEqual((log.status, log.retry_count), ('retry', 3))
+        self.assertTrue(2 <= delay <= 2.5, delay)
+
+    @override_settings(WEBHOOK_THROTTLED_RETRY_MAX_AGE=3600)
+    def test_throttling_has_its_own_age_limit(self):
+        log, _ = self.deliver(http_response(429), created_at=timezone.now() - timedelta(hours=2))
+        self.assertEqual(log.status, 'failed')
+
+    def test_retry_after_formats(self):
+        self.assertEqual(retry_after_delay(http_response(429, headers={'Retry-After': '7'})), 7.0)
+        at = http_date((timezone.now() + timedelta(seconds=60)).timestamp())
+        self.assertTrue(55 <= retry_after_delay(http_response(503, headers={'Retry-After': at})) <= 60)
+        self.assertEqual(retry_after_delay(http_response(429, '{"retry_after": 1.5}')), 1.5)
+        self.assertIsNone(retry_after_delay(http_response(503, 'busy')))
+
+
+@override_settings(WEBHOOK_CIRCUIT_FAILURE_THRESHOLD=2, WEBHOOK_CIRCUIT_COOLDOWN=60)
+class CircuitBreakerTests(WebhookTestCase):
+    def setUp(self):
+        super().setUp()
+        self.integration = self.add_integration()
+
+    def reload(self):
+        return WebhookIntegration.objects.get(pk=self.integration.pk)
+
+    def test_opens_after_consecutive_failures(self):
+        CircuitBreaker.record_failure(self.integration)
+        self.assertEqual(self.integration.circuit_state, 'closed')
+        CircuitBreaker.record_failure(self.integration)
+        self.assertEqual(self.reload().circuit_state, 'open')
+
+        allowed, retry_in = CircuitBreaker.allow_request(self.integration)
+        self.assertFalse(allowed)
+        self.assertTrue(0 < retry_in.total_seconds() <= 60)
+
+    def test_open_circuit_defers_without_a_request(self):
+        CircuitBreaker.record_failure(self.integration)
+        CircuitBreaker.record_failure(self.integration)
+        session = self.answer(http_response(204))
+        log = WebhookService.send_notification(self.integration, 'task_completed', {})
+        self.assertEqual((log.status, log.retry_count), ('pending', 0))
+        self.assertGreater(log.next_attempt_at, timezone.now())
+        self.assertEqual(session.posts, [])
+
+    def test_one_half_open_trial_after_the_cooldown(self):
+        opened_at = timezone.now() - timedelta(seconds=61)
+        WebhookIntegration.objects.filter(pk=self.integration.pk).update(
+            circuit_state='open', circuit_opened_at=opened_at, consecutive_failures=2
+        )
+        first, second = self.reload(), self.reload()
+
+        self.assertEqual(CircuitBreaker.allow_request(first), (True, None))
+        self.assertEqual(first.circuit_state, 'half_open')
+        # A second caller that read the open state loses the transition
+        self.assertFalse(CircuitBreaker.allow_request(second)[0])
+
+        CircuitBreaker.record_success(first)
+        state = self.reload()
+        self.assertEqual((state.circuit_state, state.consecutive_failures), ('closed', 0))
+
+    def test_failed_trial_reopens(self):
+        WebhookIntegration.objects.filter(pk=self.integration.pk).update(
+            circuit_state='half_open', circuit_opened_at=timezone.now(), consecutive_failures=2
+        )
+        CircuitBreaker.record_failure(self.reload())
+        self.assertEqual(self.reload().circuit_state, 'open')
+
+    def test_rate_limited_responses_do_not_trip_the_breaker(self):
+        self.answer(http_response(429, headers={'Retry-After': '1'}))
+        for _ in range(3):
+            WebhookService.send_notification(self.integration, 'task_completed', {})
+        self.assertEqual(self.reload().consecutive_failures, 0)
+
+
+class TokenBucketTests(WebhookTestCase):
+    def test_burst_then_rate(self):
+        bucket = TokenBucket(rate=2.0, capacity=3)
+        self.assertEqual([bucket.try_acquire() for _ in range(3)], [0.0, 0.0, 0.0])
+        wait = bucket.try_acquire()
+        self.assertTrue(0 < wait <= 0.5, wait)
+
+    @override_settings(WEBHOOK_RATE_LIMIT_PER_SECOND=1.0, WEBHOOK_RATE_LIMIT_BURST=1, WEBHOOK_RATE_LIMIT_MAX_WAIT=0.0)
+    def test_exhausted_bucket_defers_to_the_outbox(self):
+        integration = self.add_integration(webhook_type='teams')
+        session = self.answer(http_response(200, '1'))
+        sent = WebhookService.send_notification(integration, 'task_completed', {})
+        deferred = WebhookService.send_notification(integration, 'task_completed', {'second': True})
+        self.assertEqual(sent.status, 'sent')
+        self.assertEqual(deferred.status, 'pending')
+        self.assertEqual(len(session.posts), 1)
+
+
+class BatchingTests(WebhookTestCase):
+    def deliver_all(self):
+        NotificationLog.objects.update(next_attempt_at=timezone.now())
+        worker = self.worker()
+        worker.process_batch()
+        worker.writer.flush()
+
+    def test_discord_events_in_a_window_share_one_message(self):
+        self.add_integration(batch_window_seconds=30)
+        session = self.answer(http_response(204))
+        logs = [self.trigger(data={'task_title': f'Task {n}'})[0] for n in range(3)]
+        self.assertEqual(len({log.next_attempt_at for log in logs}), 1)
+
+        self.deliver_all()
+        [payload] = session.posts
+        self.assertEqual(len(payload['embeds']), 3)
+        self.assertEqual(set(NotificationLog.objects.values_list('status', flat=True)), {'sent'})
+
+    def test_discord_batches_are_capped_at_ten_embeds(self):
+        self.add_integration(batch_window_seconds=30, batch_max_events=50)
+        session = self.answer(http_response(204))
+        for n in range(12):
+            self.trigger(data={'task_title': f'Task {n}'})
+
+        self.deliver_all()
+        self.assertEqual(sorted(len(payload['embeds']) for payload in session.posts), [2, 10])
+
+    def test_full_window_is_released_early(self):
+        self.add_integration(batch_window_seconds=300, batch_max_events=2)
+        first = self.trigger(data={'task_title': 'First'})[0]
+        self.assertGreater(first.next_attempt_at, timezone.now())
+        self.trigger(data={'task_title': 'Second'})
+        self.assertFalse(NotificationLog.objects.filter(next_attempt_at__gt=timezone.now()).exists())
+
+    def test_teams_events_are_joined_into_one_card(self):
+        self.add_integration(webhook_type='teams', batch_window_seconds=30)
+        session = self.answer(http_response(200, '1'))
+        self.trigger(data={'task_title': 'First'})
+        self.trigger(data={'task_title': 'Second'})
+
+        self.deliver_all()
+        [payload] = session.posts
+        self.assertEqual(payload['text'].count('\n\n---\n\n'), 1)
+        self.assertIn('First', payload['text'])
+        self.assertIn('Second', payload['text'])
+
+    def test_integrations_without_a_window_send_each_event(self):
+        self.add_integration()
+        session = self.answer(http_response(204))
+        self.trigger(data={'task_title': 'First'})
+        self.trigger(data={'task_title': 'Second'})
+
+        self.deliver_all()
+        self.assertEqual([len(payload['embeds']) for payload in session.posts], [1, 1])
+
+
+class EmitTests(WebhookTestCase):
+    def test_unsubscribed_events_never_build_a_payload(self):
+        build = mock.Mock(return_value={})
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.assertFalse(events.emit('task_completed', build, self.project.id))
+        self.assertEqual(callbacks, [])
+        build.assert_not_called()
+
+    def test_events_are_dispatched_after_commit(self):
+        integration = self.add_integration()
+        build = mock.Mock(return_value={'task_title': 'Ship it'})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(events.emit('task_completed', build, self.project.id, 'task:1:done'))
+            build.assert_not_called()
+            self.assertFalse(NotificationLog.objects.exists())
+
+        build.assert_called_once_with()
+        log = NotificationLog.objects.get()
+        self.assertEqual((log.event_type, log.idempotency_key), ('task_completed', f'{integration.id}:task:1:done'))
+
+    def test_rolled_back_events_are_dropped(self):
+        self.add_integration()
+        build = mock.Mock(return_value={})
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    events.emit('task_completed', build, self.project.id)
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertEqual(callbacks, [])
+        build.assert_not_called()
+        self.assertFalse(NotificationLog.objects.exists())
+
+    def test_dispatch_errors_do_not_reach_the_caller(self):
+        self.add_integration()
+        with self.assertLogs('notifications.events', 'ERROR'), self.captureOnCommitCallbacks(execute=True):
+            events.emit('task_completed', mock.Mock(side_effect=KeyError('task')), self.project.id)
+
+
+class TaskCompletedSignalTests(WebhookTestCase):
+    def setUp(self):
+        super().setUp()
+        self.add_integration()
+        self.task = Task.objects.create(title='Ship it', project=self.project, created_by=self.user, assigned_to=self.user)
+
+    def save(self, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.task.save(**kwargs)
+        return NotificationLog.objects.filter(event_type='task_completed').count()
+
+    def test_only_the_transition_to_completed_emits(self):
+        self.task.status = 'completed'
+        self.task.completed_at = timezone.now()
+        self.assertEqual(self.save(), 1)
+
+        self.task.title = 'Shipped'
+        self.assertEqual(self.save(), 1)
+        self.assertEqual(self.save(update_fields=['status', 'title']), 1)
+
+    def test_each_completion_has_its_own_key(self):
+        # Completed through the API: status changes, completed_at is never set
+        for status in ['completed', 'todo', 'completed']:
+            self.task.status = status
+            self.save()
+        keys = NotificationLog.objects.values_list('idempotency_key', flat=True)
+        self.assertEqual(len(keys), 2)
+        self.assertEqual(len(set(keys)), 2)
+
+    def test_partial_save_reports_only_what_it_writes(self):
+        self.task.status = 'completed'
+        self.assertEqual(self.save(update_fields=['title']), 0)
+        self.assertEqual(self.save(update_fields=['status']), 1)
+
+
+class FanOutTests(WebhookTestCase):
+    def queries_to_trigger(self, n):
+        with CaptureQueriesContext(connection) as queries:
+            logs = self.trigger(data={'task_title': f'Fan out {n}'})
+        self.assertEqual(len(logs), NotificationLog.objects.filter(payload_blob_id=logs[0].payload_blob_id).count())
+        return len(queries)
+
+    def test_queueing_costs_the_same_for_any_number_of_integrations(self):
+        self.add_integration()
+        self.trigger(data={'task_title': 'Warm the route cache'})
+        one = self.queries_to_trigger(1)
+
+        for n in range(4):
+            self.add_integration(name=f'Chat {n}')
+        self.trigger(data={'task_title': 'Warm the route cache again'})
+        self.assertEqual(self.queries_to_trigger(2), one)
+
+
+class LogWriterTests(WebhookTestCase):
+    def setUp(self):
+        super().setUp()
+        integration = self.add_integration()
+        payload_blob_id = blobs.store_payload({})
+        self.logs = [
+            NotificationLog.objects.create(
+                webhook_integration=integration, event_type='task_completed', status='processing',
+                payload_blob_id=payload_blob_id,
+            )
+            for _ in range(3)
+        ]
+        for log in self.logs:
+            log.status = 'sent'
+            log.response_status_code = 204
+
+    def statuses(self):
+        return list(NotificationLog.objects.order_by('id').values_list('status', flat=True))
+
+    def test_buffers_until_full(self):
+        writer = LogWriter(flush_size=3, flush_interval=60)
+        writer.add(self.logs[:2])
+        self.assertEqual(len(writer), 2)
+        self.assertEqual(self.statuses(), ['processing'] * 3)
+
+        with self.assertNumQueries(1):
+            writer.add(self.logs[2:])
+        self.assertEqual(len(writer), 0)
+        self.assertEqual(self.statuses(), ['sent'] * 3)
+
+    def test_flushes_when_the_interval_has_passed(self):
+        writer = LogWriter(flush_size=100, flush_interval=60)
+        writer.add(self.logs)
+        writer.flush_if_due()
+        self.assertEqual(self.statuses(), ['processing'] * 3)
+
+        writer.flush_interval = 0
+        writer.flush_if_due()
+        self.assertEqual(self.statuses(), ['sent'] * 3)
+        self.assertEqual(writer.flush(), 0)
+
+    def test_failed_write_is_logged_and_left_for_the_claim_timeout(self):
+        writer = LogWriter(flush_size=100)
+        writer.add(self.logs)
+        with mock.patch.object(NotificationLog.objects, 'bulk_update', side_effect=RuntimeError('locked')), \
+                self.assertLogs('notifications.logwriter', 'ERROR'):
+            self.assertEqual(writer.flush(), 0)
+        self.assertEqual(self.statuses(), ['processing'] * 3)
+
+
+class ArchiveTests(WebhookTestCase):
+    def setUp(self):
+        super().setUp()
+        integration = self.add_integration()
+        self.archive_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.archive_dir)
+
+        def log(status, age_days, title):
+            created_at = timezone.now() - timedelta(days=age_days)
+            entry = NotificationLog.objects.create(
+                webhook_integration=integration, event_type='task_completed', status=status,
+                payload_blob_id=blobs.store_payload({'task_title': title}),
+            )
+            NotificationLog.objects.filter(pk=entry.pk).update(created_at=created_at)
+            PayloadBlob.objects.filter(hash=entry.payload_blob_id).update(created_at=created_at, last_used_at=created_at)
+            return entry
+
+        self.old_sent = [log('sent', 40, 'Old 1'), log('failed', 45, 'Old 2')]
+        self.old_pending = log('pending', 40, 'Waiting')
+        self.recent = log('sent', 1, 'Recent')
+
+    def archive(self, *args):
+        out = StringIO()
+        call_command('archive_notification_logs', '--days=30', f'--archive-dir={self.archive_dir}', *args, stdout=out)
+        return out.getvalue()
+
+    def archived_rows(self):
+        rows = []
+        for path in sorted(self.archive_dir.glob('*.ndjson.gz')):
+            with gzip.open(path, 'rt') as archive:
+                rows.extend(json.loads(line) for line in archive)
+        return rows
+
+    def test_old_finished_logs_move_to_the_archive(self):
+        # One-row chunks append several gzip members to the same monthly file
+        self.archive('--chunk-size=1')
+
+        rows = self.archived_rows()
+        self.assertEqual(sorted(row['id'] for row in rows), sorted(log.id for log in self.old_sent))
+        self.assertEqual({row['payload']['task_title'] for row in rows}, {'Old 1', 'Old 2'})
+        self.assertEqual(
+            set(NotificationLog.objects.values_list('id', flat=True)),
+            {self.old_pending.id, self.recent.id},
+        )
+        # The archived payloads are no longer stored, the live ones are
+        self.assertEqual(PayloadBlob.objects.filter(hash__in=[log.payload_blob_id for log in self.old_sent]).count(), 0)
+        self.assertEqual(PayloadBlob.objects.filter(hash=self.recent.payload_blob_id).count(), 1)
+
+    def test_archive_keeps_every_column(self):
+        log = self.old_sent[0]
+        NotificationLog.objects.filter(pk=log.pk).update(
+            idempotency_key=f'{log.webhook_integration_id}:task_completed:1', priority=NotificationLog.PRIORITY_HIGH,
+            response_status_code=200, response_blob_id=blobs.store_text('ok'), error_message='slow',
+            retry_count=2, duration_ms=1234, claimed_by='worker-1', claimed_at=timezone.now(), sent_at=timezone.now(),
+        )
+        log.refresh_from_db()
+        self.archive()
+
+        [row] = [row for row in self.archived_rows() if row['id'] == log.id]
+        inlined = {'payload_blob_id': ('payload', log.payload), 'response_blob_id': ('response_body', log.response_body)}
+        for field in NotificationLog._meta.concrete_fields:
+            key, value = inlined.get(field.attname, (field.attname, getattr(log, field.attname)))
+            self.assertEqual(row[key], json.loads(json.dumps(value, cls=DjangoJSONEncoder)), field.name)
+
+    def test_dry_run_changes_nothing(self):
+        self.assertIn('2 notification logs', self.archive('--dry-run'))
+        self.assertEqual(NotificationLog.objects.count(), 4)
+        self.assertEqual(list(self.archive_dir.iterdir()), [])
+
+
+class DeadLetterApiTests(WebhookTestCase, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.user)
+        self.integration = self.add_integration()
+        other = self.add_integration(name='Other chat')
+        payload_blob_id = blobs.store_payload({})
+        self.failed = [
+            NotificationLog.objects.create(
+                webhook_integration=integration, event_type='task_completed', status='failed',
+                retry_count=5, payload_blob_id=payload_blob_id,
+            )
+            for integration in [self.integration] * 5 + [other]
+        ]
+
+    def test_filters_by_integration(self):
+        response = self.client.get(reverse('notificationlog-dead-letters'), {'integration': self.integration.id})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 5)
+
+    def test_invalid_filters_are_rejected(self):
+        for params in [{'integration': 'abc'}, {'integration': 0}, {'since': 'yesterday'},
+                       {'since': '2024-01-16T00:00:00Z', 'until': '2024-01-15T00:00:00Z'}]:
+            response = self.client.get(reverse('notificationlog-dead-letters'), params)
+            self.assertEqual(response.status_code, 400, params)
+
+        for body in [{'rate': 0}, {'rate': -1}, {'rate': 'fast'}, {'until': 'tomorrow'}]:
+            response = self.client.post(reverse('notificationlog-replay-dead-letters'), body, format='json')
+            self.assertEqual(response.status_code, 400, body)
+        self.assertFalse(NotificationLog.objects.exclude(status='failed').exists())
+
+    def test_replay_spreads_requeued_logs_at_the_rate(self):
+        response = self.client.post(
+            reverse('notificationlog-replay-dead-letters'),
+            {'integration': self.integration.id, 'rate': 2}, format='json',
+        )
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['requeued'], 5)
+
+        requeued = NotificationLog.objects.filter(webhook_integration=self.integration).order_by('id')
+        self.assertEqual({(log.status, log.retry_count) for log in requeued}, {('pending', 0)})
+        start = requeued[0].next_attempt_at
+        self.assertEqual([(log.next_attempt_at - start).total_seconds() for log in requeued], [0, 0, 1, 1, 2])
+        self.assertEqual(NotificationLog.objects.filter(status='failed').count(), 1)
+
+
+class IdempotencyTests(WebhookTestCase):
+    def setUp(self):
+        super().setUp()
+        self.integration = self.add_integration()
+
+    def test_repeated_events_are_queued_once(self):
+        self.assertEqual(len(self.trigger(idempotency_key='task:1:todo->completed:t1')), 1)
+        self.assertEqual(self.trigger(data={'task_title': 'Changed'}, idempotency_key='task:1:todo->completed:t1'), [])
+        self.assertEqual(len(self.trigger(idempotency_key='task:1:todo->completed:t2')), 1)
+
+    @override_settings(WEBHOOK_DEDUP_WINDOW_SECONDS=0)
+    def test_dedup_can_be_disabled(self):
+        self.trigger(idempotency_key='task:1:todo->completed:t1')
+        self.assertEqual(len(self.trigger(idempotency_key='task:1:todo->completed:t1')), 1)
+
+    def test_worker_skips_duplicates_that_reach_the_outbox(self):
+        session = self.answer(http_response(204))
+        payload_blob_id = blobs.store_payload({'task_title': 'Racing'})
+
+        def queue(key, status='pending'):
+            return NotificationLog.objects.create(
+                webhook_integration=self.integration, event_type='task_completed', status=status,
+                idempotency_key=key, payload_blob_id=payload_blob_id,
+            )
+
+        queue('1:task:1:sent', status='sent')
+        already_sent = queue('1:task:1:sent')
+        first, repeat = queue('1:task:2:racing'), queue('1:task:2:racing')
+
+        worker = self.worker()
+        worker.process_batch()
+        worker.writer.flush()
+
+        statuses = dict(NotificationLog.objects.values_list('id', 'status'))
+        self.assertEqual(statuses[already_sent.id], 'skipped')
+        self.assertEqual({statuses[first.id], statuses[repeat.id]}, {'sent', 'skipped'})
+        self.assertEqual(len(session.posts), 1)
+
+
+class SinkTests(WebhookTestCase):
+    def start_sink(self, **options):
+        sink = WebhookSinkServer(('127.0.0.1', 0), latency_ms=0, **options)
+        sink.start_in_background()
+        self.addCleanup(sink.server_close)
+        self.addCleanup(sink.shutdown)
+        return sink
+
+    def test_answers_like_discord_and_teams(self):
+        sink = self.start_sink()
+        discord = requests.post(f'{sink.url}/discord/1', json={'content': 'hi'}, timeout=5)
+        teams = requests.post(f'{sink.url}/teams/1', json={'text': 'hi'}, timeout=5)
+        self.assertEqual((discord.status_code, discord.text), (204, ''))
+        self.assertEqual((teams.status_code, teams.text), (200, '1'))
+        self.assertEqual(sink.stats['requests'], 2)
+
+    def test_rate_limits_each_path_with_retry_after(self):
+        sink = self.start_sink(rate_limit=1, retry_after=2.5)
+        self.assertEqual(requests.post(f'{sink.url}/a', json={}, timeout=5).status_code, 204)
+        limited = requests.post(f'{sink.url}/a', json={}, timeout=5)
+        self.assertEqual(limited.status_code, 429)
+        self.assertEqual(limited.headers['Retry-After'], '2.5')
+        self.assertEqual(limited.json()['retry_after'], 2.5)
+        # Buckets are per webhook path
+        self.assertEqual(requests.post(f'{sink.url}/b', json={}, timeout=5).status_code, 204)
+
+    def test_error_rate(self):
+        sink = self.start_sink(error_rate=1.0)
+        self.assertIn(requests.post(f'{sink.url}/a', json={}, timeout=5).status_code, [500, 502, 503])
+
+    def test_deliveries_reach_the_sink(self):
+        sink = self.start_sink()
+        integration = self.add_integration(webhook_type='teams', webhook_url=f'{sink.url}/teams/1')
+        log = WebhookService.send_notification(integration, 'task_completed', {'task_title': 'Ship it'})
+        self.assertEqual((log.status, log.response_status_code, log.response_body), ('sent', 200, '1'))
+        self.assertEqual(sink.stats[200], 1)
+
+
+class TemplateTests(WebhookTestCase, APITestCase):
+    def test_renders_defaults_conversions_and_specs(self):
+        template = CompiledTemplate("{{{user_name|Someone}}} {points:>4} {title!r} {ratio:.1%} {missing|}")
+        self.assertEqual(template.names, {'user_name', 'points', 'title', 'ratio', 'missing'})
+        self.assertEqual(
+            template.render_data({'points': 7, 'title': 'A', 'ratio': 0.25}),
+            "{Someone}    7 'A' 25.0% "
+        )
+
+    def test_rejects_lookups_and_oversized_specs(self):
+        for source in ['{x.__class__}', '{x[0]}', '{x:>20000000}', '{x:.5000}', '{x:{y}}', '{x!z}', '{x:%Y}', '{']:
+            with self.assertRaises(TemplateError, msg=source):
+                CompiledTemplate(source)
+        self.assertEqual(len(CompiledTemplate('{x:>1024}').render_data({'x': 'a'})), 1024)
+
+    def test_invalid_templates_are_rejected_by_the_api(self):
+        integration = self.add_integration()
+        response = self.client.patch(
+            reverse('webhookintegration-detail', args=[integration.id]),
+            {'message_templates': {'task_completed': '{task_title:>20000000}'}}, format='json',
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('message_templates', response.data)
+
+    def test_stored_invalid_template_falls_back_to_the_built_in_format(self):
+        templates = {'task_completed': '{task_title.upper}'}
+        with self.assertLogs('notifications.formatters', 'WARNING'):
+            payload = format_batch('teams', [('task_completed', {'task_title': 'Ship it'})], templates)
+        self.assertIn('**Task:** Ship it', payload['text'])
+
+    def test_teams_text_without_extras_renders_directly(self):
+        payload = format_batch('teams', [('task_completed', {'task_title': 'Ship it'})], {'task_completed': 'Done: {task_title}'})
+        self.assertEqual(payload, {'text': 'Done: Ship it'})
+
+
+class DigestTests(WebhookTestCase):
+    def setUp(self):
+        super().setUp()
+        self.integration = self.add_integration(
+            webhook_type='teams', delivery_mode='hourly', event_types=['task_completed', 'badge_earned'],
+        )
+
+    def hold_events(self):
+        for n, user in enumerate(['ana', 'ana', 'ben']):
+            self.trigger(data={'task_title': f'Task {n}', 'user_name': user, 'points': 10})
+        self.trigger('badge_earned', {'user_name': 'ben', 'badge_name': 'Finisher'})
+
+    def test_events_are_held_until_the_period_ends(self):
+        session = self.answer(http_response(200, '1'))
+        self.hold_events()
+        self.assertEqual(set(NotificationLog.objects.values_list('status', flat=True)), {'digest'})
+        self.assertEqual(NotificationLog.objects.get(event_type='badge_earned').next_attempt_at,
+                         self.integration.digest_due_at())
+        self.assertEqual(send_due_digests(), {})
+        self.assertEqual(session.posts, [])
+
+    def test_one_summary_covers_every_held_event(self):
+        session = self.answer(http_response(200, '1'))
+        self.hold_events()
+
+        # claim, summarise, integrations, response blob in a savepoint, settle (payloads are still cached)
+        with self.assertNumQueries(7):
+            results = send_due_digests(force=True)
+        self.assertEqual(results, {'sent': 4})
+
+        [payload] = session.posts
+        text = payload['text']
+        self.assertIn('**4 events** (3 task completed, 1 badge earned)', text)
+        self.assertIn('**ana**: 2', text)
+        self.assertIn('🥇 **ana**: 20 XP', text)
+        self.assertIn('🏆 **ben**: Finisher', text)
+        self.assertEqual(set(NotificationLog.objects.values_list('status', 'response_status_code')), {('sent', 200)})
+
+    def test_failed_summary_is_held_for_a_retry(self):
+        self.answer(http_response(503))
+        self.hold_events()
+        self.assertEqual(send_due_digests(force=True), {'retry': 4})
+        log = NotificationLog.objects.first()
+        self.assertEqual((log.status, log.retry_count), ('digest', 1))
+        self.assertGreater(log.next_attempt_at, timezone.now())
+
+
+class MetricsTests(WebhookTestCase, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.integration = self.add_integration(name='Team "chat"')
+        self.recorder = metrics.MetricsRecorder(flush_interval=60)
+        self.recorder.start_background_flush = mock.Mock()
+
+    def prometheus(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get(reverse('webhook-delivery-metrics-prometheus'))
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode()
+
+    def sample(self, text, name, **labels):
+        selector = ','.join(f'{key}="{value}"' for key, value in labels.items())
+        for line in text.splitlines():
+            if line.startswith(f'{name}{{') and selector in line:
+                return float(line.rsplit(' ', 1)[1])
+        self.fail(f'{name} {labels} not in output')
+
+    def test_flush_keeps_cumulative_totals(self):
+        self.recorder.record(self.integration, {'sent': 2}, duration_ms=80)
+        self.recorder.record(self.integration, {'failed': 1}, duration_ms=20000)
+        self.assertEqual(self.recorder.flush(), 1)
+        self.recorder.record(self.integration, {'sent': 1}, duration_ms=80)
+        self.recorder.flush()
+
+        totals = dict(DeliveryTotal.objects.values_list('counter', 'value'))
+        self.assertEqual(totals, {'sent': 3, 'failed': 1, 'requests': 3, 'duration_sum_ms': 20160, 'le_100': 2, 'le_inf': 1})
+        # Minute rows are pruned after the retention window; the totals are not
+        DeliveryStats.objects.all().delete()
+        [summary] = metrics.cumulative_totals()
+        self.assertEqual((summary['sent'], summary['requests']), (3, 3))
+
+    def test_prometheus_exports_counters_and_a_cumulative_histogram(self):
+        self.recorder.record(self.integration, {'sent': 2}, duration_ms=80)
+        self.recorder.record(self.integration, {'sent': 1}, duration_ms=300)
+        self.recorder.flush()
+        text = self.prometheus()
+
+        self.assertIn('# TYPE zentry_webhook_deliveries_total counter', text)
+        self.assertIn('integration="Team \\"chat\\""', text)
+        self.assertEqual(self.sample(text, 'zentry_webhook_deliveries_total', outcome='sent'), 3)
+        histogram = 'zentry_webhook_request_duration_seconds_bucket'
+        self.assertEqual(self.sample(text, histogram, le='0.05'), 0)
+        self.assertEqual(self.sample(text, histogram, le='0.1'), 1)
+        self.assertEqual(self.sample(text, histogram, le='0.5'), 2)
+        self.assertEqual(self.sample(text, histogram, le='+Inf'), 2)
+        self.assertEqual(self.sample(text, 'zentry_webhook_request_duration_seconds_count'), 2)
+
+        # Counters never go down, whatever window the JSON endpoint is asked for
+        self.recorder.record(self.integration, {'sent': 1})
+        self.recorder.flush()
+        DeliveryStats.objects.all().delete()
+        self.assertEqual(self.sample(self.prometheus(), 'zentry_webhook_deliveries_total', outcome='sent'), 4)
+
+    def test_queue_gauges(self):
+        self.trigger()
+        text = self.prometheus()
+        self.assertEqual(self.sample(text, 'zentry_webhook_queue_depth', status='pending'), 1)
+
+    @override_settings(WEBHOOK_METRICS_TOKEN='scrape-secret')
+    def test_scraper_authenticates_with_the_token_instead_of_a_session(self):
+        url = reverse('webhook-delivery-metrics-prometheus')
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+        response = self.client.get(url, HTTP_AUTHORIZATION='Bearer scrape-secret')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('# TYPE zentry_webhook_deliveries_total counter', response.content.decode())
+        # The token only opens the scrape endpoint
+        self.assertEqual(self.client.get(reverse('webhook-delivery-metrics'), HTTP_AUTHORIZATION='Bearer scrape-secret').status_code, 403)
+
+    def test_scraping_without_a_token_configured_needs_a_session(self):
+        response = self.client.get(reverse('webhook-delivery-metrics-prometheus'), HTTP_AUTHORIZATION='Bearer ')
+        self.assertEqual(response.status_code, 403)
+
+    def test_recording_never_touches_the_database(self):
+        recorder = metrics.MetricsRecorder(flush_interval=0)
+        recorder.start_background_flush = mock.Mock()
+        with self.assertNumQueries(0):
+            recorder.record(self.integration, {'sent': 1}, duration_ms=80)
+        self.assertEqual(len(recorder.snapshot()), 1)
+
+    def test_percentiles_in_the_overflow_bucket_are_marked(self):
+        self.recorder.record(self.integration, {'sent': 1}, duration_ms=80)
+        for _ in range(4):
+            self.recorder.record(self.integration, {'failed': 1}, duration_ms=30000)
+        latency = metrics._summarize(self.recorder.snapshot()[0])['latency_ms']
+        self.assertEqual((latency['p50'], latency['p95'], latency['p99']), ('>10000', '>10000', '>10000'))
+        self.assertEqual(metrics._percentile([1, 0, 0, 0, 0, 0, 0, 0, 1], 50), 50)
+        self.assertIsNone(metrics._percentile([0] * 9, 50))
+
+    def test_first_record_starts_the_flushing_thread(self):
+        self.recorder.record(self.integration, {'sent': 1})
+        self.recorder.start_background_flush.assert_called_once_with()
+
+    def test_background_thread_flushes_idle_processes(self):
+        recorder = metrics.MetricsRecorder(flush_interval=0.01)
+        with mock.patch.object(recorder, 'flush') as flush, mock.patch('notifications.metrics.close_old_connections'):
+            recorder.start_background_flush()
+            for _ in range(200):
+                if flush.called:
+                    break
+                time.sleep(0.01)
+            # Park the thread; it has nothing to write either way
+            recorder.flush_interval = 3600
+        self.assertTrue(flush.called)
+        self.assertTrue(recorder._flusher.daemon)
+
+        # One thread per process
+        flusher = recorder._flusher
+        recorder.start_background_flush()
+        self.assertIs(recorder._flusher, flusher)
+
+
+@override_settings(WEBHOOK_QUEUE_HIGH_WATER_MARK=2, WEBHOOK_EVENT_PRIORITIES={'daily_streak': NotificationLog.PRIORITY_LOW})
+class BackpressureTests(WebhookTestCase):
+    def setUp(self):
+        super().setUp()
+        self.integration = self.add_integration(event_types=['task_completed', 'daily_streak'])
+
+    def fill_outbox(self):
+        self.trigger('daily_streak', {'user_id': 1, 'streak_days': 3})
+        self.trigger('daily_streak', {'user_id': 2, 'streak_days': 8})
+        cache.clear()
+
+    def test_below_the_mark_nothing_is_shed(self):
+        self.trigger('daily_streak', {'user_id': 1, 'streak_days': 3})
+        [log] = self.trigger('daily_streak', {'user_id': 1, 'streak_days': 4})
+        self.assertEqual(log.status, 'pending')
+
+    def test_low_priority_event_is_folded_into_a_waiting_row(self):
+        self.fill_outbox()
+        [log] = self.trigger('daily_streak', {'user_id': 1, 'streak_days': 4})
+        self.assertEqual(log.status, 'skipped')
+
+        waiting = NotificationLog.objects.get(status='pending', event_type='daily_streak', payload_blob_id=log.payload_blob_id)
+        self.assertEqual(log.error_message, f'Coalesced into notification #{waiting.id}: outbox above high-water mark')
+        self.assertEqual(blobs.load_payloads([waiting.payload_blob_id])[waiting.payload_blob_id]['streak_days'], 4)
+        self.assertEqual(NotificationLog.objects.filter(status='pending').count(), 2)
+
+    def test_low_priority_event_without_a_match_is_dropped(self):
+        self.fill_outbox()
+        with self.assertLogs('notifications.backpressure', 'WARNING'):
+            [log] = self.trigger('daily_streak', {'user_id': 3, 'streak_days': 1})
+        self.assertEqual((log.status, log.error_message), ('skipped', 'Dropped: outbox above high-water mark'))
+
+    def test_normal_priority_events_are_always_queued(self):
+        self.fill_outbox()
+        [log] = self.trigger()
+        self.assertEqual(log.status, 'pending')
+
+    def test_queue_depth_is_cached(self):
+        self.fill_outbox()
+        with self.assertNumQueries(1):
+            self.assertTrue(backpressure.should_shed(NotificationLog.PRIORITY_LOW))
+        with self.assertNumQueries(0):
+            self.assertTrue(backpressure.should_shed(NotificationLog.PRIORITY_LOW))
+
+
+class LogPaginationTests(WebhookTestCase, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.user)
+        self.integration = self.add_integration()
+        payload_blob_id = blobs.store_payload({})
+        self.logs = [
+            NotificationLog.objects.create(webhook_integration=self.integration, event_type='task_completed', payload_blob_id=payload_blob_id)
+            for _ in range(3)
+        ]
+        NotificationLog.objects.update(created_at=timezone.now())
+
+    def pages(self, url):
+        seen = []
+        while url:
+            response = self.client.get(url)
+            self.assertNotIn('count', response.data)
+            seen += [log['id'] for log in response.data['results']]
+            url = response.data['next']
+        return seen
+
+    def test_log_list_and_integration_logs_use_the_keyset_cursor(self):
+        newest_first = [log.id for log in reversed(self.logs)]
+        self.assertEqual(self.pages(reverse('notificationlog-list') + '?page_size=2'), newest_first)
+        self.assertEqual(self.pages(reverse('webhookintegration-logs', args=[self.integration.id]) + '?page_size=2'), newest_first)
+
+
+# The manifest storage needs collectstatic, which tests do not run
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class AdminTests(WebhookTestCase):
+    def setUp(self):
+        super().setUp()
+        admin_user = User.objects.create_superuser(username='admin', password='pw', email='admin@example.com')
+        self.client.force_login(admin_user)
+        self.integration = self.add_integration()
+        self.payload_blob_id = blobs.store_payload({})
+
+    def add_logs(self, count):
+        NotificationLog.objects.bulk_create([
+            NotificationLog(webhook_integration=self.integration, event_type='task_completed',
+                            status='sent', payload_blob_id=self.payload_blob_id)
+            for _ in range(count)
+        ])
+
+    def changelist_queries(self, params=None):
+        url = reverse('admin:notifications_notificationlog_changelist')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params or {})
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        self.add_logs(1)
+        few = self.changelist_queries()
+        self.add_logs(20)
+        self.assertEqual(self.changelist_queries(), few)
+        self.assertEqual(self.changelist_queries({'event_type': 'task_completed'}), few)
+
+    def test_filtered_counts_are_capped(self):
+        self.add_logs(5)
+        queryset = NotificationLog.objects.filter(status='sent').order_by('-id')
+        with mock.patch.object(EstimatedCountPaginator, 'count_limit', 3):
+            self.assertEqual(EstimatedCountPaginator(queryset, 2).count, 3)
+        self.assertEqual(EstimatedCountPaginator(queryset, 2).count, 5)
@@ -0,0 +1,121 @@
+import threading
+import time
+from datetime import timedelta
+from typing import Dict, Optional, Tuple
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from .models import WebhookIntegration
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, holding at most `capacity`"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def try_acquire(self) -> float:
+        """Take a token if one is available; otherwise return the seconds until one will be"""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+
+_buckets: Dict[int, TokenBucket] = {}
+_buckets_lock = threading.Lock()
+
+
+def get_bucket(integration: WebhookIntegration) -> TokenBucket:
+    """Per-process rate limiter for an integration, rebuilt if its configured rate changes"""
+    rate = integration.rate_limit_per_second or getattr(settings, 'WEBHOOK_RATE_LIMIT_PER_SECOND', 2.0)
+    burst = max(getattr(settings, 'WEBHOOK_RATE_LIMIT_BURST', 5), 1)
+
+    bucket = _buckets.get(integration.id)
+    if bucket is None or bucket.rate != rate:
+        with _buckets_lock:
+            bucket = _buckets.get(integration.id)
+            if bucket is None or bucket.rate != rate:
+                bucket = TokenBucket(rate, burst)
+                _buckets[integration.id] = bucket
+    return bucket
+
+
+class CircuitBreaker:
+    """
+    Closed/open/half-open breaker whose state lives on the WebhookIntegration row
+
+    State changes use conditional UPDATEs so several worker threads or processes
+    agree on who gets the single half-open trial request.
+    """
+
+    @staticmethod
+    def cooldown() -> timedelta:
+        return timedelta(seconds=getattr(settings, 'WEBHOOK_CIRCUIT_COOLDOWN', 60))
+
+    @staticmethod
+    def allow_request(integration: WebhookIntegration) -> Tuple[bool, Optional[timedelta]]:
+        """Return (allowed, retry_in); retry_in says when a blocked send may try again"""
+        if integration.circuit_state == 'closed':
+            return True, None
+
+        now = timezone.now()
+        reopen_at = (integration.circuit_opened_at or now) + CircuitBreaker.cooldown()
+        if now < reopen_at:
+            return False, reopen_at - now
+
+        # Cooldown elapsed: exactly one caller wins the transition and sends the trial request.
+        # A half-open trial that never reported back is retried after another cooldown.
+        won = WebhookIntegration.objects.filter(
+            pk=integration.pk,
+            circuit_state=integration.circuit_state,
+            circuit_opened_at=integration.circuit_opened_at
+        ).update(circuit_state='half_open', circuit_opened_at=now)
+        if won:
+            integration.circuit_state = 'half_open'
+            integration.circuit_opened_at = now
+            return True, None
+        return False, CircuitBreaker.cooldown()
+
+    @staticmethod
+    def record_success(integration: WebhookIntegration):
+        if integration.circuit_state == 'closed' and integration.consecutive_failures == 0:
+            return
+        WebhookIntegration.objects.filter(pk=integration.pk).update(
+            circuit_state='closed',
+            consecutive_failures=0,
+            circuit_opened_at=None
+        )
+        integration.circuit_state = 'closed'
+        integration.consecutive_failures = 0
+        integration.circuit_opened_at = None
+
+    @staticmethod
+    def record_failure(integration: WebhookIntegration):
+        threshold = getattr(settings, 'WEBHOOK_CIRCUIT_FAILURE_THRESHOLD', 5)
+        WebhookIntegration.objects.filter(pk=integration.pk).update(
+            consecutive_failures=F('consecutive_failures') + 1
+        )
+        # A failed half-open trial re-opens immediately; otherwise trip once the threshold is reached
+        WebhookIntegration.objects.filter(
+            pk=integration.pk,
+            consecutive_failures__gte=threshold
+        ).exclude(circuit_state='open').update(circuit_state='open', circuit_opened_at=timezone.now())
+
+        # Refresh the shared instance so the rest of the worker's batch sees a freshly tripped breaker
+        state = WebhookIntegration.objects.filter(pk=integration.pk).values(
+            'circuit_state', 'consecutive_failures', 'circuit_opened_at'
+        ).first()
+        if state:
+            for field, value in state.items():
+                setattr(integration, field, value)
@@ -0,0 +1,57 @@
+import threading
+from typing import Dict, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+
+_sessions: Dict[str, requests.Session] = {}
+_sessions_lock = threading.Lock()
+
+
+def get_timeout() -> Tuple[float, float]:
+    """(connect, read) timeout used for webhook requests"""
+    return (
+        getattr(settings, 'WEBHOOK_CONNECT_TIMEOUT', 5.0),
+        getattr(settings, 'WEBHOOK_READ_TIMEOUT', 10.0),
+    )
+
+
+def get_session(url: str) -> requests.Session:
+    """
+    Return the keep-alive session for the URL's scheme and host
+
+    Sessions are shared by every thread in the process, so connections to
+    discord.com / outlook.office.com are reused across deliveries instead of
+    paying a TCP+TLS handshake per message.
+    """
+    parts = urlsplit(url)
+    key = f"{parts.scheme}://{parts.netloc}"
+
+    session = _sessions.get(key)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(key)
+            if session is None:
+                session = _build_session(key)
+                _sessions[key] = session
+    return session
+
+
+def close_sessions():
+    """Close every pooled connection (used on worker shutdown)"""
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+
+
+def _build_session(base_url: str) -> requests.Session:
+    pool_size = getattr(settings, 'WEBHOOK_HTTP_POOL_SIZE', 10)
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True, max_retries=0)
+
+    session = requests.Session()
+    session.headers.update({'Content-Type': 'application/json'})
+    session.mount(base_url, adapter)
+    return session
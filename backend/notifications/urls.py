@@ -7,5 +7,7 @@ router.register(r'webhook-integrations', views.WebhookIntegrationViewSet)
 router.register(r'notification-logs', views.NotificationLogViewSet)
 
 urlpatterns = [
+    path('metrics/', views.delivery_metrics, name='webhook-delivery-metrics'),
+    path('metrics/prometheus/', views.delivery_metrics_prometheus, name='webhook-delivery-metrics-prometheus'),
     path('', include(router.urls)),
 ]
@@ -1,17 +1,26 @@
+import hmac
+
 from rest_framework import viewsets, status
-from rest_framework.decorators import action
+from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.permissions import BasePermission, IsAuthenticated, AllowAny
 from django_filters.rest_framework import DjangoFilterBackend
+from django.conf import settings
+from django.http import HttpResponse
 from django.shortcuts import get_object_or_404
+from zentry_backend.pagination import CreatedAtCursorPagination
 
 from .models import WebhookIntegration, NotificationLog
 from .serializers import (
     WebhookIntegrationSerializer, 
     NotificationLogSerializer,
-    WebhookTestSerializer
+    WebhookTestSerializer,
+    DeadLetterFilterSerializer,
+    DeadLetterReplaySerializer
 )
 from .services import WebhookService
+from .metrics import collect, cumulative_totals, queue_stats, render_prometheus
+from .replay import dead_letters, requeue_dead_letters
 
 
 class WebhookIntegrationViewSet(viewsets.ModelViewSet):
@@ -36,7 +45,7 @@ class WebhookIntegrationViewSet(viewsets.ModelViewSet):
     
     def get_queryset(self):
         """Filter integrations based on user permissions"""
-        queryset = super().get_queryset()
+        queryset = super().get_queryset().select_related('project', 'created_by')
         
         # Users can only see integrations for projects they have access to
         # For now, we'll show all (you might want to add project-based permissions)
@@ -76,12 +85,12 @@ class WebhookIntegrationViewSet(viewsets.ModelViewSet):
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
-    @action(detail=True, methods=['get'])
+    @action(detail=True, methods=['get'], pagination_class=CreatedAtCursorPagination)
     def logs(self, request, pk=None):
         """Get notification logs for a specific webhook integration"""
         integration = get_object_or_404(WebhookIntegration, pk=pk)
         
-        logs = NotificationLog.objects.filter(webhook_integration=integration).order_by('-created_at')
+        logs = NotificationLog.objects.filter(webhook_integration=integration).select_related('webhook_integration').order_by('-created_at')
         
         # Pagination
         page = self.paginate_queryset(logs)
@@ -99,12 +108,13 @@ class NotificationLogViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = NotificationLog.objects.all()
     serializer_class = NotificationLogSerializer
     permission_classes = [AllowAny]  # Temporarily allow any for testing
+    pagination_class = CreatedAtCursorPagination
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['status', 'event_type', 'webhook_integration__webhook_type']
     
     def get_queryset(self):
         """Filter logs based on user permissions"""
-        queryset = super().get_queryset()
+        queryset = super().get_queryset().select_related('webhook_integration')
         
         # Users can only see logs for integrations they created
         # Staff can see all logs
@@ -126,29 +136,114 @@ class NotificationLogViewSet(viewsets.ReadOnlyModelViewSet):
             )
         
         # Check if retry is allowed
-        if log.status not in ['failed', 'retry'] or log.retry_count >= 3:
+        if log.status not in ['failed', 'retry']:
             return Response(
                 {'error': 'This notification cannot be retried'},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
         try:
-            # Create a new log entry for the retry
-            new_log = WebhookService.send_notification(
-                log.webhook_integration,
-                log.event_type,
-                log.payload
-            )
-            new_log.retry_count = log.retry_count + 1
-            new_log.save()
+            # Reschedule the same log; the worker picks it up on its next poll
+            log = WebhookService.requeue(log)
             
             return Response({
-                'message': 'Notification retry initiated',
-                'new_log_id': new_log.id,
-                'status': new_log.status
-            })
+                'message': 'Notification retry scheduled',
+                'log_id': log.id,
+                'status': log.status,
+                'next_attempt_at': log.next_attempt_at
+            }, status=status.HTTP_202_ACCEPTED)
         except Exception as e:
             return Response(
                 {'error': f'Failed to retry notification: {str(e)}'},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+    
+    def _dead_letter_queryset(self, filters):
+        """Dead letters visible to the user, filtered by validated integration, event_type, since and until"""
+        queryset = dead_letters(
+            integration_id=filters.get('integration'),
+            event_type=filters.get('event_type'),
+            since=filters.get('since'),
+            until=filters.get('until'),
+        )
+        if self.request.user.is_authenticated and not self.request.user.is_staff:
+            queryset = queryset.filter(webhook_integration__created_by=self.request.user)
+        return queryset
+    
+    @action(detail=False, methods=['get'], url_path='dead-letters')
+    def dead_letters(self, request):
+        """List permanently failed notifications"""
+        filters = DeadLetterFilterSerializer(data=request.query_params)
+        filters.is_valid(raise_exception=True)
+        logs = self._dead_letter_queryset(filters.validated_data).select_related('webhook_integration').order_by('-created_at')
+        
+        page = self.paginate_queryset(logs)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        
+        serializer = self.get_serializer(logs, many=True)
+        return Response(serializer.data)
+    
+    @action(detail=False, methods=['post'], url_path='dead-letters/replay')
+    def replay_dead_letters(self, request):
+        """Hand matching dead letters back to the worker, spread out at `rate` per second"""
+        if not request.user.is_authenticated:
+            return Response(
+                {'error': 'You must be logged in to replay notifications'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        replay = DeadLetterReplaySerializer(data=request.data)
+        replay.is_valid(raise_exception=True)
+        
+        requeued = requeue_dead_letters(
+            self._dead_letter_queryset(replay.validated_data),
+            rate=replay.validated_data.get('rate')
+        )
+        return Response({
+            'message': 'Dead letters requeued',
+            'requeued': requeued
+        }, status=status.HTTP_202_ACCEPTED)
+
+
+def _metrics_window(request):
+    """`minutes` query parameter, bounded by how long DeliveryStats rows are kept"""
+    retention = getattr(settings, 'WEBHOOK_METRICS_RETENTION_MINUTES', 1440)
+    try:
+        minutes = int(request.query_params.get('minutes', 60))
+    except (TypeError, ValueError):
+        minutes = 60
+    return min(max(minutes, 1), retention)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def delivery_metrics(request):
+    """Webhook delivery counts, success ratio, latency and queue depth over the last `minutes`"""
+    return Response(collect(_metrics_window(request)))
+
+
+class IsAuthenticatedOrMetricsScraper(BasePermission):
+    """
+    Logged-in users, or a scraper sending `Authorization: Bearer <WEBHOOK_METRICS_TOKEN>`
+
+    Prometheus cannot hold a session, so it authenticates with the shared token instead.
+    """
+
+    def has_permission(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return True
+        token = getattr(settings, 'WEBHOOK_METRICS_TOKEN', '')
+        provided = request.META.get('HTTP_AUTHORIZATION', '')
+        return bool(token) and hmac.compare_digest(provided.encode(), f'Bearer {token}'.encode())
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticatedOrMetricsScraper])
+def delivery_metrics_prometheus(request):
+    """Cumulative delivery counters and queue gauges in Prometheus text exposition format"""
+    return HttpResponse(
+        render_prometheus(cumulative_totals(), queue_stats()),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
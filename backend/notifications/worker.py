@@ -0,0 +1,129 @@
+import logging
+import os
+import socket
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import List
+
+from django.conf import settings
+from django.utils import timezone
+
+from .blobs import preload
+from .digest import DIGEST_CLAIM_PREFIX, send_due_digests
+from .models import NotificationLog
+from .logwriter import LogWriter
+from .metrics import recorder
+from .services import WebhookService
+from .transport import close_sessions
+
+logger = logging.getLogger(__name__)
+
+
+class OutboxWorker:
+    """
+    Claims due NotificationLog rows from the outbox and delivers them on a thread pool
+
+    New events ('pending') and failed deliveries whose backoff has elapsed ('retry')
+    are picked up by the same query, so the worker doubles as the retry scheduler.
+    It also sends the summaries of digest-mode integrations once their period ends.
+    """
+
+    CLAIMABLE_STATUSES = ['pending', 'retry']
+
+    def __init__(self, threads: int = None, batch_size: int = None, claim_timeout: int = None):
+        self.threads = threads or getattr(settings, 'WEBHOOK_WORKER_THREADS', 4)
+        self.batch_size = batch_size or getattr(settings, 'WEBHOOK_WORKER_BATCH_SIZE', 50)
+        self.claim_timeout = claim_timeout or getattr(settings, 'WEBHOOK_CLAIM_TIMEOUT', 300)
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"[:64]
+        self.executor = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix='webhook')
+        self.writer = LogWriter()
+        self.digest_interval = getattr(settings, 'WEBHOOK_DIGEST_CHECK_INTERVAL', 60)
+        self.next_digest_check = 0.0
+
+    def release_stale_claims(self) -> int:
+        """Put rows claimed by a worker that died mid-batch back into the outbox"""
+        cutoff = timezone.now() - timedelta(seconds=self.claim_timeout)
+        stale = NotificationLog.objects.filter(status='processing', claimed_at__lt=cutoff)
+        # Events claimed by a digest go back on hold rather than out as individual messages
+        released = stale.filter(claimed_by__startswith=DIGEST_CLAIM_PREFIX).update(
+            status='digest', claimed_by='', claimed_at=None
+        )
+        released += stale.update(status='pending', claimed_by='', claimed_at=None)
+        if released:
+            logger.warning(f"Released {released} stale webhook claims")
+        return released
+
+    def claim_batch(self) -> List[NotificationLog]:
+        """Atomically claim up to batch_size due rows (new or scheduled retries), highest priority first"""
+        due = NotificationLog.objects.filter(
+            status__in=self.CLAIMABLE_STATUSES,
+            next_attempt_at__lte=timezone.now()
+        )
+        ids = list(due.order_by('-priority', 'next_attempt_at').values_list('id', flat=True)[:self.batch_size])
+        if not ids:
+            return []
+
+        # The status guard makes the claim safe against other workers racing for the same rows
+        NotificationLog.objects.filter(id__in=ids, status__in=self.CLAIMABLE_STATUSES).update(
+            status='processing',
+            claimed_by=self.worker_id,
+            claimed_at=timezone.now()
+        )
+        logs = list(
+            NotificationLog.objects.filter(id__in=ids, status='processing', claimed_by=self.worker_id)
+            .select_related('webhook_integration')
+        )
+
+        # Share one integration instance per integration so breaker state changes are seen batch-wide
+        integrations = {}
+        for log in logs:
+            log.webhook_integration = integrations.setdefault(log.webhook_integration_id, log.webhook_integration)
+        # Read the batch's distinct payloads in one query rather than one per log
+        preload(logs)
+        return logs
+
+    def process_batch(self) -> int:
+        """Claim and deliver one batch, returning the number of rows processed"""
+        logs = self.claim_batch()
+        WebhookService.deliver_many(logs, executor=self.executor, writer=self.writer)
+        self.writer.flush_if_due()
+        return len(logs)
+
+    def send_digests(self):
+        """Send due digest summaries, checking at most every WEBHOOK_DIGEST_CHECK_INTERVAL seconds"""
+        if time.monotonic() < self.next_digest_check:
+            return
+        self.next_digest_check = time.monotonic() + self.digest_interval
+        try:
+            results = send_due_digests()
+        except Exception as e:
+            logger.error(f"Sending webhook digests failed: {e}")
+            return
+        if results:
+            logger.info(f"Webhook digests: {dict(results)}")
+
+    def run(self, poll_interval: float = None, once: bool = False):
+        """Deliver batches until interrupted, sleeping when the outbox is empty"""
+        if poll_interval is None:
+            poll_interval = getattr(settings, 'WEBHOOK_WORKER_POLL_INTERVAL', 1.0)
+
+        try:
+            self.release_stale_claims()
+            while True:
+                self.send_digests()
+                processed = self.process_batch()
+                if not processed:
+                    # Idle: make sure buffered results are visible before sleeping
+                    self.writer.flush()
+                    recorder.flush_if_due()
+                    if once:
+                        break
+                    time.sleep(poll_interval)
+                    self.release_stale_claims()
+        finally:
+            self.executor.shutdown(wait=True)
+            self.writer.flush()
+            recorder.flush()
+            close_sessions()
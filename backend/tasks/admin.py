@@ -1,3 +1,29 @@
 from django.contrib import admin
+from zentry_backend.pagination import EstimatedCountPaginator
+from .models import Project, Task
 
-# Register your models here.
+
+@admin.register(Project)
+class ProjectAdmin(admin.ModelAdmin):
+    list_display = ['name', 'emoji', 'created_by', 'created_at']
+    list_select_related = ['created_by']
+    search_fields = ['name', 'created_by__username']
+    raw_id_fields = ['created_by', 'members']
+    date_hierarchy = 'created_at'
+    ordering = ['-created_at']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ['title', 'project', 'status', 'priority', 'assigned_to', 'created_by', 'due_date', 'created_at']
+    list_filter = ['status', 'priority', 'created_at']
+    list_select_related = ['project', 'assigned_to', 'created_by']
+    search_fields = ['title', 'project__name', 'assigned_to__username']
+    raw_id_fields = ['project', 'assigned_to', 'created_by']
+    readonly_fields = ['completed_at', 'created_at', 'updated_at']
+    date_hierarchy = 'created_at'
+    ordering = ['-created_at']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
@@ -0,0 +1,101 @@
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q
+
+from .models import Task, TaskStatusCounter
+from .visibility import member_project_ids
+
+
+def adjust(project_id, user_id, status, delta: int):
+    """Add `delta` to one counter row with an F() update, creating the row on first use and deleting it once empty"""
+    if not project_id or not delta:
+        return
+    key = {'project_id': project_id, 'user_id': user_id, 'status': status}
+    updated = TaskStatusCounter.objects.filter(**key).update(count=F('count') + delta)
+    if delta < 0:
+        # A missing row on decrement went with its project (cascade) or awaits a rebuild.
+        # Empty rows are dropped so the table only holds keys that have tasks.
+        if updated:
+            TaskStatusCounter.objects.filter(count=0, **key).delete()
+        return
+    if updated:
+        return
+    try:
+        with transaction.atomic():
+            TaskStatusCounter.objects.create(count=delta, **key)
+    except IntegrityError:
+        # Another writer created the row first
+        TaskStatusCounter.objects.filter(**key).update(count=F('count') + delta)
+
+
+def task_saved(task, created: bool):
+    """Move the task's count from its old (project, assignee, status) key to the current one"""
+    # Stored values: a save(update_fields=...) may leave other edits unwritten
+    current = (task.stored_value('project_id'), task.stored_value('assigned_to_id'), task.stored_value('status'))
+    if created:
+        adjust(*current, 1)
+        return
+    changed = getattr(task, 'changed_fields', {})
+    previous = (
+        changed.get('project_id', current[0]),
+        changed.get('assigned_to_id', current[1]),
+        changed.get('status', current[2]),
+    )
+    if previous != current:
+        adjust(*previous, -1)
+        adjust(*current, 1)
+
+
+def task_deleted(task):
+    adjust(task.project_id, task.assigned_to_id, task.status, -1)
+
+
+def counts_from_tasks():
+    """Counter values recomputed from the tasks table in one grouped aggregate"""
+    rows = Task.objects.order_by().values('project_id', 'assigned_to_id', 'status').annotate(total=Count('id'))
+    return {
+        (row['project_id'], row['assigned_to_id'], row['status']): row['total']
+        for row in rows
+    }
+
+
+def stored_counts():
+    return {
+        (project_id, user_id, status): count
+        for project_id, user_id, status, count in TaskStatusCounter.objects.values_list(
+            'project_id', 'user_id', 'status', 'count'
+        )
+        if count
+    }
+
+
+@transaction.atomic
+def rebuild():
+    """Replace every counter row with values recomputed from the tasks table"""
+    counts = counts_from_tasks()
+    TaskStatusCounter.objects.all().delete()
+    TaskStatusCounter.objects.bulk_create([
+        TaskStatusCounter(project_id=project_id, user_id=user_id, status=status, count=count)
+        for (project_id, user_id, status), count in counts.items()
+    ], batch_size=1000)
+    return counts
+
+
+def status_counts(user):
+    """
+    Task counts by status for the projects the user is a member of and the tasks assigned to them
+
+    Reads the counter rows of the user's member projects plus their own
+    assignments elsewhere, one query; each row is counted once however it matched.
+    """
+    by_status = Counter()
+    assigned = 0
+    rows = TaskStatusCounter.objects.filter(
+        Q(project_id__in=member_project_ids(user)) | Q(user_id=user.pk)
+    ).values_list('user_id', 'status', 'count')
+    for user_id, status, count in rows:
+        by_status[status] += count
+        if user_id == user.pk:
+            assigned += count
+    return by_status, assigned
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from tasks.counters import counts_from_tasks, rebuild, stored_counts
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-project and per-assignee task status counters from the tasks table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report how many counters have drifted without rewriting them'
+        )
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            expected, stored = counts_from_tasks(), stored_counts()
+            drifted = [key for key in expected.keys() | stored.keys() if expected.get(key) != stored.get(key)]
+            self.stdout.write(f'{len(drifted)} of {len(expected)} task counters differ from the tasks table')
+            return
+
+        counts = rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Rebuilt {len(counts)} task counters covering {sum(counts.values())} tasks'
+        ))
@@ -0,0 +1,48 @@
+# Generated by Django 4.2.7 on 2026-10-18 18:43
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def build_counters(apps, schema_editor):
+    Task = apps.get_model('tasks', 'Task')
+    TaskStatusCounter = apps.get_model('tasks', 'TaskStatusCounter')
+    rows = Task.objects.order_by().values('project_id', 'assigned_to_id', 'status').annotate(total=models.Count('id'))
+    TaskStatusCounter.objects.bulk_create([
+        TaskStatusCounter(project_id=row['project_id'], user_id=row['assigned_to_id'], status=row['status'], count=row['total'])
+        for row in rows
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('tasks', '0004_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskStatusCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('todo', 'To Do'), ('in_progress', 'In Progress'), ('completed', 'Completed')], max_length=20)),
+                ('count', models.IntegerField(default=0)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='status_counters', to='tasks.project')),
+                ('user', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user'], name='task_counter_user_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='taskstatuscounter',
+            constraint=models.UniqueConstraint(fields=('project', 'user', 'status'), name='task_counter_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='taskstatuscounter',
+            constraint=models.UniqueConstraint(condition=models.Q(('user__isnull', True)), fields=('project', 'status'), name='task_counter_unassigned_unique'),
+        ),
+        migrations.RunPython(build_counters, migrations.RunPython.noop),
+    ]
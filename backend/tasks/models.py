@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from zentry_backend.tracking import TrackedFieldsMixin
 
 class Project(models.Model):
     name = models.CharField(max_length=200)
@@ -10,10 +11,15 @@ class Project(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at'], name='project_created_idx'),
+        ]
+
     def __str__(self):
         return f"{self.emoji} {self.name}"
 
-class Task(models.Model):
+class Task(TrackedFieldsMixin, models.Model):
     STATUS_CHOICES = [
         ('todo', 'To Do'),
         ('in_progress', 'In Progress'),
@@ -41,6 +47,15 @@ class Task(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    tracked_fields = ('status', 'assigned_to', 'project')
+
+    class Meta:
+        indexes = [
+            # Keyset pagination order, overall and within a project
+            models.Index(fields=['created_at', 'id'], name='task_created_id_idx'),
+            models.Index(fields=['project', 'created_at', 'id'], name='task_project_created_idx'),
+        ]
+
     def __str__(self):
         return f"{self.emoji} {self.title}"
 
@@ -55,11 +70,49 @@ class Task(models.Model):
             self.assigned_to.update_streak()
             self.save()
 
+class TaskStatusCounter(models.Model):
+    """
+    Number of tasks per (project, assignee, status), kept current by tasks/signals.py
+
+    Summing rows by project gives per-project counts and by user per-assignee counts,
+    so dashboards never scan tasks. `rebuild_task_counters` reconciles any drift.
+    """
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='status_counters')
+    # No constraint or cascade: tasks keep their counts when an assignee is deleted
+    # (the SET_NULL on Task.assigned_to bypasses signals), the rebuild moves them
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.DO_NOTHING, db_constraint=False,
+        null=True, blank=True, related_name='+'
+    )
+    status = models.CharField(max_length=20, choices=Task.STATUS_CHOICES)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['project', 'user', 'status'], name='task_counter_unique'),
+            # NULLs never collide in the constraint above
+            models.UniqueConstraint(
+                fields=['project', 'status'], condition=models.Q(user__isnull=True),
+                name='task_counter_unassigned_unique'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['user'], name='task_counter_user_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.project_id}/{self.user_id}/{self.status}: {self.count}"
+
 class TaskComment(models.Model):
     task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='comments')
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['task', 'created_at', 'id'], name='comment_task_created_idx'),
+        ]
+
     def __str__(self):
         return f"Comment by {self.user.username} on {self.task.title}"
@@ -17,6 +17,9 @@ class ProjectSerializer(serializers.ModelSerializer):
         read_only_fields = ['created_by']
 
     def get_task_count(self, obj):
+        # Annotated by the project views; only a project created in this request is counted here
+        if hasattr(obj, 'task_count'):
+            return obj.task_count
         return obj.tasks.count()
 
     def create(self, validated_data):
@@ -46,6 +49,11 @@ class TaskSerializer(serializers.ModelSerializer):
         # Handle task completion
         if 'status' in validated_data and validated_data['status'] == 'completed' and instance.status != 'completed':
             instance.complete_task()
+            if instance.status == 'completed':
+                # complete_task() already saved the status change; skip a second save if nothing else changed
+                validated_data.pop('status')
+                if not validated_data:
+                    return instance
         return super().update(instance, validated_data)
 
 class TaskCommentSerializer(serializers.ModelSerializer):
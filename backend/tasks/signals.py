@@ -0,0 +1,39 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from . import counters
+from .models import Project, Task
+from .visibility import invalidate_visible_projects
+
+
+@receiver(m2m_changed, sender=Project.members.through)
+def project_members_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Drop the cached visible projects of every user whose memberships changed"""
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if reverse:
+        # user.projects.add(...): the instance is the user
+        user_ids = [instance.pk]
+    elif action == 'pre_clear':
+        # clear() does not say who is removed, so read the members before they go
+        user_ids = list(instance.members.values_list('id', flat=True))
+    else:
+        user_ids = pk_set or []
+    invalidate_visible_projects(user_ids)
+
+
+@receiver(pre_delete, sender=Project)
+def project_deleted(sender, instance, **kwargs):
+    # Membership rows are deleted without m2m_changed, so invalidate the members here
+    invalidate_visible_projects(instance.members.values_list('id', flat=True))
+
+
+@receiver(post_save, sender=Task)
+def task_saved(sender, instance, created, raw=False, **kwargs):
+    # Fixtures are loaded raw; rebuild_task_counters catches them up
+    if not raw:
+        counters.task_saved(instance, created)
+
+
+@receiver(post_delete, sender=Task)
+def task_deleted(sender, instance, **kwargs):
+    counters.task_deleted(instance)
@@ -1,3 +1,315 @@
-from django.test import TestCase
+from io import StringIO
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from .counters import counts_from_tasks, stored_counts
+from .models import Project, Task, TaskComment, TaskStatusCounter
+from .visibility import check_visibility_cache, member_project_ids
+
+User = get_user_model()
+
+
+class QueryCountTests(APITestCase):
+    """List and detail endpoints load related data in a fixed number of queries, however many rows there are"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='owner', password='pw')
+        self.member = User.objects.create_user(username='member', password='pw')
+        self.client.force_authenticate(self.user)
+
+    def add_projects(self, count):
+        task = None
+        for i in range(count):
+            project = Project.objects.create(name=f'Project {i}', created_by=self.user)
+            project.members.add(self.user, self.member)
+            task = Task.objects.create(title=f'Task {i}', project=project, created_by=self.user, assigned_to=self.member)
+            TaskComment.objects.create(task=task, user=self.member, content='On it')
+            TaskComment.objects.create(task=task, user=self.user, content='Thanks')
+        return task
+
+    def assertConstantQueries(self, num, url_for):
+        for count in [1, 5]:
+            task = self.add_projects(count)
+            with self.assertNumQueries(num):
+                response = self.client.get(url_for(task))
+            self.assertEqual(response.status_code, 200)
+
+    def test_project_list(self):
+        # count, page, members prefetch
+        self.assertConstantQueries(3, lambda task: reverse('project-list'))
+
+    def test_project_list_annotates_task_count(self):
+        task = self.add_projects(1)
+        Task.objects.create(title='Another', project=task.project, created_by=self.user)
+        response = self.client.get(reverse('project-list'))
+        self.assertEqual(response.data['results'][0]['task_count'], 2)
+        self.assertEqual(len(response.data['results'][0]['members']), 2)
+
+    def test_project_detail(self):
+        self.assertConstantQueries(2, lambda task: reverse('project-detail', args=[task.project_id]))
+
+    def test_task_list(self):
+        # page with project and users joined; keyset pagination runs no COUNT
+        self.assertConstantQueries(1, lambda task: reverse('task-list'))
+
+    def test_task_detail(self):
+        # task with project and users joined, comments with their users
+        self.assertConstantQueries(2, lambda task: reverse('task-detail', args=[task.id]))
+
+    def test_task_comments(self):
+        self.assertConstantQueries(1, lambda task: reverse('task-comments', args=[task.id]))
+
+
+class CursorPaginationTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='pager', password='pw')
+        self.client.force_authenticate(self.user)
+        project = Project.objects.create(name='Paged', created_by=self.user)
+        self.tasks = [Task.objects.create(title=f'Task {i}', project=project, created_by=self.user) for i in range(5)]
+
+    def test_pages_newest_first_without_gaps(self):
+        seen = []
+        url = reverse('task-list') + '?page_size=2'
+        while url:
+            response = self.client.get(url)
+            self.assertNotIn('count', response.data)
+            self.assertEqual(response.data['has_more'], response.data['next'] is not None)
+            seen += [task['id'] for task in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(seen, [task.id for task in reversed(self.tasks)])
+
+    def test_rows_with_equal_timestamps_page_by_id(self):
+        Task.objects.update(created_at=timezone.now())
+        seen = []
+        url = reverse('task-list') + '?page_size=2'
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            seen += [task['id'] for task in response.data['results']]
+            url = response.data['next']
+            # A (created_at, id) row comparison, never an OFFSET
+            self.assertNotIn('OFFSET', queries[0]['sql'])
+        self.assertEqual(seen, [task.id for task in reversed(self.tasks)])
+        self.assertIn('"created_at", "tasks_task"."id") < (', queries[0]['sql'])
+
+    def test_previous_links_walk_back(self):
+        first = self.client.get(reverse('task-list') + '?page_size=2')
+        second = self.client.get(first.data['next'])
+        third = self.client.get(second.data['next'])
+        self.assertEqual([task['id'] for task in third.data['results']], [self.tasks[0].id])
+        self.assertFalse(third.data['has_more'])
+
+        back = self.client.get(third.data['previous'])
+        self.assertEqual(back.data['results'], second.data['results'])
+        self.assertEqual(self.client.get(back.data['previous']).data['results'], first.data['results'])
+
+    def test_invalid_cursor_is_not_found(self):
+        self.assertEqual(self.client.get(reverse('task-list') + '?cursor=bogus').status_code, 404)
+
+    def test_new_rows_do_not_shift_later_pages(self):
+        first = self.client.get(reverse('task-list') + '?page_size=2')
+        Task.objects.create(title='Newer', project=self.tasks[0].project, created_by=self.user)
+        second = self.client.get(first.data['next'])
+        self.assertEqual([task['id'] for task in second.data['results']], [self.tasks[2].id, self.tasks[1].id])
+
+
+class VisibilityTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user(username='lead', password='pw')
+        self.user = User.objects.create_user(username='dev', password='pw')
+        self.project = Project.objects.create(name='Shared', created_by=self.owner)
+        self.task = Task.objects.create(title='Hidden until joined', project=self.project, created_by=self.owner)
+        self.client.force_authenticate(self.user)
+
+    def task_ids(self):
+        return [task['id'] for task in self.client.get(reverse('task-list')).data['results']]
+
+    def test_membership_changes_apply_immediately(self):
+        self.assertEqual(self.task_ids(), [])
+        self.project.members.add(self.user)
+        self.assertEqual(self.task_ids(), [self.task.id])
+        self.project.members.remove(self.user)
+        self.assertEqual(self.task_ids(), [])
+        self.assertEqual(self.client.get(reverse('task-detail', args=[self.task.id])).status_code, 404)
+
+    @override_settings(PROJECT_VISIBILITY_CACHE_TIMEOUT=60)
+    def test_member_project_ids_are_cached_until_memberships_change(self):
+        self.project.members.add(self.owner)
+        self.assertEqual(member_project_ids(self.owner), [self.project.id])
+        with self.assertNumQueries(0):
+            self.assertEqual(member_project_ids(self.owner), [self.project.id])
+
+        self.assertEqual(self.task_ids(), [])
+        self.project.members.add(self.user)
+        self.assertEqual(self.task_ids(), [self.task.id])
+        self.project.members.remove(self.user)
+        self.assertEqual(self.task_ids(), [])
+        self.user.projects.add(self.project)
+        self.assertEqual(self.task_ids(), [self.task.id])
+        self.project.members.clear()
+        self.assertEqual(self.task_ids(), [])
+
+    @override_settings(PROJECT_VISIBILITY_CACHE_TIMEOUT=60)
+    def test_project_delete_invalidates(self):
+        project = Project.objects.create(name='Mine', created_by=self.user)
+        project.members.add(self.user)
+        self.assertEqual(member_project_ids(self.user), [project.id])
+        project.delete()
+        self.assertEqual(member_project_ids(self.user), [])
+
+    def test_creator_sees_the_project_but_only_their_own_tasks_after_leaving(self):
+        self.project.members.add(self.owner, self.user)
+        mine = Task.objects.create(title='Mine', project=self.project, created_by=self.user)
+        self.project.created_by = self.user
+        self.project.save()
+        self.project.members.remove(self.user)
+
+        self.assertEqual(self.task_ids(), [mine.id])
+        self.assertEqual(self.client.get(reverse('task-detail', args=[self.task.id])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('project-detail', args=[self.project.id])).status_code, 200)
+
+    def test_assigned_task_is_visible_without_membership(self):
+        self.task.assigned_to = self.user
+        self.task.save()
+        self.assertEqual(self.task_ids(), [self.task.id])
+        self.assertEqual(self.client.get(reverse('task-detail', args=[self.task.id])).status_code, 200)
+
+    def test_cache_must_be_shared_between_processes(self):
+        self.assertEqual(check_visibility_cache(None), [])
+        with override_settings(PROJECT_VISIBILITY_CACHE_TIMEOUT=60):
+            self.assertEqual([error.id for error in check_visibility_cache(None)], ['tasks.E001'])
+        shared = {'default': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'cache'}}
+        with override_settings(PROJECT_VISIBILITY_CACHE_TIMEOUT=60, CACHES=shared):
+            self.assertEqual(check_visibility_cache(None), [])
+
+
+class TaskCounterTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='counted', password='pw')
+        self.other = User.objects.create_user(username='other', password='pw')
+        self.project = Project.objects.create(name='Counted', created_by=self.user)
+        self.client.force_authenticate(self.user)
+
+    def counter(self, user, status, project=None):
+        row = TaskStatusCounter.objects.filter(project=project or self.project, user=user, status=status).first()
+        return row.count if row else 0
+
+    def test_counters_follow_task_changes(self):
+        task = Task.objects.create(title='Move me', project=self.project, created_by=self.user)
+        self.assertEqual(self.counter(None, 'todo'), 1)
+
+        task.status = 'in_progress'
+        task.assigned_to = self.user
+        task.save()
+        self.assertFalse(TaskStatusCounter.objects.filter(user=None).exists())
+        self.assertEqual(self.counter(self.user, 'in_progress'), 1)
+
+        other_project = Project.objects.create(name='Elsewhere', created_by=self.user)
+        task.project = other_project
+        task.assigned_to = self.other
+        task.save()
+        self.assertEqual(self.counter(self.user, 'in_progress'), 0)
+        self.assertEqual(self.counter(self.other, 'in_progress', other_project), 1)
+
+        task.title = 'Renamed'
+        task.save()
+        self.assertEqual(stored_counts(), counts_from_tasks())
+
+        task.delete()
+        self.assertFalse(TaskStatusCounter.objects.exists())
+
+    def test_partial_saves_only_count_the_fields_they_write(self):
+        task = Task.objects.create(title='Partial', project=self.project, created_by=self.user)
+        task.status = 'in_progress'
+        task.title = 'Renamed'
+        task.save(update_fields=['title'])
+        # The status change was not written, so it must not move a counter yet
+        self.assertEqual(stored_counts(), counts_from_tasks())
+        self.assertEqual(self.counter(None, 'todo'), 1)
+
+        task.assigned_to = self.other
+        task.save(update_fields=['assigned_to'])
+        self.assertEqual(self.counter(self.other, 'todo'), 1)
+        self.assertEqual(stored_counts(), counts_from_tasks())
+
+        # ...and it is still reported as changed when a later save writes it
+        task.save()
+        self.assertEqual(self.counter(self.other, 'in_progress'), 1)
+        self.assertEqual(stored_counts(), counts_from_tasks())
+
+    def test_project_delete_removes_its_counters(self):
+        Task.objects.create(title='Gone', project=self.project, created_by=self.user, assigned_to=self.other)
+        self.project.delete()
+        self.assertFalse(TaskStatusCounter.objects.exists())
+
+    def test_rebuild_fixes_drift(self):
+        Task.objects.create(title='Counted', project=self.project, created_by=self.user)
+        # Queryset updates bypass the signals
+        Task.objects.update(status='completed')
+        self.assertNotEqual(stored_counts(), counts_from_tasks())
+        call_command('rebuild_task_counters', stdout=StringIO())
+        self.assertEqual(stored_counts(), {(self.project.id, None, 'completed'): 1})
+
+    def test_task_stats(self):
+        self.project.members.add(self.user)
+        for status in ['todo', 'todo', 'completed']:
+            Task.objects.create(title=status, project=self.project, created_by=self.user, status=status)
+        Task.objects.create(title='Mine', project=self.project, created_by=self.user, assigned_to=self.user, status='in_progress')
+        # Assigned in a project the user cannot see: counted once, as theirs
+        hidden = Project.objects.create(name='Hidden', created_by=self.other)
+        Task.objects.create(title='Theirs', project=hidden, created_by=self.other, assigned_to=self.user)
+        Task.objects.create(title='Not mine', project=hidden, created_by=self.other)
+        # Created by the user without membership: not counted, as before the counters
+        left = Project.objects.create(name='Left', created_by=self.user)
+        Task.objects.create(title='Not theirs', project=left, created_by=self.other)
+
+        # counter rows only; the member project IDs are a subquery
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('task-stats'))
+
+        self.assertEqual(response.data, {
+            'total_tasks': 5,
+            'todo_count': 3,
+            'in_progress_count': 1,
+            'completed_count': 1,
+            'my_tasks': 2,
+        })
+
+
+# The manifest storage needs collectstatic, which tests do not run
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class AdminTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser(username='admin', password='pw', email='admin@example.com')
+        self.client.force_login(self.admin)
+
+    def add_tasks(self, count):
+        for i in range(count):
+            owner = User.objects.create_user(username=f'owner{Task.objects.count()}', password='pw')
+            project = Project.objects.create(name=f'Project {i}', created_by=owner)
+            Task.objects.create(title=f'Task {i}', project=project, created_by=owner, assigned_to=owner)
+
+    def changelist_queries(self, name):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse(f'admin:tasks_{name}_changelist'))
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_changelists_run_a_fixed_number_of_queries(self):
+        self.add_tasks(1)
+        few = {name: self.changelist_queries(name) for name in ['task', 'project']}
+        self.add_tasks(10)
+        self.assertEqual({name: self.changelist_queries(name) for name in ['task', 'project']}, few)
@@ -3,18 +3,19 @@ from rest_framework import generics, status, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Q, Count
-from .models import Project, Task, TaskComment
+from django.db.models import Prefetch
+from zentry_backend.pagination import CreatedAtCursorPagination
+from .counters import status_counts
+from .models import Task, TaskComment
 from .serializers import ProjectSerializer, TaskSerializer, TaskDetailSerializer, TaskCommentSerializer
+from .visibility import visible_projects, visible_tasks
 
 class ProjectListCreateView(generics.ListCreateAPIView):
     serializer_class = ProjectSerializer
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        return Project.objects.filter(
-            Q(created_by=self.request.user) | Q(members=self.request.user)
-        ).distinct()
+        return visible_projects(self.request.user).order_by('-created_at')
     
     def perform_create(self, serializer):
         project = serializer.save(created_by=self.request.user)
@@ -25,20 +26,15 @@ class ProjectDetailView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        return Project.objects.filter(
-            Q(created_by=self.request.user) | Q(members=self.request.user)
-        ).distinct()
+        return visible_projects(self.request.user)
 
 class TaskListCreateView(generics.ListCreateAPIView):
     serializer_class = TaskSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = CreatedAtCursorPagination
     
     def get_queryset(self):
-        queryset = Task.objects.filter(
-            Q(created_by=self.request.user) | 
-            Q(assigned_to=self.request.user) |
-            Q(project__members=self.request.user)
-        ).distinct().order_by('-created_at')
+        queryset = visible_tasks(self.request.user).order_by('-created_at')
         
         # Filter by status
         status_filter = self.request.query_params.get('status')
@@ -60,19 +56,18 @@ class TaskDetailView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        return Task.objects.filter(
-            Q(created_by=self.request.user) | 
-            Q(assigned_to=self.request.user) |
-            Q(project__members=self.request.user)
-        ).distinct()
+        return visible_tasks(self.request.user).prefetch_related(
+            Prefetch('comments', queryset=TaskComment.objects.select_related('user').order_by('created_at'))
+        )
 
 class TaskCommentListCreateView(generics.ListCreateAPIView):
     serializer_class = TaskCommentSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = CreatedAtCursorPagination
     
     def get_queryset(self):
         task_id = self.kwargs['task_id']
-        return TaskComment.objects.filter(task_id=task_id).order_by('-created_at')
+        return TaskComment.objects.filter(task_id=task_id).select_related('user').order_by('-created_at')
     
     def perform_create(self, serializer):
         task_id = self.kwargs['task_id']
@@ -82,16 +77,14 @@ class TaskCommentListCreateView(generics.ListCreateAPIView):
 @permission_classes([IsAuthenticated])
 def task_stats(request):
     """Get task statistics for dashboard"""
-    user_tasks = Task.objects.filter(
-        Q(assigned_to=request.user) | Q(project__members=request.user)
-    ).distinct()
+    by_status, my_tasks = status_counts(request.user)
     
     stats = {
-        'total_tasks': user_tasks.count(),
-        'todo_count': user_tasks.filter(status='todo').count(),
-        'in_progress_count': user_tasks.filter(status='in_progress').count(),
-        'completed_count': user_tasks.filter(status='completed').count(),
-        'my_tasks': user_tasks.filter(assigned_to=request.user).count(),
+        'total_tasks': sum(by_status.values()),
+        'todo_count': by_status['todo'],
+        'in_progress_count': by_status['in_progress'],
+        'completed_count': by_status['completed'],
+        'my_tasks': my_tasks,
     }
     
     return Response(stats)
@@ -101,7 +94,7 @@ def task_stats(request):
 def complete_task(request, task_id):
     """Mark a task as completed"""
     try:
-        task = Task.objects.get(
+        task = Task.objects.select_related('project', 'assigned_to', 'created_by').get(
             id=task_id,
             assigned_to=request.user
         )
@@ -0,0 +1,88 @@
+from typing import Iterable
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+
+from .models import Project, Task
+
+# Backends that keep entries inside one process, where an invalidation is never seen by the others
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def _cache_key(user_id) -> str:
+    return f'member-projects:{user_id}'
+
+
+def member_project_ids(user):
+    """
+    IDs of the projects the user is a member of, for use in a `project_id__in` filter
+
+    With PROJECT_VISIBILITY_CACHE_TIMEOUT set the list is read with one query and cached
+    per user until tasks/signals.py drops it on a membership change; otherwise it is a
+    subquery on the membership table, which needs no join and no DISTINCT either.
+    """
+    memberships = Project.members.through.objects.filter(user_id=user.pk).values('project_id')
+    timeout = settings.PROJECT_VISIBILITY_CACHE_TIMEOUT
+    if not timeout:
+        return memberships
+    key = _cache_key(user.pk)
+    ids = cache.get(key)
+    if ids is None:
+        ids = list(memberships.order_by('project_id').values_list('project_id', flat=True))
+        cache.set(key, ids, timeout=timeout)
+    return ids
+
+
+def invalidate_visible_projects(user_ids: Iterable[int]):
+    if not settings.PROJECT_VISIBILITY_CACHE_TIMEOUT:
+        return
+    keys = [_cache_key(user_id) for user_id in set(user_ids) if user_id]
+    if not keys:
+        return
+    cache.delete_many(keys)
+    # Again once committed, so a request that read the old memberships in between cannot keep them cached
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def visible_projects(user):
+    """Projects the user created or is a member of, with everything ProjectSerializer reads loaded up front"""
+    return (
+        Project.objects.filter(Q(created_by=user) | Q(pk__in=member_project_ids(user)))
+        .select_related('created_by')
+        .prefetch_related('members')
+        .annotate(task_count=Count('tasks'))
+    )
+
+
+def visible_tasks(user):
+    """
+    Tasks in the user's projects plus those they created or are assigned, with their users and project joined
+
+    The project condition is a plain IN over the member project IDs, so no membership join and no DISTINCT.
+    Creating a project does not make its tasks visible; only membership does.
+    """
+    return Task.objects.filter(
+        Q(project_id__in=member_project_ids(user)) |
+        Q(created_by=user) |
+        Q(assigned_to=user)
+    ).select_related('project', 'assigned_to', 'created_by')
+
+
+@checks.register(checks.Tags.caches)
+def check_visibility_cache(app_configs, **kwargs):
+    """The cached IDs authorize reads, so every process must see the same entries"""
+    backend = settings.CACHES['default']['BACKEND']
+    if settings.PROJECT_VISIBILITY_CACHE_TIMEOUT and backend in PROCESS_LOCAL_CACHES:
+        return [checks.Error(
+            'PROJECT_VISIBILITY_CACHE_TIMEOUT needs a cache shared by every process.',
+            hint=f'{backend} keeps entries per process, so other processes would keep serving revoked '
+                 'memberships. Configure Redis, Memcached or the database cache, or set the timeout to 0.',
+            id='tasks.E001',
+        )]
+    return []
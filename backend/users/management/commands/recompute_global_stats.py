@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from users.models import GlobalStats
+
+
+class Command(BaseCommand):
+    help = 'Recompute the global dashboard stats from the users table, correcting any drift'
+
+    def handle(self, *args, **options):
+        before = GlobalStats.objects.filter(pk=GlobalStats.SINGLETON_ID).first()
+        stats = GlobalStats.recompute()
+        drift = ''
+        if before:
+            drift = (
+                f' (drift: {stats.total_users - before.total_users} users, '
+                f'{stats.total_experience - before.total_experience} XP, '
+                f'{stats.active_users - before.active_users} active)'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Global stats: {stats.total_users} users, {stats.total_experience} XP, '
+            f'{stats.active_users} active{drift}'
+        ))
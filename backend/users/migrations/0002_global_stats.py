@@ -0,0 +1,39 @@
+# Generated by Django 4.2.7 on 2026-10-18 18:44
+
+from django.db import migrations, models
+
+
+def build_stats(apps, schema_editor):
+    User = apps.get_model('users', 'User')
+    GlobalStats = apps.get_model('users', 'GlobalStats')
+    totals = User.objects.aggregate(
+        total_users=models.Count('id'),
+        total_experience=models.Sum('experience_points'),
+        active_users=models.Count('id', filter=models.Q(current_streak__gt=0)),
+    )
+    totals['total_experience'] = totals['total_experience'] or 0
+    GlobalStats.objects.create(pk=1, **totals)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GlobalStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_users', models.IntegerField(default=0)),
+                ('total_experience', models.BigIntegerField(default=0)),
+                ('active_users', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'global stats',
+            },
+        ),
+        migrations.RunPython(build_stats, migrations.RunPython.noop),
+    ]
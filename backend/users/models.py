@@ -1,7 +1,10 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+from zentry_backend.tracking import TrackedFieldsMixin
 
-class User(AbstractUser):
+class User(TrackedFieldsMixin, AbstractUser):
     avatar = models.CharField(max_length=50, default='🧑‍💻')
     role = models.CharField(max_length=100, default='Developer')
     level = models.IntegerField(default=1)
@@ -13,6 +16,8 @@ class User(AbstractUser):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    tracked_fields = ('experience_points', 'current_streak')
+
     def __str__(self):
         return f"{self.username} - Level {self.level}"
 
@@ -50,3 +55,49 @@ class User(AbstractUser):
         
         self.last_activity = timezone.now()
         self.save()
+
+class GlobalStats(models.Model):
+    """
+    Site-wide totals for the public dashboard, kept in a single row
+
+    users/signals.py applies every registration, XP and streak change as an F()
+    update in the same transaction; `recompute_global_stats` corrects any drift.
+    """
+    SINGLETON_ID = 1
+
+    total_users = models.IntegerField(default=0)
+    total_experience = models.BigIntegerField(default=0)
+    active_users = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'global stats'
+
+    def __str__(self):
+        return f"{self.total_users} users, {self.total_experience} XP"
+
+    @classmethod
+    def adjust(cls, **deltas):
+        """Add the given deltas to the totals without reading the row"""
+        updates = {field: F(field) + delta for field, delta in deltas.items() if delta}
+        if not updates:
+            return
+        if not cls.objects.filter(pk=cls.SINGLETON_ID).update(updated_at=timezone.now(), **updates):
+            # The row is gone; rebuilding it includes the change being applied
+            cls.recompute()
+
+    @classmethod
+    def compute(cls):
+        """The totals recomputed from the users table in one aggregate"""
+        totals = User.objects.aggregate(
+            total_users=Count('id'),
+            total_experience=Sum('experience_points'),
+            active_users=Count('id', filter=Q(current_streak__gt=0)),
+        )
+        totals['total_experience'] = totals['total_experience'] or 0
+        return totals
+
+    @classmethod
+    def recompute(cls):
+        stats, _ = cls.objects.update_or_create(pk=cls.SINGLETON_ID, defaults=cls.compute())
+        return stats
@@ -0,0 +1,37 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .models import GlobalStats, User
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, raw=False, **kwargs):
+    """Apply a registration or an XP or streak change to the global stats"""
+    if raw:
+        # Fixtures are loaded raw; recompute_global_stats catches them up
+        return
+    if created:
+        GlobalStats.adjust(
+            total_users=1,
+            total_experience=instance.experience_points,
+            active_users=int(instance.current_streak > 0),
+        )
+        return
+    # Limited to the fields this save wrote when update_fields was given
+    changed = getattr(instance, 'changed_fields', {})
+    if not changed:
+        return
+    old_experience = changed.get('experience_points', instance.experience_points)
+    old_streak = changed.get('current_streak', instance.current_streak)
+    GlobalStats.adjust(
+        total_experience=instance.experience_points - old_experience,
+        active_users=int(instance.current_streak > 0) - int(old_streak > 0),
+    )
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    GlobalStats.adjust(
+        total_users=-1,
+        total_experience=-instance.experience_points,
+        active_users=-int(instance.current_streak > 0),
+    )
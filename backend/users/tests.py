@@ -1,3 +1,66 @@
-from django.test import TestCase
+from io import StringIO
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from .models import GlobalStats
+
+User = get_user_model()
+
+
+class GlobalStatsTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+
+    def assertStats(self, **expected):
+        stats = GlobalStats.objects.get(pk=GlobalStats.SINGLETON_ID)
+        self.assertEqual({field: getattr(stats, field) for field in expected}, expected)
+        # And the maintained row always matches a full recount
+        totals = GlobalStats.compute()
+        self.assertEqual({field: getattr(stats, field) for field in totals}, totals)
+
+    def test_registration_xp_and_streaks_update_the_row(self):
+        response = self.client.post(reverse('register'), {'username': 'new', 'password': 'pw'})
+        self.assertEqual(response.status_code, 201)
+        self.assertStats(total_users=1, total_experience=0, active_users=0)
+
+        user = User.objects.get(username='new')
+        user.add_experience(40)
+        user.add_experience(70)
+        self.assertStats(total_users=1, total_experience=110, active_users=0)
+
+        user.last_activity = None
+        user.update_streak()
+        self.assertStats(active_users=1)
+
+        User.objects.create_user(username='veteran', password='pw', experience_points=500, current_streak=3)
+        self.assertStats(total_users=2, total_experience=610, active_users=2)
+
+        user.delete()
+        self.assertStats(total_users=1, total_experience=500, active_users=1)
+
+    def test_recompute_fixes_drift(self):
+        User.objects.create_user(username='drifter', password='pw')
+        # Queryset updates bypass the signals
+        User.objects.update(experience_points=250)
+        call_command('recompute_global_stats', stdout=StringIO())
+        self.assertStats(total_users=1, total_experience=250, active_users=0)
+
+    def test_dashboard_stats_is_cached_and_conditional(self):
+        User.objects.create_user(username='someone', password='pw', experience_points=30)
+        url = reverse('dashboard_stats')
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(response.data, {'total_users': 1, 'total_experience': 30, 'active_users': 0})
+
+        with self.assertNumQueries(0):
+            cached = self.client.get(url)
+        self.assertEqual(cached.data, response.data)
+
+        not_modified = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304)
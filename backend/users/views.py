@@ -3,11 +3,16 @@ from rest_framework import generics, status, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
+from django.conf import settings
 from django.contrib.auth import authenticate, login
+from django.core.cache import cache
 from django.db.models import Q
-from .models import User
+from django.views.decorators.http import condition
+from .models import GlobalStats, User
 from .serializers import UserSerializer, UserProfileSerializer, LeaderboardSerializer
 
+DASHBOARD_STATS_CACHE_KEY = 'dashboard-stats'
+
 class RegisterView(generics.CreateAPIView):
     queryset = User.objects.all()
     serializer_class = UserSerializer
@@ -54,16 +59,30 @@ class LeaderboardView(generics.ListAPIView):
         else:  # experience_points
             return User.objects.all().order_by('-experience_points')[:10]
 
+def _dashboard_stats():
+    """The global stats row, cached briefly so polling dashboards rarely reach the database"""
+    stats = cache.get(DASHBOARD_STATS_CACHE_KEY)
+    if stats is None:
+        stats = GlobalStats.objects.filter(pk=GlobalStats.SINGLETON_ID).first() or GlobalStats.recompute()
+        cache.set(DASHBOARD_STATS_CACHE_KEY, stats, timeout=getattr(settings, 'DASHBOARD_STATS_CACHE_TIMEOUT', 10))
+    return stats
+
+def _dashboard_stats_etag(request):
+    stats = _dashboard_stats()
+    return f"{stats.total_users}-{stats.total_experience}-{stats.active_users}"
+
+def _dashboard_stats_last_modified(request):
+    return _dashboard_stats().updated_at
+
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@condition(etag_func=_dashboard_stats_etag, last_modified_func=_dashboard_stats_last_modified)
 def dashboard_stats(request):
     """Get dashboard statistics"""
-    user_count = User.objects.count()
-    total_experience = sum(user.experience_points for user in User.objects.all())
-    active_users = User.objects.filter(current_streak__gt=0).count()
+    stats = _dashboard_stats()
     
     return Response({
-        'total_users': user_count,
-        'total_experience': total_experience,
-        'active_users': active_users,
+        'total_users': stats.total_users,
+        'total_experience': stats.total_experience,
+        'active_users': stats.active_users,
     })
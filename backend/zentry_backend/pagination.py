@@ -0,0 +1,130 @@
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator for admin changelists over very large tables
+
+    An unfiltered list on PostgreSQL uses the planner's row estimate from pg_class
+    instead of COUNT(*). Filtered lists (and other databases) count at most
+    `count_limit` rows, so a broad filter never scans the whole table; the pages
+    past the limit are reached by narrowing the filters or the date hierarchy.
+    """
+
+    count_limit = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = self._estimate(queryset)
+            if estimate is not None:
+                return estimate
+        return queryset[:self.count_limit].count()
+
+    @staticmethod
+    def _estimate(queryset):
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql':
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT reltuples FROM pg_class WHERE oid = %s::regclass', [queryset.model._meta.db_table])
+            row = cursor.fetchone()
+        # reltuples is -1 (or 0) until the table has been analysed; count small tables exactly
+        if not row or row[0] < 1000:
+            return None
+        return int(row[0])
+
+
+class CreatedAtCursorPagination(CursorPagination):
+    """
+    Keyset pagination over (created_at, id), newest first
+
+    The cursor holds the (created_at, id) of the row a page ends at and the next
+    page is read with `WHERE (created_at, id) < (%s, %s)`, a range scan of the
+    (created_at, id) index instead of OFFSET. There is no COUNT(*), so every page
+    costs the same however deep it is, and rows inserted meanwhile never shift the
+    pages. `has_more` comes from reading one row past the page.
+
+    DRF's CursorPagination filters on the first ordering field only and skips rows
+    with an equal timestamp by an offset; positions here are unique, so the offset
+    is always 0.
+    """
+
+    ordering = ('-created_at', '-id')
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.cursor = self.decode_cursor(request)
+        reverse = bool(self.cursor and self.cursor.reverse)
+        position = self.cursor.position if self.cursor else None
+
+        # A previous-page cursor walks back towards newer rows
+        queryset = queryset.order_by(*(('created_at', 'id') if reverse else self.ordering))
+        if position is not None:
+            queryset = self._after(queryset, *self._parse_position(position), newer=reverse)
+
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        following = self._get_position_from_instance(results[-1], self.ordering) if len(results) > self.page_size else None
+
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.next_position = position is not None, position
+            self.has_previous, self.previous_position = following is not None, following
+        else:
+            self.has_next, self.next_position = following is not None, following
+            self.has_previous, self.previous_position = position is not None, position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    @staticmethod
+    def _after(queryset, created_at, pk, newer=False):
+        """Rows past the (created_at, id) position, as one row-value comparison the index can range-scan"""
+        connection = connections[queryset.db]
+        table = connection.ops.quote_name(queryset.model._meta.db_table)
+        columns = f"{table}.{connection.ops.quote_name('created_at')}, {table}.{connection.ops.quote_name('id')}"
+        return queryset.extra(
+            where=[f"({columns}) {'>' if newer else '<'} (%s, %s)"],
+            params=[connection.ops.adapt_datetimefield_value(created_at), pk],
+        )
+
+    def _get_position_from_instance(self, instance, ordering):
+        return f'{instance.created_at.isoformat()}|{instance.pk}'
+
+    def _parse_position(self, position):
+        created_at, _, pk = position.partition('|')
+        try:
+            created_at, pk = parse_datetime(created_at), int(pk)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if created_at is None:
+            raise NotFound(self.invalid_cursor_message)
+        return created_at, pk
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'has_more': self.has_next,
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties']['has_more'] = {'type': 'boolean'}
+        return response_schema
@@ -164,3 +164,64 @@ else:
 
 # Custom User Model
 AUTH_USER_MODEL = 'users.User'
+
+# Dashboard stats
+# The public dashboard reads one GlobalStats row, cached for this long. Run
+# `manage.py recompute_global_stats` periodically (e.g. hourly) to correct any drift.
+DASHBOARD_STATS_CACHE_TIMEOUT = config('DASHBOARD_STATS_CACHE_TIMEOUT', default=10, cast=int)  # seconds
+
+# Task visibility
+# Set above 0 to cache each user's member project IDs, dropped whenever their memberships change.
+# That needs a cache shared by every process (Redis, Memcached, database): `manage.py check` rejects
+# the default per-process cache. At 0 the memberships are read with the task query itself.
+PROJECT_VISIBILITY_CACHE_TIMEOUT = config('PROJECT_VISIBILITY_CACHE_TIMEOUT', default=0, cast=int)  # seconds
+
+# Webhook delivery
+# Events are written to the NotificationLog outbox and sent by `manage.py process_webhooks`.
+# Set WEBHOOK_ASYNC_DELIVERY=False to send inline (useful for local development without a worker).
+WEBHOOK_ASYNC_DELIVERY = config('WEBHOOK_ASYNC_DELIVERY', default=True, cast=bool)
+WEBHOOK_WORKER_THREADS = config('WEBHOOK_WORKER_THREADS', default=4, cast=int)
+WEBHOOK_WORKER_BATCH_SIZE = config('WEBHOOK_WORKER_BATCH_SIZE', default=50, cast=int)
+WEBHOOK_WORKER_POLL_INTERVAL = config('WEBHOOK_WORKER_POLL_INTERVAL', default=1.0, cast=float)
+WEBHOOK_CLAIM_TIMEOUT = config('WEBHOOK_CLAIM_TIMEOUT', default=300, cast=int)  # seconds before a stuck claim is released
+WEBHOOK_MAX_RETRIES = config('WEBHOOK_MAX_RETRIES', default=5, cast=int)  # automatic retries before a delivery is marked failed
+WEBHOOK_RETRY_BASE_DELAY = config('WEBHOOK_RETRY_BASE_DELAY', default=10, cast=int)  # seconds, doubled on every attempt
+WEBHOOK_RETRY_MAX_DELAY = config('WEBHOOK_RETRY_MAX_DELAY', default=3600, cast=int)
+WEBHOOK_THROTTLED_RETRY_MAX_AGE = config('WEBHOOK_THROTTLED_RETRY_MAX_AGE', default=86400, cast=int)  # seconds a rate-limited (429) event keeps retrying; 429s do not count towards WEBHOOK_MAX_RETRIES
+WEBHOOK_RATE_LIMIT_PER_SECOND = config('WEBHOOK_RATE_LIMIT_PER_SECOND', default=2.0, cast=float)  # per integration, overridable on the model
+WEBHOOK_RATE_LIMIT_BURST = config('WEBHOOK_RATE_LIMIT_BURST', default=5, cast=int)
+WEBHOOK_RATE_LIMIT_MAX_WAIT = config('WEBHOOK_RATE_LIMIT_MAX_WAIT', default=1.0, cast=float)  # longer waits are deferred to the outbox
+WEBHOOK_CIRCUIT_FAILURE_THRESHOLD = config('WEBHOOK_CIRCUIT_FAILURE_THRESHOLD', default=5, cast=int)  # consecutive failures that open the circuit
+WEBHOOK_CIRCUIT_COOLDOWN = config('WEBHOOK_CIRCUIT_COOLDOWN', default=60, cast=int)  # seconds before a half-open trial
+WEBHOOK_MAX_IN_FLIGHT = config('WEBHOOK_MAX_IN_FLIGHT', default=8, cast=int)  # concurrent sends when fanning out inline
+WEBHOOK_DEDUP_WINDOW_SECONDS = config('WEBHOOK_DEDUP_WINDOW_SECONDS', default=3600, cast=int)  # 0 disables idempotency checks
+WEBHOOK_REPLAY_RATE = config('WEBHOOK_REPLAY_RATE', default=10.0, cast=float)  # dead-letter re-sends per second
+WEBHOOK_LOG_FLUSH_SIZE = config('WEBHOOK_LOG_FLUSH_SIZE', default=100, cast=int)  # delivery results written per bulk update
+WEBHOOK_LOG_FLUSH_INTERVAL = config('WEBHOOK_LOG_FLUSH_INTERVAL', default=2.0, cast=float)  # seconds between worker flushes
+WEBHOOK_HTTP_POOL_SIZE = config('WEBHOOK_HTTP_POOL_SIZE', default=10, cast=int)  # keep-alive connections per webhook host
+WEBHOOK_CONNECT_TIMEOUT = config('WEBHOOK_CONNECT_TIMEOUT', default=5.0, cast=float)
+WEBHOOK_READ_TIMEOUT = config('WEBHOOK_READ_TIMEOUT', default=10.0, cast=float)
+WEBHOOK_ROUTE_CACHE_TIMEOUT = config('WEBHOOK_ROUTE_CACHE_TIMEOUT', default=60, cast=int)  # seconds a cached (project, event) route lives
+WEBHOOK_DIGEST_CHECK_INTERVAL = config('WEBHOOK_DIGEST_CHECK_INTERVAL', default=60, cast=int)  # seconds between the worker's checks for due digests
+WEBHOOK_METRICS_FLUSH_INTERVAL = config('WEBHOOK_METRICS_FLUSH_INTERVAL', default=10.0, cast=float)  # seconds delivery counters stay in memory
+WEBHOOK_METRICS_RETENTION_MINUTES = config('WEBHOOK_METRICS_RETENTION_MINUTES', default=1440, cast=int)  # minutes of per-minute delivery stats kept
+WEBHOOK_METRICS_TOKEN = config('WEBHOOK_METRICS_TOKEN', default='')  # bearer token a Prometheus scraper sends to the metrics/prometheus/ endpoint; empty allows logged-in users only
+WEBHOOK_QUEUE_HIGH_WATER_MARK = config('WEBHOOK_QUEUE_HIGH_WATER_MARK', default=5000, cast=int)  # queued deliveries before low-priority events are shed; 0 disables
+WEBHOOK_QUEUE_DEPTH_CACHE_SECONDS = config('WEBHOOK_QUEUE_DEPTH_CACHE_SECONDS', default=5, cast=int)  # seconds a counted queue depth is reused
+WEBHOOK_SHED_MAX_PRIORITY = config('WEBHOOK_SHED_MAX_PRIORITY', default=0, cast=int)  # priorities up to this are shed past the mark
+WEBHOOK_BLOB_COMPRESS_MIN_BYTES = config('WEBHOOK_BLOB_COMPRESS_MIN_BYTES', default=512, cast=int)  # payloads/responses this large are stored zlib-compressed; 0 disables
+# Delivery priority per event type: 0 low, 1 normal (the default), 2 high. Higher priorities are sent first.
+WEBHOOK_EVENT_PRIORITIES = {
+    'milestone_reached': 2,
+    'badge_earned': 2,
+    'task_completed': 1,
+    'project_created': 1,
+    'daily_streak': 0,
+}
+
+# Notification log retention
+# `manage.py archive_notification_logs` (run daily) moves finished logs older than the
+# retention window into gzip NDJSON files, one per month, and deletes them from the table.
+NOTIFICATION_LOG_RETENTION_DAYS = config('NOTIFICATION_LOG_RETENTION_DAYS', default=30, cast=int)
+NOTIFICATION_LOG_ARCHIVE_DIR = config('NOTIFICATION_LOG_ARCHIVE_DIR', default=str(BASE_DIR / 'archive' / 'notification_logs'))
+NOTIFICATION_LOG_ERROR_MAX_LENGTH = config('NOTIFICATION_LOG_ERROR_MAX_LENGTH', default=2000, cast=int)
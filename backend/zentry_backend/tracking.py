@@ -0,0 +1,69 @@
+class TrackedFieldsMixin:
+    """
+    Remember tracked field values as loaded so saves know what actually changed
+
+    During save() (and so inside pre_save/post_save receivers) `changed_fields` maps
+    each tracked attribute that differs from the loaded value to its previous value.
+    It is empty for newly created rows, and a save(update_fields=...) only reports
+    (and re-snapshots) the fields it actually wrote; `stored_value()` gives receivers
+    the row's value for fields such a save left out.
+    """
+    tracked_fields = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._snapshot_tracked_fields()
+        return instance
+
+    def _tracked_attnames(self):
+        return [self._meta.get_field(name).attname for name in self.tracked_fields]
+
+    def _snapshot_tracked_fields(self, attnames=None):
+        # Deferred fields are not in __dict__ and are left untracked
+        snapshot = {
+            attname: self.__dict__[attname]
+            for attname in self._tracked_attnames()
+            if attname in self.__dict__ and (attnames is None or attname in attnames)
+        }
+        if attnames is None:
+            self._loaded_values = snapshot
+        else:
+            self._loaded_values = {**getattr(self, '_loaded_values', {}), **snapshot}
+
+    def _saved_attnames(self, update_fields):
+        """Attribute names written by save(update_fields=...), which accepts names or attnames"""
+        if update_fields is None:
+            return None
+        names = set(update_fields)
+        return {
+            field.attname for field in self._meta.concrete_fields
+            if field.name in names or field.attname in names
+        }
+
+    def get_changed_fields(self):
+        """Tracked attributes whose current value differs from the loaded one, with their old values"""
+        loaded = getattr(self, '_loaded_values', {})
+        return {
+            attname: old_value
+            for attname, old_value in loaded.items()
+            if getattr(self, attname) != old_value
+        }
+
+    def stored_value(self, attname):
+        """A tracked attribute as the current save() leaves it in the database"""
+        return getattr(self, '_unsaved_fields', {}).get(attname, getattr(self, attname))
+
+    def save(self, *args, update_fields=None, **kwargs):
+        saved = self._saved_attnames(update_fields)
+        self.changed_fields = {}
+        self._unsaved_fields = {}
+        if not self._state.adding:
+            # Edits outside update_fields stay pending for a later save
+            for attname, old_value in self.get_changed_fields().items():
+                if saved is None or attname in saved:
+                    self.changed_fields[attname] = old_value
+                else:
+                    self._unsaved_fields[attname] = old_value
+        super().save(*args, update_fields=update_fields, **kwargs)
+        self._snapshot_tracked_fields(saved)